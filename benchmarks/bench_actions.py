@@ -0,0 +1,124 @@
+"""
+Память и время построения кнопок: dict на кнопку против Action.
+
+Для трёх видов экранов (статическое меню, сетка из 12 метрик, листаемый
+алфавит) N раз строим кнопки и держим результаты живыми, как держит их
+delivered_view в сессии. tracemalloc показывает, сколько блоков и байт
+приходится на один рендер. Вариант «dict» воспроизводит прежние
+_build_*_actions в подклассе движка.
+Запуск: python benchmarks/bench_actions.py [рендеров]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+
+
+class DictActionsEngine(NavigationEngine):
+    """Прежняя реализация: новый dict на каждую кнопку каждого рендера."""
+
+    def _build_static_actions(self, screen_def):
+        actions = []
+        for i, btn in enumerate(screen_def["buttons"]):
+            action = {"id": f"static_{i}", "label": btn["label"]}
+            if "target" in btn:
+                action["type"] = "navigate"
+                action["target"] = btn["target"]
+            else:
+                action["type"] = "action"
+                action["action"] = btn["action"]
+            actions.append(action)
+        return actions
+
+    def _build_dynamic_actions(self, user_id, screen_def, context, prefetched=None):
+        items = self._local_items(user_id, screen_def)
+        if not items:
+            request = self._data_source_request(screen_def, context)
+            items = self._fetch_items(*request, max_age=screen_def["data_source"].get("ttl"))
+        start, end = 0, len(items)
+        if screen_def.get("paginated"):
+            start, end = self._page_bounds(user_id, screen_def, len(items))
+        template = screen_def["button_template"]
+        actions = []
+        for i, item in enumerate(items[start:end], start):
+            next_context = {}
+            for ctx_key, item_key in template.get("context_fields", {}).items():
+                next_context[ctx_key] = item.get(item_key, "")
+            actions.append({
+                "id": f"dynamic_{i}",
+                "label": item.get(template["label_field"], f"Item {i}"),
+                "type": "navigate",
+                "target": template["target_screen"],
+                "context": next_context,
+            })
+        return actions
+
+    def _build_paginated_actions(self, user_id, screen_def, context):
+        items = screen_def["items"]
+        start, end = self._page_bounds(user_id, screen_def, len(items))
+        actions = []
+        for i, item in enumerate(items[start:end], start):
+            actions.append({
+                "id": f"paginated_{i}", "label": str(item), "type": "navigate",
+                "target": screen_def.get("target", "item_selected"), "payload": str(item),
+                "context": {screen_def["context_key"]: str(item)},
+            })
+        page = self.manifest.defaults["pagination"]
+        if end < len(items):
+            actions.append({"id": "next_page", "label": page["next_label"], "type": "paginate",
+                            "direction": "next", "screen_id": screen_def["id"]})
+        if start > 0:
+            actions.append({"id": "prev_page", "label": page["prev_label"], "type": "paginate",
+                            "direction": "prev", "screen_id": screen_def["id"]})
+        return actions
+
+
+def _build(engine, screen_id):
+    screen_def = engine.manifest.screens[screen_id]
+    context = engine.get_user_state("u1")["context"]
+    if screen_def["type"] == "dynamic":
+        return lambda: engine._build_dynamic_actions("u1", screen_def, context)
+    if screen_def.get("paginated"):
+        return lambda: engine._build_paginated_actions("u1", screen_def, context)
+    return lambda: engine._build_static_actions(screen_def)
+
+
+def measure(engine_class, screen_id: str, renders: int):
+    engine = engine_class(
+        os.path.join(ROOT, "menu-manifest.json"),
+        logger=NavigationLogger(name="bench", log_file=os.devnull), api_client=APISimulator()
+    )
+    build = _build(engine, screen_id)
+    build()  # прогрев: кэш ответа источника и общих кнопок
+    kept = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(renders):
+        kept.append(build())
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = [s for s in after.compare_to(before, "filename") if s.size_diff > 0]
+    blocks = sum(s.count_diff for s in stats) / renders
+    size = sum(s.size_diff for s in stats) / renders
+    started = time.perf_counter()
+    for _ in range(renders):
+        build()
+    elapsed = (time.perf_counter() - started) / renders * 1e6
+    return len(kept[0]), blocks, size, elapsed
+
+
+if __name__ == "__main__":
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"Рендеров: {renders}")
+    for screen_id in ("main", "select_metric", "alphabet"):
+        for name, engine_class in (("dict", DictActionsEngine), ("Action", NavigationEngine)):
+            buttons, blocks, size, elapsed = measure(engine_class, screen_id, renders)
+            print(f"{screen_id:>14} {name:>6}: кнопок {buttons:2d}, блоков на рендер {blocks:6.1f}, "
+                  f"байт на рендер {size:8.0f}, {elapsed:6.2f} мкс")
@@ -0,0 +1,95 @@
+"""
+AI-запросы по одному против микро-батчей (navigation.ai_batch).
+
+Фейковый сервер модели обрабатывает запросы строго по очереди (одна
+модель) и тратит на каждый HTTP-запрос фиксированные overhead_ms плюс
+item_ms на каждый вопрос в нём — так ведёт себя батч-инференс. N учителей
+одновременно отправляют по несколько коротких вопросов. Сравниваются
+общее время, задержка ответа (p50/p95) и число запросов к модели.
+Запуск: python benchmarks/bench_ai_batch.py [учителей] [вопросов на учителя] [overhead_ms] [item_ms]
+"""
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.ai_batch import AIBatchDispatcher
+from navigation.http_client import HttpApiClient
+
+
+class FakeModel(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        items = body["requests"] if self.path == "/api/ai/batch" else [{"id": "0", "body": body}]
+        with server.model:
+            server.calls += 1
+            time.sleep(server.overhead + server.item * len(items))
+        responses = [{"id": r["id"], "response": {"answer": "ok"}} for r in items]
+        payload = {"responses": responses} if self.path == "/api/ai/batch" else responses[0]["response"]
+        raw = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(server, teachers: int, questions: int, batched: bool):
+    host, port = server.server_address
+    client = HttpApiClient(f"http://{host}:{port}", pool_size=teachers, retries=0, timeout=120)
+    dispatcher = AIBatchDispatcher(client, window_ms=5, max_batch=32, timeout=120) if batched else None
+    server.calls = 0
+    latencies = []
+
+    def teacher(t):
+        for q in range(questions):
+            body = {"user_id": str(t), "query": f"вопрос {q}"}
+            started = time.perf_counter()
+            if dispatcher:
+                dispatcher.request("/api/ai/teacher-assist", body)
+            else:
+                client.call("/api/ai/teacher-assist", "POST", json=body)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(teachers) as pool:
+        list(pool.map(teacher, range(teachers)))
+    total = time.perf_counter() - started
+    metrics = dispatcher.metrics() if dispatcher else None
+    if dispatcher:
+        dispatcher.close()
+    client.close()
+    latencies.sort()
+    return total, statistics.median(latencies), latencies[int(len(latencies) * 0.95)], server.calls, metrics
+
+
+if __name__ == "__main__":
+    teachers = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    overhead = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000
+    item = (float(sys.argv[4]) if len(sys.argv) > 4 else 2) / 1000
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeModel)
+    server.model, server.overhead, server.item, server.calls = threading.Lock(), overhead, item, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Учителей: {teachers}, вопросов: {teachers * questions}, модель: {overhead * 1000:.0f} мс на запрос "
+          f"+ {item * 1000:.0f} мс на вопрос")
+    for name, batched in (("по одному", False), ("батчи", True)):
+        total, p50, p95, calls, metrics = run(server, teachers, questions, batched)
+        extra = f", средний батч {metrics['avg_batch']}, ожидание p95 {metrics['p95_wait_ms']} мс" if metrics else ""
+        print(f"{name:>10}: {total:6.2f} с, ответ p50 {p50 * 1000:7.1f} мс, p95 {p95 * 1000:7.1f} мс, "
+              f"запросов к модели {calls}{extra}")
+    server.shutdown()
@@ -0,0 +1,73 @@
+"""
+Нагрузочный бенчмарк: по одному действию против handle_actions_batch.
+
+Пользователи случайно ходят по меню; API имитирует сетевую задержку.
+Запуск: python benchmarks/bench_batch.py [пользователей] [шагов] [задержка_мс]
+"""
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+
+
+class SlowAPI(APISimulator):
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def call(self, url, method="GET", **kwargs):
+        time.sleep(self.latency)
+        return super().call(url, method, **kwargs)
+
+
+def _engine(latency: float) -> NavigationEngine:
+    logger = NavigationLogger(name="bench", log_file=os.devnull)
+    return NavigationEngine(os.path.join(ROOT, "menu-manifest.json"), logger=logger, api_client=SlowAPI(latency))
+
+
+def _pick(rng: random.Random, view) -> dict:
+    actions = [a for a in view["actions"] if a["type"] in ("navigate", "back", "paginate")]
+    return rng.choice(actions) if actions else {"type": "back", "label": "< Назад"}
+
+
+def run_sequential(users, steps, latency):
+    engine, rng = _engine(latency), random.Random(1)
+    views = {u: engine.get_current_view(u) for u in users}
+    started = time.perf_counter()
+    for _ in range(steps):
+        for user_id in users:
+            engine.handle_action(user_id, _pick(rng, views[user_id]))
+            views[user_id] = engine.get_current_view(user_id)
+    return len(users) * steps / (time.perf_counter() - started)
+
+
+def run_batched(users, steps, latency):
+    engine, rng = _engine(latency), random.Random(1)
+    views = engine.render_views_batch(users)
+    started = time.perf_counter()
+    for _ in range(steps):
+        views = engine.handle_actions_batch([(u, _pick(rng, views[u])) for u in users])
+    return len(users) * steps / (time.perf_counter() - started)
+
+
+def main():
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 2.0) / 1000
+    users = [f"user-{i}" for i in range(n_users)]
+
+    seq = run_sequential(users, steps, latency)
+    bat = run_batched(users, steps, latency)
+    print(f"По одному действию: {seq:10.0f} действий/с")
+    print(f"Batch:              {bat:10.0f} действий/с")
+    print(f"Ускорение:          {bat / seq:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
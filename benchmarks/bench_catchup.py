@@ -0,0 +1,95 @@
+"""
+Восстановление после простоя: вся очередь апдейтов против схлопнутой.
+
+Моделируется очередь, накопившаяся за время простоя: в каждом чате
+пользователь жмёт кнопки на последнем показанном меню (main) и изредка
+пишет текст. Оба варианта прогоняют апдейты через движок по логике
+обработчиков bot.py: нажатие — answer + edit, текст — send; на
+ненайденную кнопку — answer + edit с текущим меню. Вызовы Telegram
+ограничены лимитом бота (rate сообщений в секунду), поэтому время
+восстановления считается как время движка + вызовы Telegram / rate.
+Запуск: python benchmarks/bench_catchup.py [чатов] [апдейтов в чате] [rate]
+"""
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.api_stub import APISimulator
+from navigation.catchup import collapse_backlog
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+
+
+class CountingAPI(APISimulator):
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, url, method="GET", **kwargs):
+        self.calls += 1
+        return super().call(url, method, **kwargs)
+
+
+def make_backlog(chats: int, per_chat: int, seed: int = 0):
+    rng = random.Random(seed)
+    engine = NavigationEngine(os.path.join(ROOT, "menu-manifest.json"),
+                              logger=NavigationLogger("bench", log_file=os.devnull), api_client=APISimulator())
+    main_actions = engine.get_current_view("0")["actions"]
+    backlog, update_id = [], 0
+    for _ in range(per_chat):
+        for chat in range(chats):
+            update_id += 1
+            if rng.random() < 0.1:
+                message = SimpleNamespace(chat=SimpleNamespace(id=chat), text=rng.choice(["Иван", "/start"]))
+                backlog.append(SimpleNamespace(update_id=update_id, callback_query=None, message=message))
+            else:
+                action = rng.choice(main_actions)
+                query = SimpleNamespace(data=f"{action['type']}|{action['id']}",
+                                        message=SimpleNamespace(chat=SimpleNamespace(id=chat), message_id=1))
+                backlog.append(SimpleNamespace(update_id=update_id, callback_query=query, message=None))
+    return backlog
+
+
+def process(updates):
+    """Как обработчики bot.py; возвращает (число вызовов Telegram, запросов к API, секунд движка)."""
+    api = CountingAPI()
+    engine = NavigationEngine(os.path.join(ROOT, "menu-manifest.json"),
+                              logger=NavigationLogger("bench", log_file=os.devnull), api_client=api)
+    telegram = 0
+    started = time.perf_counter()
+    for update in updates:
+        if update.callback_query is not None:
+            user_id = str(update.callback_query.message.chat.id)
+            action_id = update.callback_query.data.split("|", 1)[1]
+            found = next((a for a in engine.get_current_view(user_id)["actions"] if a["id"] == action_id), None)
+            if found is not None:
+                engine.handle_action(user_id, found)
+            engine.get_view_delta(user_id)
+            telegram += 2  # answer + edit
+        else:
+            user_id = str(update.message.chat.id)
+            if update.message.text == "/start":
+                engine.init_user(user_id)
+            else:
+                engine.handle_user_input(user_id, update.message.text)
+            engine.get_view_delta(user_id)
+            telegram += 1  # send
+    return telegram, api.calls, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    per_chat = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 30.0
+    backlog = make_backlog(chats, per_chat)
+    kept, dropped = collapse_backlog(backlog)
+    collapsed = [update for updates in kept.values() for update in updates]
+    print(f"Очередь: {len(backlog)} апдейтов в {chats} чатах, лимит Telegram {rate:.0f}/с")
+    for name, updates in (("вся очередь", backlog), ("схлопнутая", collapsed)):
+        telegram, api_calls, engine_s = process(updates)
+        print(f"{name:>12}: апдейтов {len(updates):6d}, вызовов Telegram {telegram:6d}, запросов к API {api_calls:5d}, "
+              f"движок {engine_s:5.2f} с, восстановление ~{engine_s + telegram / rate:7.1f} с")
@@ -0,0 +1,87 @@
+"""
+Память N ботов в одном процессе: общий BotHost против независимых движков.
+
+Манифесты школ — копии menu-manifest.json (часть школ с изменённым
+заголовком), у каждого бота по M пользователей на экране меню. Память
+меряется tracemalloc (без учёта интерпретатора: отдельный процесс на
+школу стоит ещё столько же сверху); дисковые кэши манифестов прогреты заранее.
+Запуск: python benchmarks/bench_hosting.py [ботов] [пользователей на бота]
+"""
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.hosting import BotHost
+from navigation.logger import NavigationLogger
+
+
+def _manifests(tmp: str, bots: int, variants: int):
+    with open(os.path.join(ROOT, "menu-manifest.json"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    paths = []
+    for i in range(bots):
+        data["screens"]["main"]["title"] = f"Школа-вариант {i % variants}"
+        path = os.path.join(tmp, f"school{i}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        paths.append(path)
+    return paths
+
+
+def _exercise(engine, users: int):
+    for u in range(users):
+        user_id = str(u)
+        engine.get_current_view(user_id)
+        engine.handle_action(user_id, {"type": "navigate", "target": "quick_grade", "label": "Поставить отметки"})
+        engine.get_current_view(user_id)
+
+
+def run_separate(paths, users: int) -> int:
+    tracemalloc.start()
+    engines = []
+    for i, path in enumerate(paths):
+        engine = NavigationEngine(
+            path, logger=NavigationLogger(f"bench-separate{i}", log_file=os.devnull), api_client=APISimulator()
+        )
+        _exercise(engine, users)
+        engines.append(engine)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for engine in engines:
+        if engine._fetch_executor is not None:
+            engine._fetch_executor.shutdown()
+    return current
+
+
+def run_host(paths, users: int):
+    tracemalloc.start()
+    host = BotHost(log_file=os.devnull)
+    for i, path in enumerate(paths):
+        _exercise(host.add(f"school{i}", path).engine, users)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    stats = host.stats()
+    host.close()
+    return current, stats
+
+
+if __name__ == "__main__":
+    bots = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _manifests(tmp, bots, variants=4)
+        # Прогреваем кэши манифестов на диске, чтобы обе стороны грузили одинаково
+        for path in paths:
+            NavigationEngine(path, logger=NavigationLogger("bench-warm", log_file=os.devnull))
+        separate = run_separate(paths, users)
+        shared, stats = run_host(paths, users)
+    print(f"Ботов: {bots}, пользователей на бота: {users}, {stats}")
+    print(f"независимые движки: {separate / 2**20:7.2f} МБ")
+    print(f"         BotHost:   {shared / 2**20:7.2f} МБ ({separate / shared:.1f}x меньше)")
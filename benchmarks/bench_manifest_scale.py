@@ -0,0 +1,182 @@
+"""
+Как загрузка, проверка и первый рендер растут с размером манифеста.
+
+Для каждого размера генерируется синтетический манифест
+(navigation.synthetic) и меряются:
+- разбор JSON, проверка (compile_manifest), анализ контекста;
+- ManifestLoader без кэша и из скомпилированного кэша;
+- создание движка, первый view main и первое действие (живые ключи
+  контекста движок берёт готовыми из кэша манифеста);
+- первый рендер экранов каждого вида: длинный список, алфавит из
+  list_items элементов, сетка, последний уровень CONTEXTUAL-цепочки;
+- память после прогулки `users` пользователей по случайным кнопкам.
+
+Каждый прогон дописывается строкой в JSONL (по умолчанию
+benchmarks/results/manifest_scale.jsonl) и сравнивается с предыдущим
+прогоном той же формы.
+Запуск: python benchmarks/bench_manifest_scale.py [100,1000,10000] [глубина цепочки] [элементов в списке] [файл результатов]
+"""
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.context_analysis import analyze_context
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+from navigation.manifest import ManifestLoader, compile_manifest, template_keys
+from navigation.synthetic import SyntheticAPI, generate_manifest, write_manifest
+
+REPEATS = 5
+USERS = 200
+STEPS = 30
+
+
+def _median_ms(fn, repeats: int = REPEATS) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def _engine(path: str, sources) -> NavigationEngine:
+    logger = NavigationLogger("bench", level=logging.WARNING, log_file=os.devnull)
+    return NavigationEngine(path, logger=logger, api_client=SyntheticAPI(sources))
+
+
+def _first_render_ms(path: str, sources, screens, screen_id: str) -> float:
+    """Свежий движок, прямой переход на экран с заполненным контекстом, время первого view."""
+    engine = _engine(path, sources)
+    screen = screens[screen_id]
+    keys = template_keys(screen["title"]) + template_keys(screen.get("data_source", {}).get("url", ""))
+    context = {key: "А" if key.endswith("_letter") else "x" for key in keys}
+    engine.handle_action("u1", {"type": "navigate", "target": screen_id, "label": "bench", "context": context})
+    started = time.perf_counter()
+    engine.get_current_view("u1")
+    return (time.perf_counter() - started) * 1000
+
+
+def _walk(engine: NavigationEngine, users: int, steps: int, seed: int = 0):
+    rng = random.Random(seed)
+    for u in range(users):
+        user_id = f"u{u}"
+        for _ in range(steps):
+            actions = engine.get_current_view(user_id)["actions"]
+            engine.handle_action(user_id, actions[rng.randrange(len(actions))] if actions else
+                                 {"type": "back", "label": "back"})
+
+
+def measure(size: int, chain_depth: int, list_items: int, tmp: str):
+    manifest, sources = generate_manifest(size, chain_depth=chain_depth, list_items=list_items, seed=1)
+    path = os.path.join(tmp, f"synthetic-{size}.json")
+    write_manifest(path, manifest)
+    with open(path, "rb") as f:
+        raw = f.read()
+    screens = manifest["screens"]
+
+    result = {"screens": len(screens), "bytes": len(raw)}
+    result["json_ms"] = _median_ms(lambda: json.loads(raw))
+    parsed = json.loads(raw)
+    result["validate_ms"] = _median_ms(lambda: compile_manifest(parsed))  # проверка идемпотентна
+    result["analyze_ms"] = _median_ms(lambda: analyze_context(screens))
+    result["load_cold_ms"] = _median_ms(lambda: ManifestLoader(path, use_cache=False))
+    ManifestLoader(path)  # прогреваем кэш
+    result["load_cached_ms"] = _median_ms(lambda: ManifestLoader(path))
+
+    started = time.perf_counter()
+    engine = _engine(path, sources)
+    result["engine_init_ms"] = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    main_view = engine.get_current_view("u1")
+    result["first_view_ms"] = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    engine.handle_action("u1", main_view["actions"][0])
+    result["first_action_ms"] = (time.perf_counter() - started) * 1000
+
+    for name, screen_id in (("list", "list_0"), ("alphabet", "alphabet_0"), ("alphabet_people", "alphabet_0_people"),
+                            ("grid", "grid_0"), ("chain_last", f"chain_0_{chain_depth - 1}")):
+        if screen_id in screens:
+            result[f"render_{name}_ms"] = _first_render_ms(path, sources, screens, screen_id)
+
+    gc.collect()
+    tracemalloc.start()
+    engine = _engine(path, sources)
+    _walk(engine, USERS, STEPS)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["steady_mb"] = current / 2**20
+    result["peak_mb"] = peak / 2**20
+    return result
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _previous(results_path: str, shape: dict):
+    previous = None
+    try:
+        with open(results_path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("shape") == shape:
+                    previous = record
+    except (OSError, ValueError):
+        pass
+    return previous
+
+
+def main():
+    sizes = [int(s) for s in (sys.argv[1] if len(sys.argv) > 1 else "100,1000,10000").split(",")]
+    chain_depth = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    list_items = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    results_path = sys.argv[4] if len(sys.argv) > 4 else os.path.join(ROOT, "benchmarks", "results", "manifest_scale.jsonl")
+
+    shape = {"sizes": sizes, "chain_depth": chain_depth, "list_items": list_items, "users": USERS, "steps": STEPS}
+    previous = _previous(results_path, shape)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {str(size): measure(size, chain_depth, list_items, tmp) for size in sizes}
+
+    metrics = list(next(iter(results.values())))
+    print(f"{'':>26}" + "".join(f"{size:>12}" for size in sizes))
+    for metric in metrics:
+        row = f"{metric:>26}"
+        for size in sizes:
+            value = results[str(size)].get(metric)
+            row += f"{value:12.2f}" if isinstance(value, float) else f"{value if value is not None else '-':>12}"
+        print(row)
+        if previous:
+            deltas = []
+            for size in sizes:
+                old, new = previous["results"].get(str(size), {}).get(metric), results[str(size)].get(metric)
+                deltas.append(f"{(new - old) / old * 100:+11.1f}%" if old and new is not None else f"{'':>12}")
+            print(f"{'vs ' + previous['git']:>26}" + "".join(deltas))
+
+    record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "git": _git_revision(), "python": platform.python_version(),
+              "shape": shape, "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Результаты дописаны в {results_path}")
+
+
+if __name__ == "__main__":
+    main()
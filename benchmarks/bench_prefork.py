@@ -0,0 +1,61 @@
+"""
+Память prefork-воркеров: общий прогретый родитель против прогрева в каждом воркере.
+
+Источник /api/students отдаёт много студентов, чтобы кэш ответа и поисковый
+индекс были заметны. В режиме shared их строит родитель до fork (и замораживает
+gc.freeze), в режиме isolated — каждый воркер сам при первом обращении.
+Запуск: python benchmarks/bench_prefork.py [воркеров] [студентов]
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+from navigation.prefork import PreforkPool
+
+LETTERS = "АБВГДЕЖЗИКЛМНОПРСТУФХЦЧШЭЮЯ"
+
+
+class ManyStudentsAPI(APISimulator):
+    def __init__(self, students: int):
+        self.students = [
+            {"id": f"s{i}", "full_name": f"{LETTERS[i % len(LETTERS)]}фамилия{i} Имя{i % 97}"}
+            for i in range(students)
+        ]
+
+    def call(self, url, method="GET", **kwargs):
+        if url == "/api/students":
+            return self.students
+        return super().call(url, method, **kwargs)
+
+
+def run(mode: str, workers: int, students: int):
+    logger = NavigationLogger(name="bench", log_file=os.devnull)
+    engine = NavigationEngine(os.path.join(ROOT, "menu-manifest.json"), logger=logger, api_client=ManyStudentsAPI(students))
+    shared = mode == "shared"
+    with PreforkPool(engine, workers=workers, freeze=shared, warm=shared) as pool:
+        for i in range(workers * 20):
+            user_id = f"user{i}"
+            pool.call(user_id, "handle_action", {
+                "type": "navigate", "target": "students_by_letter", "label": "А", "context": {"letter": LETTERS[i % 5]}
+            })
+            pool.call(user_id, "get_current_view")
+        memory = pool.memory()
+    if not memory:
+        print(f"{mode:>8}: /proc/<pid>/smaps_rollup недоступен")
+        return
+    uss = [m["uss_kb"] for m in memory.values()]
+    pss = [m["pss_kb"] for m in memory.values()]
+    print(f"{mode:>8}: USS на воркер {sum(uss) / len(uss) / 1024:7.1f} МБ, PSS {sum(pss) / len(pss) / 1024:7.1f} МБ")
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    students = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    print(f"Воркеров: {workers}, студентов: {students}")
+    run("isolated", workers, students)
+    run("shared", workers, students)
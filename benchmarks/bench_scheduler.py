@@ -0,0 +1,97 @@
+"""
+Колесо таймеров против heapq и задачи asyncio.sleep на каждое напоминание.
+
+Вставляем N напоминаний со сроками до суток, отменяем каждое десятое и
+прокручиваем время до конца. Для колеса и кучи меряем время и пиковую
+память (tracemalloc); для asyncio — только память на N спящих задач.
+Запуск: python benchmarks/bench_scheduler.py [напоминаний]
+"""
+import asyncio
+import heapq
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.scheduler import Reminder, TimerWheel
+
+DAY = 86_400.0
+
+
+def _dues(count: int):
+    rng = random.Random(1)
+    return [rng.uniform(1, DAY) for _ in range(count)]
+
+
+def bench_wheel(dues):
+    tracemalloc.start()
+    started = time.perf_counter()
+    wheel = TimerWheel(tick=1.0, start=0.0)
+    for i, due in enumerate(dues):
+        wheel.add(Reminder(i, due, "u", "meeting_detail"))
+    inserted = time.perf_counter()
+    for i in range(0, len(dues), 10):
+        wheel.cancel(i)
+    cancelled = time.perf_counter()
+    fired = 0
+    for now in range(60, int(DAY) + 61, 60):  # тикаем раз в минуту
+        fired += len(wheel.advance(float(now)))
+    finished = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return fired, inserted - started, cancelled - inserted, finished - cancelled, peak
+
+
+def bench_heap(dues):
+    tracemalloc.start()
+    started = time.perf_counter()
+    heap, reminders = [], {}
+    for i, due in enumerate(dues):
+        reminder = reminders[i] = Reminder(i, due, "u", "meeting_detail")
+        heapq.heappush(heap, (due, i))
+    inserted = time.perf_counter()
+    for i in range(0, len(dues), 10):
+        del reminders[i]  # ленивая отмена: запись остаётся в куче до срока
+    cancelled = time.perf_counter()
+    fired = 0
+    for now in range(60, int(DAY) + 61, 60):
+        while heap and heap[0][0] <= now:
+            _, i = heapq.heappop(heap)
+            if reminders.pop(i, None) is not None:
+                fired += 1
+    finished = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return fired, inserted - started, cancelled - inserted, finished - cancelled, peak
+
+
+async def _sleepers(dues):
+    tasks = [asyncio.create_task(asyncio.sleep(due)) for due in dues]
+    await asyncio.sleep(0)
+    peak = tracemalloc.get_traced_memory()[1]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return peak
+
+
+def bench_tasks(dues):
+    tracemalloc.start()
+    peak = asyncio.run(_sleepers(dues))
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    dues = _dues(count)
+    print(f"Напоминаний: {count}, отменено: {len(range(0, count, 10))}")
+    for name, bench in (("wheel", bench_wheel), ("heapq", bench_heap)):
+        fired, insert, cancel, run, peak = bench(dues)
+        print(f"{name:>8}: вставка {insert:6.2f} с, отмена {cancel:6.3f} с, прокрутка суток {run:6.2f} с, "
+              f"сработало {fired}, пик памяти {peak / 2**20:7.1f} МБ")
+    print(f"{'tasks':>8}: пик памяти {bench_tasks(dues) / 2**20:7.1f} МБ (задача asyncio.sleep на напоминание)")
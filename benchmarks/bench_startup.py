@@ -0,0 +1,64 @@
+"""
+Бенчмарк холодного старта.
+
+Отдельно меряет:
+- время импорта ядра движка (в чистом интерпретаторе);
+- время загрузки манифеста: разбор JSON + компиляция против скомпилированного кэша.
+
+Запуск: python benchmarks/bench_startup.py [menu-manifest.json] [повторы]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.manifest import ManifestLoader
+
+IMPORT_PROBE = (
+    "import time; t = time.perf_counter(); import navigation.engine; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def measure_import(repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(float(out))
+    return statistics.median(samples)
+
+
+def measure_load(manifest_path: str, use_cache: bool, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        ManifestLoader(manifest_path, use_cache=use_cache)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    manifest_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "menu-manifest.json")
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    import_time = measure_import(min(repeats, 10))
+    parse_time = measure_load(manifest_path, use_cache=False, repeats=repeats)
+    ManifestLoader(manifest_path)  # прогреваем кэш
+    cached_time = measure_load(manifest_path, use_cache=True, repeats=repeats)
+
+    print(f"Импорт navigation.engine:      {import_time * 1000:8.2f} мс")
+    print(f"Манифест, JSON + компиляция:  {parse_time * 1000:8.2f} мс")
+    print(f"Манифест, из кэша:            {cached_time * 1000:8.2f} мс")
+    if cached_time:
+        print(f"Ускорение загрузки:           {parse_time / cached_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
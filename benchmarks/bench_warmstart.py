@@ -0,0 +1,83 @@
+"""
+Первая волна пользователей после деплоя: холодный старт против снимка.
+
+Бэкенд отвечает с задержкой; N пользователей одновременно открывают
+«Мои треки», выбор метрики и поиск студента. Меряем время до первого
+view (p50 / max) и сколько запросов ушло в бэкенд за время волны.
+Запуск: python benchmarks/bench_warmstart.py [пользователей] [задержка, мс]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+
+ROUTE = [
+    {"type": "navigate", "target": "tracks", "label": "Мои треки"},
+    {"type": "navigate", "target": "select_metric", "label": "Метрики", "context": {"student_name": "Иванов"}},
+    {"type": "navigate", "target": "student_search", "label": "Поиск студента"},
+]
+
+
+class SlowAPI(APISimulator):
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def call(self, url, method="GET", **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return super().call(url, method, **kwargs)
+
+
+def _engine(api):
+    logger = NavigationLogger(name="bench", log_file=os.devnull)
+    return NavigationEngine(os.path.join(ROOT, "menu-manifest.json"), logger=logger, api_client=api)
+
+
+def wave(engine, users: int):
+    def visit(user: int) -> float:
+        started = time.perf_counter()
+        for action in ROUTE:
+            engine.handle_action(str(user), action)
+            engine.get_current_view(str(user))
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        return list(pool.map(visit, range(users)))
+
+
+def run(name: str, users: int, latency: float, snapshot_path=None):
+    api = SlowAPI(latency)
+    engine = _engine(api)
+    started = time.perf_counter()
+    if snapshot_path:
+        engine.load_snapshot(snapshot_path)
+    load_ms = (time.perf_counter() - started) * 1000
+    times = wave(engine, users)
+    print(f"{name:>6}: загрузка снимка {load_ms:6.2f} мс, до меню p50 {statistics.median(times) * 1000:7.1f} мс, "
+          f"max {max(times) * 1000:7.1f} мс, запросов в бэкенд {api.calls}")
+    return engine
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 150) / 1000
+    print(f"Пользователей: {users}, задержка бэкенда: {latency * 1000:.0f} мс")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "nav.snapshot")
+        warmed = run("cold", users, latency)
+        warmed.save_snapshot(path)
+        print(f"снимок: {os.path.getsize(path)} байт")
+        run("warm", users, latency, path)
@@ -5,36 +5,243 @@
 1. pip install aiogram
 2. Заведите бота у @BotFather, получите токен.
 3. Установите переменную окружения BOT_TOKEN или измените `BOT_TOKEN` в коде.
+   Несколько ботов в одном процессе — BOTS_CONFIG (см. load_bots_config).
 4. python bot_interface.py
 """
 
 import asyncio
+import json
 import os
+import time
 from aiogram import Bot, Dispatcher, types
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
-from navigation.engine import NavigationEngine
-from navigation.api_stub import APISimulator
+from navigation.hosting import ApiClientPool, BotHost
+from navigation.scheduler import RateLimitedSender, ReminderScheduler, schedule_meeting_reminders
+from navigation.tracing import Tracer
 
-# Импортируем load_dotenv из python-dotenv
-from dotenv import load_dotenv
 
-# Загружаем переменные из .env файла
-load_dotenv()
+def _load_env():
+    """Подхватывает .env, если установлен python-dotenv."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
 
-# --- Конфигурация ---
-#BOT_TOKEN = os.getenv("BOT_TOKEN", "8354012195:AAF0WDGvFh3gX1wEbEOduat3g3nui8AbG-g")  # Замените на реальный токен или укажите в env
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-if not BOT_TOKEN:
-    raise ValueError("Не установлен BOT_TOKEN. Укажите его в файле .env или в переменной окружения.")
 
-# Инициализация бота и диспетчера
-bot = Bot(token=BOT_TOKEN)
+# Загружаем переменные из .env файла
+_load_env()
 
+# --- Конфигурация ---
+# Один процесс может обслуживать несколько ботов (школ): BOTS_CONFIG — путь к JSON
+# {"bots": [{"name": ..., "token": ..., "manifest": ..., "api_base_url": ..., "api_token": ...}]}.
+# Без него запускается один бот из BOT_TOKEN / API_BASE_URL / API_TOKEN.
+def load_bots_config() -> list:
+    config_path = os.getenv("BOTS_CONFIG")
+    if config_path:
+        with open(config_path, "r", encoding="utf-8") as f:
+            bots = json.load(f)["bots"]
+        for entry in bots:
+            if not entry.get("name") or not entry.get("token"):
+                raise ValueError(f"BOTS_CONFIG: у бота нужны 'name' и 'token': {entry}")
+        return bots
+    token = os.getenv("BOT_TOKEN")
+    if not token:
+        raise ValueError("Не установлен BOT_TOKEN. Укажите его в файле .env или в переменной окружения.")
+    return [{
+        "name": "default",
+        "token": token,
+        "manifest": "menu-manifest.json",
+        "api_base_url": os.getenv("API_BASE_URL"),
+        "api_token": os.getenv("API_TOKEN"),
+    }]
+
+
+BOTS_CONFIG = load_bots_config()
+
+# Один диспетчер на всех ботов: обработчик получает среду своего бота в `runtime`
 dp = Dispatcher()
 
-# Инициализация навигационного движка
-# Можно передать кастомный api_client, если нужен реальный API
-nav_engine = NavigationEngine(manifest_path="menu-manifest.json", api_client=APISimulator())
+# Трассировка включается переменной TRACE_FILE (JSON-lines), доля трасс — TRACE_SAMPLE_RATE
+TRACE_FILE = os.getenv("TRACE_FILE")
+if TRACE_FILE:
+    from navigation.tracing import JsonLinesExporter
+    trace_exporter = JsonLinesExporter(TRACE_FILE)
+else:
+    trace_exporter = None
+tracer = Tracer(trace_exporter, sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")))
+
+# Навигационные движки: манифесты с одинаковым содержимым, клиенты API и пул
+# запросов общие, сессии и метрики у каждого бота свои.
+# Бюджет памяти на сессии (байт) — на каждого бота; холодные сессии
+# выгружаются в SESSION_SPILL_DIR/<имя бота>
+SESSION_MEMORY_BUDGET = os.getenv("SESSION_MEMORY_BUDGET")
+host = BotHost(
+    clients=ApiClientPool(pool_size=int(os.getenv("API_POOL_SIZE", "8"))),
+    session_spill_dir=os.getenv("SESSION_SPILL_DIR"),
+    tracer=tracer,
+    memory_budget=int(SESSION_MEMORY_BUDGET) if SESSION_MEMORY_BUDGET else None
+)
+
+# Напоминания о встречах: журнал REMINDERS_FILE (на бота — с его именем)
+# переживает перезапуск, исходящий поток ограничен NOTIFY_RATE сообщений в секунду
+REMINDERS_FILE = os.getenv("REMINDERS_FILE", "reminders.jsonl")
+# Снимок кэшей источников и индексов для быстрого старта: читается при запуске,
+# пишется каждые SNAPSHOT_INTERVAL секунд и при остановке
+SNAPSHOT_FILE = os.getenv("SNAPSHOT_FILE")
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "300"))
+# После простоя накопившиеся апдейты сначала схлопываются (navigation.catchup):
+# устаревшие нажатия отбрасываются, остальное обрабатывается параллельно по чатам.
+# Движок блокирующий, поэтому обработчики вызывают его через instance.run (в потоке)
+# CATCH_UP=0 — обрабатывать очередь как есть
+CATCH_UP = os.getenv("CATCH_UP", "1") != "0"
+# AI-бэкенд для чат-режимов (ai_api экранов): запросы всех ботов собираются в батчи
+# не дольше AI_BATCH_WINDOW_MS или до AI_MAX_BATCH штук (navigation.ai_batch).
+# Без AI_BASE_URL ответ по-прежнему имитируется
+AI_BASE_URL = os.getenv("AI_BASE_URL")
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "20"))
+if AI_BASE_URL:
+    from navigation.ai_batch import AIBatchDispatcher
+    from navigation.http_client import HttpApiClient
+    ai_dispatcher = AIBatchDispatcher(
+        HttpApiClient(
+            AI_BASE_URL,
+            headers={"Authorization": f"Bearer {os.getenv('AI_TOKEN')}"} if os.getenv("AI_TOKEN") else None,
+            timeout=AI_TIMEOUT,
+            retries=0
+        ),
+        window_ms=float(os.getenv("AI_BATCH_WINDOW_MS", "5")),
+        max_batch=int(os.getenv("AI_MAX_BATCH", "16")),
+        timeout=AI_TIMEOUT
+    )
+else:
+    ai_dispatcher = None
+bot_loop = None
+
+
+def _per_bot_path(path: str, name: str) -> str:
+    return path if len(BOTS_CONFIG) == 1 else f"{path}.{name}"
+
+
+class BotRuntime:
+    """Всё, что относится к одному боту: Bot, движок, меню в чатах, напоминания."""
+
+    def __init__(self, entry: dict):
+        self.name = entry["name"]
+        self.bot = Bot(token=entry["token"])
+        self.instance = host.add(
+            self.name,
+            entry.get("manifest", "menu-manifest.json"),
+            api_base_url=entry.get("api_base_url"),
+            api_token=entry.get("api_token")
+        )
+        self.engine = self.instance.engine
+        self.api_client = self.engine.api_client
+        # Последнее сообщение с меню у каждого пользователя: (chat_id, message_id)
+        self.last_messages: dict = {}
+        self.reminders = ReminderScheduler(self.engine, _per_bot_path(REMINDERS_FILE, self.name))
+        self.snapshot_path = _per_bot_path(SNAPSHOT_FILE, self.name) if SNAPSHOT_FILE else None
+        if self.snapshot_path:
+            self.engine.load_snapshot(self.snapshot_path)
+        self.notifier = None
+        self.engine.add_ready_listener(self.on_data_ready)
+
+    async def refresh_menu(self, user_id: str):
+        """Перерисовывает меню, когда догрузились данные экрана (после «загрузки» или stale)."""
+        target = self.last_messages.get(user_id)
+        if target is None:
+            return
+        delta = await self.instance.run(user_id, self.engine.get_view_delta, user_id)
+        if not delta["changed"]:
+            return
+        view = delta["view"]
+        keyboard = actions_to_inline_keyboard(view["actions"]) if view["actions"] else None
+        with tracer.span("telegram.edit_message_text"):
+            await self.bot.edit_message_text(chat_id=target[0], message_id=target[1], text=view["text"], reply_markup=keyboard)
+
+    def save_snapshot(self):
+        if self.snapshot_path:
+            try:
+                self.engine.save_snapshot(self.snapshot_path)
+            except OSError as e:
+                self.engine.logger.log_error(f"Снимок {self.snapshot_path} не сохранён: {e!r}")
+
+    async def snapshot_loop(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            await asyncio.to_thread(self.save_snapshot)
+
+    def on_data_ready(self, user_id: str, request):
+        # Вызывается из фонового потока движка
+        if bot_loop is not None:
+            asyncio.run_coroutine_threadsafe(self.refresh_menu(user_id), bot_loop)
+
+    async def catch_up(self):
+        """Разбирает очередь апдейтов, накопившуюся за время простоя, до запуска polling."""
+        from navigation.catchup import collapse_backlog, replay_backlog
+
+        started = time.perf_counter()
+        allowed = dp.resolve_used_update_types()
+        backlog, offset = [], None
+        while True:
+            batch = await self.bot.get_updates(offset=offset, limit=100, timeout=0, allowed_updates=allowed)
+            if not batch:
+                break
+            backlog.extend(batch)
+            offset = batch[-1].update_id + 1
+        if not backlog:
+            return
+        # Одним запросом подтверждаем всю очередь: polling начнёт уже после неё
+        await self.bot.get_updates(offset=offset, limit=1, timeout=0, allowed_updates=allowed)
+        kept, dropped = collapse_backlog(backlog)
+
+        def on_error(update, error):
+            self.engine.logger.log_error(f"Апдейт {update.update_id} из очереди не обработан: {error!r}")
+
+        # Чаты обрабатываются одновременно: обработчики не держат event loop (instance.run)
+        await replay_backlog(kept, lambda update: dp.feed_update(self.bot, update), on_error)
+        elapsed = time.perf_counter() - started
+        self.instance.metrics.observe("catchup", elapsed)
+        self.engine.logger.logger.info(
+            f"Очередь после простоя: {len(backlog)} апдейтов, обработано {len(backlog) - len(dropped)}, "
+            f"отброшено {len(dropped)}, чатов {len(kept)}, {elapsed:.2f} с"
+        )
+
+    async def send_notification(self, user_id: str, view: dict):
+        """Отправка напоминания: новое сообщение с меню экрана встречи."""
+        keyboard = actions_to_inline_keyboard(view["actions"]) if view["actions"] else None
+        with tracer.span("telegram.send_message"):
+            sent = await self.bot.send_message(chat_id=int(user_id), text=view["text"], reply_markup=keyboard)
+        self.last_messages[user_id] = (sent.chat.id, sent.message_id)
+
+
+runtimes = {}
+for entry in BOTS_CONFIG:
+    runtime = BotRuntime(entry)
+    runtimes[runtime.bot.id] = runtime
+
+
+@dp.update.outer_middleware()
+async def trace_update(handler, event: types.Update, data: dict):
+    """
+    Корневой span на каждый апдейт: trace_id берётся из id бота и update_id
+    (update_id уникален только в пределах одного бота).
+    Здесь же апдейт привязывается к своему боту и попадает в его метрики.
+    """
+    bot_id = data["bot"].id
+    runtime = data["runtime"] = runtimes[bot_id]
+    started = time.perf_counter()
+    failed = False
+    trace_id = f"tg-{bot_id}-{event.update_id}"
+    try:
+        with tracer.span("telegram.update", trace_id=trace_id, event_type=event.event_type, bot=runtime.name):
+            return await handler(event, data)
+    except Exception:
+        failed = True
+        raise
+    finally:
+        runtime.instance.metrics.observe(f"update.{event.event_type}", time.perf_counter() - started, error=failed)
 
 # --- Вспомогательные функции ---
 
@@ -72,68 +279,102 @@ def actions_to_inline_keyboard(actions: list) -> types.InlineKeyboardMarkup:
 
     return types.InlineKeyboardMarkup(inline_keyboard=keyboard)
 
-def get_user_session(user_id: int) -> dict:
-    """Получает сессию пользователя из engine."""
+async def answer_callback(callback_query: types.CallbackQuery, text: str = None):
+    """Ответ на нажатие. Нажатие из очереди после простоя уже просрочено — это не ошибка."""
+    try:
+        with tracer.span("telegram.answer_callback_query"):
+            await callback_query.answer(text)
+    except TelegramBadRequest:
+        pass
+
+def get_user_session(runtime: BotRuntime, user_id: int) -> dict:
+    """Получает сессию пользователя из engine своего бота."""
     # В engine сессии хранятся по user_id (строке)
-    return nav_engine.get_user_state(str(user_id))
+    return runtime.engine.get_user_state(str(user_id))
 
 # --- Хендлеры ---
 
 @dp.message(Command("start"))
-async def cmd_start(message: types.Message):
+async def cmd_start(message: types.Message, runtime: BotRuntime):
     """Обработка команды /start."""
+    nav_engine, last_messages = runtime.engine, runtime.last_messages
     user_id = str(message.from_user.id)
-    nav_engine.init_user(user_id)
-    view = nav_engine.get_current_view(user_id)
+
+    def start():
+        nav_engine.init_user(user_id)
+        return nav_engine.get_view_delta(user_id)["view"]
+
+    view = await runtime.instance.run(user_id, start)
 
     text = view["text"]
     actions = view["actions"]
 
     keyboard = actions_to_inline_keyboard(actions) if actions else None
 
-    await message.answer(text=text, reply_markup=keyboard)
+    with tracer.span("telegram.send_message"):
+        sent = await message.answer(text=text, reply_markup=keyboard)
+    last_messages[user_id] = (sent.chat.id, sent.message_id)
+
+    # Встречи, о которых ещё не напоминали этому пользователю; клиент API
+    # блокирующий (таймауты и повторы), поэтому запрос — вне event loop
+    try:
+        meetings = await asyncio.to_thread(runtime.api_client.call, "/api/teacher/meetings")
+    except Exception:
+        meetings = []
+    schedule_meeting_reminders(runtime.reminders, user_id, meetings)
 
 @dp.callback_query()
-async def handle_callback(callback_query: types.CallbackQuery):
+async def handle_callback(callback_query: types.CallbackQuery, runtime: BotRuntime):
     """Обработка нажатия inline-кнопки."""
+    nav_engine, last_messages, bot = runtime.engine, runtime.last_messages, runtime.bot
     user_id = str(callback_query.from_user.id)
     # callback_data в формате "type|id"
     data_parts = callback_query.data.split("|", 1)
     if len(data_parts) != 2:
-        await callback_query.answer("Неверный формат данных кнопки.")
+        await answer_callback(callback_query, "Неверный формат данных кнопки.")
         return
 
     action_type, action_id = data_parts[0], data_parts[1]
-
-    # Получаем текущий список действий, чтобы найти полные данные
-    # Это не идеально, т.к. список мог измениться с момента отправки.
-    # Лучше было бы хранить `action_data` отдельно при отправке.
-    # Но для простоты и текущей архитектуры, попробуем найти по id.
-    current_view = nav_engine.get_current_view(user_id)
-    # Ищем action с нужным id
-    found_action = None
-    for action in current_view["actions"]:
-        if action["id"] == action_id:
-            found_action = action
-            break
+    # Diff строится от view последнего сообщения; кнопка старого сообщения — полная отрисовка
+    message_key = (callback_query.message.chat.id, callback_query.message.message_id)
+    older_message = last_messages.get(user_id) != message_key
+
+    def press():
+        # Получаем текущий список действий, чтобы найти полные данные
+        # Это не идеально, т.к. список мог измениться с момента отправки.
+        # Лучше было бы хранить `action_data` отдельно при отправке.
+        # Но для простоты и текущей архитектуры, попробуем найти по id.
+        current_view = nav_engine.get_current_view(user_id)
+        # Ищем action с нужным id
+        found = None
+        for action in current_view["actions"]:
+            if action["id"] == action_id:
+                found = action
+                break
+        if found is not None:
+            # Обновляем состояние через engine
+            nav_engine.handle_action(user_id, found)
+        # Новое состояние и его отличия от того, что уже показано
+        return found, nav_engine.get_view_delta(user_id, full=older_message)
+
+    found_action, delta = await runtime.instance.run(user_id, press)
 
     if not found_action:
-        await callback_query.answer("Данные кнопки устарели. Пожалуйста, обновите меню.")
+        await answer_callback(callback_query, "Данные кнопки устарели. Пожалуйста, обновите меню.")
         # Повторно отправляем текущее состояние
+        current_view = delta["view"]
         keyboard = actions_to_inline_keyboard(current_view["actions"]) if current_view["actions"] else None
-        await bot.edit_message_text(
-            chat_id=callback_query.message.chat.id,
-            message_id=callback_query.message.message_id,
-            text=current_view["text"],
-            reply_markup=keyboard
-        )
+        with tracer.span("telegram.edit_message_text"):
+            await bot.edit_message_text(
+                chat_id=callback_query.message.chat.id,
+                message_id=callback_query.message.message_id,
+                text=current_view["text"],
+                reply_markup=keyboard
+            )
         return
 
-    # Обновляем состояние через engine
-    nav_engine.handle_action(user_id, found_action)
-
-    # Получаем новое состояние
-    new_view = nav_engine.get_current_view(user_id)
+    last_messages[user_id] = message_key
+    new_view = delta["view"]
 
     text = new_view["text"]
     actions = new_view["actions"]
@@ -141,65 +382,126 @@ async def handle_callback(callback_query: types.CallbackQuery):
     keyboard = actions_to_inline_keyboard(actions) if actions else None
 
     # Отвечаем на callback (убирает "часики" у кнопки)
-    await callback_query.answer()
+    await answer_callback(callback_query)
+
+    if not delta["changed"]:
+        return  # на экране всё то же самое — сообщение не трогаем
 
     # Редактируем сообщение (или отправляем новое, если редактировать нельзя)
     # Некоторые типы сообщений (например, из уведомлений) нельзя редактировать.
     # Или если слишком старое. Обернём в try.
     try:
-        await bot.edit_message_text(
-            chat_id=callback_query.message.chat.id,
-            message_id=callback_query.message.message_id,
-            text=text,
-            reply_markup=keyboard
-        )
+        if delta["title"] is None and not delta["full"]:
+            # Изменились только кнопки — меняем одну клавиатуру
+            with tracer.span("telegram.edit_message_reply_markup"):
+                await bot.edit_message_reply_markup(
+                    chat_id=callback_query.message.chat.id,
+                    message_id=callback_query.message.message_id,
+                    reply_markup=keyboard
+                )
+            return
+        with tracer.span("telegram.edit_message_text"):
+            await bot.edit_message_text(
+                chat_id=callback_query.message.chat.id,
+                message_id=callback_query.message.message_id,
+                text=text,
+                reply_markup=keyboard
+            )
     except Exception:
         # Если редактировать нельзя, отправляем новое
-        await bot.send_message(
-            chat_id=callback_query.message.chat.id,
-            text=text,
-            reply_markup=keyboard
-        )
+        with tracer.span("telegram.send_message"):
+            sent = await bot.send_message(
+                chat_id=callback_query.message.chat.id,
+                text=text,
+                reply_markup=keyboard
+            )
+        last_messages[user_id] = (sent.chat.id, sent.message_id)
 
 @dp.message()
-async def handle_text_message(message: types.Message):
+async def handle_text_message(message: types.Message, runtime: BotRuntime):
     """Обработка текстового сообщения (для чат-режима)."""
+    nav_engine, last_messages = runtime.engine, runtime.last_messages
     user_id = str(message.from_user.id)
     text = message.text
 
-    # Проверяем, находится ли пользователь в чат-режиме
-    current_view = nav_engine.get_current_view(user_id)
-    if current_view.get("screen_type") == "chat_input":
-        # Передаём текст в engine
+    def enter_text():
+        # Текст ждут чат-режим и экраны поиска; на остальных он не нужен
+        current_view = nav_engine.get_current_view(user_id)
+        if current_view.get("screen_type") != "chat_input" and not current_view.get("accepts_input"):
+            return current_view, None, None
+        # Передаём текст в engine и получаем обновлённое состояние
         nav_engine.handle_user_input(user_id, text)
+        new_view = nav_engine.get_view_delta(user_id)["view"]
+        request = nav_engine.ai_request(user_id, text) if ai_dispatcher else None
+        return current_view, new_view, request
 
-        # Получаем обновлённое состояние
-        new_view = nav_engine.get_current_view(user_id)
-
-        # Если мы всё ещё в чат-режиме, просто отвечаем "принято"
-        # (в реальности, тут мог бы быть ответ от AI)
+    current_view, new_view, request = await runtime.instance.run(user_id, enter_text)
+    # Проверяем, находится ли пользователь в чат-режиме
+    if current_view.get("screen_type") == "chat_input":
+        # Если мы всё ещё в чат-режиме — отвечаем от AI (или имитацией, если AI не настроен)
         if new_view.get("screen_type") == "chat_input":
-            await message.answer("Сообщение отправлено. (Имитация)")
+            reply = "Сообщение отправлено. (Имитация)"
+            if request:
+                try:
+                    with tracer.span("ai.request", url=request[0]):
+                        future = ai_dispatcher.submit(*request, timeout=AI_TIMEOUT)
+                        response = await asyncio.wait_for(asyncio.wrap_future(future), AI_TIMEOUT)
+                    if not isinstance(response, dict) or "answer" not in response:
+                        raise ValueError(f"неожиданный ответ AI: {response!r}")
+                    reply = response["answer"]
+                except Exception as e:
+                    nav_engine.logger.log_error(f"AI-запрос пользователя {user_id} не выполнен: {e!r}")
+                    reply = "AI сейчас недоступен, попробуйте позже."
+            with tracer.span("telegram.send_message"):
+                await message.answer(reply or "…")
             return # Не обновляем клавиатуру, она не нужна в чате
 
         # Если вышли из чат-режима (например, по команде /finish)
         # Отправляем новое сообщение с новым меню
         keyboard = actions_to_inline_keyboard(new_view["actions"]) if new_view["actions"] else None
-        await message.answer(text=new_view["text"], reply_markup=keyboard)
+        with tracer.span("telegram.send_message"):
+            sent = await message.answer(text=new_view["text"], reply_markup=keyboard)
+        last_messages[user_id] = (sent.chat.id, sent.message_id)
+    elif current_view.get("accepts_input"):
+        # Экран поиска: текст — это запрос, в ответ отдаём отфильтрованные кнопки
+        keyboard = actions_to_inline_keyboard(new_view["actions"]) if new_view["actions"] else None
+        with tracer.span("telegram.send_message"):
+            sent = await message.answer(text=new_view["text"], reply_markup=keyboard)
+        last_messages[user_id] = (sent.chat.id, sent.message_id)
     else:
         # Если не в чат-режиме, просто отвечаем, что текст не ожидается
-        await message.answer("Пожалуйста, используйте кнопки для навигации.")
+        with tracer.span("telegram.send_message"):
+            await message.answer("Пожалуйста, используйте кнопки для навигации.")
 
 # --- Запуск бота ---
 
 async def main():
-    print("Бот запускается...")
-    # Запуск long polling
-    await dp.start_polling(bot)
+    global bot_loop
+    print(f"Бот запускается... ({len(runtimes)} шт.: {', '.join(r.name for r in runtimes.values())})")
+    bot_loop = asyncio.get_running_loop()
+    rate = float(os.getenv("NOTIFY_RATE", "25"))
+    background = []
+    for runtime in runtimes.values():
+        # Лимит Telegram считается на бота, поэтому и очередь у каждого своя
+        runtime.notifier = RateLimitedSender(runtime.send_notification, rate=rate, burst=int(rate))
+        background.append(asyncio.create_task(runtime.notifier.run()))
+        background.append(asyncio.create_task(runtime.reminders.run(runtime.notifier, runtime.instance.run)))
+        if runtime.snapshot_path:
+            background.append(asyncio.create_task(runtime.snapshot_loop()))
+    # Запуск long polling сразу для всех ботов
+    try:
+        if CATCH_UP:
+            await asyncio.gather(*(runtime.catch_up() for runtime in runtimes.values()))
+        await dp.start_polling(*(runtime.bot for runtime in runtimes.values()))
+    finally:
+        for task in background:
+            task.cancel()
+        for runtime in runtimes.values():
+            runtime.save_snapshot()
+        host.close()
+        if ai_dispatcher is not None:
+            ai_dispatcher.close()
+        tracer.flush()
 
 if __name__ == "__main__":
-    # Проверка, установлен ли токен
-    if BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-        print("Ошибка: Не установлен BOT_TOKEN. Укажите его в переменной окружения BOT_TOKEN или в коде.")
-        exit(1)
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,93 +1,109 @@
 import os
+import re
 import json
 import fnmatch
 import sys
+import time
 import base64
-from pathlib import Path
+import codecs
+import hashlib
+import mmap
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Размер порции при потоковом копировании (кратен 3 — base64 порций склеивается без паддинга)
+CHUNK_SIZE = 3 * (1 << 16)
+# Файлы не больше этого размера читаются целиком в пуле потоков, остальные — потоково
+PREFETCH_LIMIT = 1 << 20
+READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Индекс рядом с дампом: путь -> (размер, mtime, хэш, смещение и длина блока в дампе)
+INDEX_SUFFIX = ".index.json"
+INDEX_FORMAT = 1
 
 def load_config(config_path=None):
     """Загрузка конфигурации из JSON файла"""
     if config_path is None:
         config_path = "makedump.json"
-    
+
     with open(config_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
+def compile_patterns(patterns):
+    """Склеивает набор glob-шаблонов в одно регулярное выражение (None для пустого набора)"""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(os.path.normcase(p))})" for p in patterns))
+
+class PatternMatcher:
+    """Скомпилированная пара include/exclude: вызывается для каждого имени"""
+
+    def __init__(self, include_patterns, exclude_patterns):
+        self._include = compile_patterns(include_patterns)
+        self._exclude = compile_patterns(exclude_patterns)
+        self._include_all = not include_patterns
+
+    def __call__(self, name):
+        name = os.path.normcase(name)
+        if self._exclude is not None and self._exclude.match(name):
+            return False
+        return self._include_all or self._include.match(name) is not None
+
 def should_include(name, include_patterns, exclude_patterns):
     """Проверяет, должен ли быть включен файл/папка по шаблонам"""
-    # Проверка исключений
-    for exclude in exclude_patterns:
-        if fnmatch.fnmatch(name, exclude):
-            return False
-    
-    # Если нет явных включений, включаем всё
-    if not include_patterns:
-        return True
-    
-    # Проверка включений
-    for include in include_patterns:
-        if fnmatch.fnmatch(name, include):
-            return True
-    
-    return False
+    return PatternMatcher(include_patterns, exclude_patterns)(name)
 
 def get_tree_structure(root_dir, file_include_patterns, file_exclude_patterns, folder_exclude_patterns, prefix=""):
     """Рекурсивно строит древовидную структуру директорий и файлов"""
+    return _tree_lines(
+        root_dir,
+        PatternMatcher(file_include_patterns, file_exclude_patterns),
+        PatternMatcher(["*"], folder_exclude_patterns),
+        prefix
+    )
+
+def _tree_lines(root_dir, file_matcher, folder_matcher, prefix):
     result = []
     try:
-        items = sorted(os.listdir(root_dir))
+        with os.scandir(root_dir) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
     except PermissionError:
         return result
-    
+
     # Фильтруем папки - исключаем только по folder_exclude_patterns
-    dirs = [item for item in items 
-            if os.path.isdir(os.path.join(root_dir, item)) 
-            and should_include(item, ["*"], folder_exclude_patterns)]
-    
+    dirs = [entry for entry in entries if entry.is_dir() and folder_matcher(entry.name)]
     # Фильтруем файлы - по file_include_patterns и file_exclude_patterns
-    files = [item for item in items 
-             if not os.path.isdir(os.path.join(root_dir, item)) 
-             and should_include(item, file_include_patterns, file_exclude_patterns)]
-    
+    files = [entry for entry in entries if not entry.is_dir() and file_matcher(entry.name)]
+
     # Сортируем: сначала папки, потом файлы
     items = dirs + files
-    
+
     pointers = ["├── "] * (len(items) - 1) + ["└── "]
-    
-    for pointer, item in zip(pointers, items):
-        path = os.path.join(root_dir, item)
-        rel_path = os.path.relpath(path, Path(root_dir).parent)
-        
-        result.append(f"{prefix}{pointer}{item}")
-        
-        if os.path.isdir(path):
+
+    for index, (pointer, entry) in enumerate(zip(pointers, items)):
+        result.append(f"{prefix}{pointer}{entry.name}")
+
+        if index < len(dirs):
             extension = "│   " if pointer == "├── " else "    "
-            result.extend(get_tree_structure(
-                path, 
-                file_include_patterns, 
-                file_exclude_patterns, 
-                folder_exclude_patterns, 
-                prefix + extension
-            ))
-    
+            result.extend(_tree_lines(entry.path, file_matcher, folder_matcher, prefix + extension))
+
     return result
 
 def dump_folders(config, output_file):
     """Дамп структуры папок"""
     print(">>> FOLDERS >>>", file=output_file)
-    
+
     for source in config['folders']['sources']:
         root = source['root']
         if root == ".":
             root = os.getcwd()
-        
+
         # Для папок: включаем ВСЕ папки (кроме исключенных), но фильтруем файлы по шаблонам
         file_include = source.get('include', [])
         file_exclude = source.get('exclude', [])
         folder_exclude = source.get('exclude', [])  # Для папок используем только exclude
-        
+
         output_template = config['folders']['output']
-        
+
         # Если шаблон содержит древовидную структуру
         if "├──" in output_template or "└──" in output_template:
             tree_lines = get_tree_structure(root, file_include, file_exclude, folder_exclude)
@@ -95,14 +111,15 @@ def dump_folders(config, output_file):
                 print(line, file=output_file)
         else:
             # Обычный вывод плоского списка
+            folder_matcher = PatternMatcher(["*"], folder_exclude)
             for dirpath, dirnames, filenames in os.walk(root):
                 # Фильтруем папки
-                dirnames[:] = [d for d in dirnames if should_include(d, ["*"], folder_exclude)]
-                
+                dirnames[:] = [d for d in dirnames if folder_matcher(d)]
+
                 for dirname in dirnames:
                     full_path = os.path.join(dirpath, dirname)
                     rel_path = os.path.relpath(full_path, root)
-                    
+
                     output_line = output_template
                     if "@.name" in output_line:
                         output_line = output_line.replace('@.name', dirname)
@@ -110,60 +127,295 @@ def dump_folders(config, output_file):
                         output_line = output_line.replace('@.path', rel_path)
                     print(output_line, file=output_file)
 
-def dump_files(config, output_file):
-    """Дамп содержимого файлов"""
+def iter_source_files(root, include, exclude, exclude_dirs):
+    """Обход дерева с отсечением исключённых папок: в них os.walk даже не заходит"""
+    file_matcher = PatternMatcher(include, exclude)
+    dir_matcher = PatternMatcher([], exclude_dirs)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if dir_matcher(d)]
+        for filename in filenames:
+            if file_matcher(filename):
+                file_path = os.path.join(dirpath, filename)
+                yield file_path, os.path.relpath(file_path, root)
+
+class DumpWriter:
+    """
+    Бинарный вывод с учётом позиции: смещения блоков попадают в индекс.
+    Копирования соседних диапазонов из прошлого дампа склеиваются в одно.
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self.pos = 0
+        self._pending = None  # (fd, offset, length) — отложенное копирование
+
+    def write(self, text):
+        self.write_bytes(text.encode('utf-8'))
+
+    def write_bytes(self, data):
+        self._flush_copy()
+        self._f.write(data)
+        self.pos += len(data)
+
+    def copy_range(self, src_fd, offset, length):
+        """Копирует диапазон байт из другого файла (предыдущего дампа)"""
+        pending = self._pending
+        if pending and pending[0] == src_fd and pending[1] + pending[2] == offset:
+            self._pending = (src_fd, pending[1], pending[2] + length)
+        else:
+            self._flush_copy()
+            self._pending = (src_fd, offset, length)
+        self.pos += length
+
+    def _flush_copy(self):
+        if self._pending is None:
+            return
+        src_fd, offset, length = self._pending
+        self._pending = None
+        self._f.flush()
+        dst_fd = self._f.fileno()
+        while length > 0:
+            try:
+                copied = os.copy_file_range(src_fd, dst_fd, length, offset)
+            except (AttributeError, OSError):
+                # Нет copy_file_range (не Linux или разные ФС) — обычное копирование порциями
+                data = os.pread(src_fd, min(length, CHUNK_SIZE), offset)
+                copied = os.write(dst_fd, data)
+            if copied == 0:
+                raise IOError("Предыдущий дамп короче, чем указано в индексе")
+            offset += copied
+            length -= copied
+
+    def flush(self):
+        self._flush_copy()
+        self._f.flush()
+
+def _scan_file(file_path):
+    """Один проход по большому файлу: хэш и проверка, что это валидный UTF-8"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    digest = hashlib.blake2b(digest_size=16)
+    is_text = True
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            if is_text:
+                try:
+                    decoder.decode(chunk)
+                except UnicodeDecodeError:
+                    is_text = False
+    if is_text:
+        try:
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            is_text = False
+    return is_text, digest.hexdigest()
+
+def read_file(file_path):
+    """
+    Выполняется в пуле потоков. Маленькие файлы читаются целиком,
+    для больших только определяется, текст это или бинарные данные.
+    Возвращает (вид, содержимое, размер в байтах, хэш содержимого).
+    """
+    size = os.path.getsize(file_path)
+    if size > PREFETCH_LIMIT:
+        is_text, digest = _scan_file(file_path)
+        return ("text_stream" if is_text else "binary_stream"), None, size, digest
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+    try:
+        # Как при чтении в текстовом режиме: универсальные переводы строк
+        text = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        return "text", text, len(raw), digest
+    except UnicodeDecodeError:
+        # Если не текстовый, кодируем в base64
+        return "text", base64.b64encode(raw).decode('ascii'), len(raw), digest
+
+def stream_file_data(file_path, kind, output_file):
+    """Копирует содержимое большого файла в вывод порциями"""
+    if kind == "text_stream":
+        with open(file_path, 'r', encoding='utf-8') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                output_file.write(chunk)
+    else:
+        # Бинарные данные кодируем в base64 прямо из отображения файла в память
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in range(0, len(mm), CHUNK_SIZE):
+                output_file.write_bytes(base64.b64encode(mm[start:start + CHUNK_SIZE]))
+
+class PreviousDump:
+    """Предыдущий полный дамп и его индекс — источник неизменившихся блоков"""
+
+    def __init__(self, output_path, template):
+        self.entries = {}
+        self.fd = None
+        try:
+            with open(output_path + INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get("format") != INDEX_FORMAT or index.get("template") != template:
+                return
+            if os.path.getsize(output_path) != index["dump_size"]:
+                return  # дамп меняли руками — смещениям верить нельзя
+            self.fd = os.open(output_path, os.O_RDONLY)
+            self.entries = index["files"]
+        except (OSError, ValueError, KeyError):
+            self.entries = {}
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+def _ordered_reads(executor, paths, window, previous):
+    """
+    Как executor.map, но держит в полёте не больше `window` файлов.
+    Файлы с теми же размером и mtime, что в индексе, не читаются вовсе.
+    """
+    pending = deque()
+    for file_path, rel_path, key in paths:
+        st = os.stat(file_path)
+        entry = previous.entries.get(key) if previous else None
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            pending.append(((file_path, rel_path, key, st), None, entry))
+        else:
+            pending.append(((file_path, rel_path, key, st), executor.submit(read_file, file_path), entry))
+        if len(pending) >= window:
+            queued, future, entry = pending.popleft()
+            yield queued, (future.result() if future else None), entry
+    while pending:
+        queued, future, entry = pending.popleft()
+        yield queued, (future.result() if future else None), entry
+
+def dump_files(config, output_file, stats=None, previous=None, delta=False, skip_paths=()):
+    """
+    Дамп содержимого файлов в DumpWriter. Возвращает (stats, индекс).
+    С `previous` неизменившиеся файлы копируются из прошлого дампа по смещению;
+    с `delta=True` они пропускаются, а в конце перечисляются удалённые файлы.
+    `skip_paths` — абсолютные пути собственных файлов дампера (дамп, индекс).
+    """
     print(">>> FILES >>>", file=output_file)
-    
-    for source in config['files']['sources']:
-        root = source['root']
-        if root == ".":
-            root = os.getcwd()
-        
-        include = source['include']
-        exclude = source['exclude']
-        
-        for dirpath, dirnames, filenames in os.walk(root):
-            for filename in filenames:
-                if should_include(filename, include, exclude):
-                    file_path = os.path.join(dirpath, filename)
-                    rel_path = os.path.relpath(file_path, root)
-                    
-                    try:
-                        # Пробуем прочитать как текстовый файл
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                    except UnicodeDecodeError:
-                        # Если не текстовый, читаем как бинарный и кодируем в base64
-                        with open(file_path, 'rb') as f:
-                            content = base64.b64encode(f.read()).decode('ascii')
-                    
-                    output = config['files']['output']
-                    output = output.replace('@.name', rel_path)
-                    output = output.replace('@.data', content)
-                    print(output, file=output_file)
+    if stats is None:
+        stats = {"files": 0, "bytes_read": 0, "reused": 0, "deleted": 0}
+    template = config['files']['output']
+    index = {}
+
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+        for source in config['files']['sources']:
+            root = source['root']
+            if root == ".":
+                root = os.getcwd()
+
+            files = (
+                (file_path, rel_path, f"{source['root']}|{rel_path}")
+                for file_path, rel_path in iter_source_files(root, source['include'], source['exclude'], source.get('exclude_dirs', []))
+                if os.path.abspath(file_path) not in skip_paths
+            )
+            for (file_path, rel_path, key, st), result, entry in _ordered_reads(executor, files, READ_WORKERS * 4, previous):
+                stats["files"] += 1
+                digest = entry["hash"] if result is None else result[3]
+                record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+                if entry is not None and entry["hash"] == digest:
+                    # Содержимое не изменилось: блок берём из прошлого дампа
+                    stats["reused"] += 1
+                    if not delta:
+                        record["offset"], record["length"] = output_file.pos, entry["length"]
+                        output_file.copy_range(previous.fd, entry["offset"], entry["length"])
+                    index[key] = record
+                    continue
+
+                kind, content, size, _ = result
+                stats["bytes_read"] += size
+                record["offset"] = output_file.pos
+                # Шаблон режем по @.data, содержимое пишем между кусками
+                parts = template.replace('@.name', rel_path).split('@.data')
+                output_file.write(parts[0])
+                for part in parts[1:]:
+                    if kind == "text":
+                        output_file.write(content)
+                    else:
+                        stream_file_data(file_path, kind, output_file)
+                    output_file.write(part)
+                output_file.write("\n")
+                record["length"] = output_file.pos - record["offset"]
+                index[key] = record
+
+    if delta and previous:
+        deleted = sorted(key for key in previous.entries if key not in index)
+        print(">>> DELETED >>>", file=output_file)
+        for key in deleted:
+            print(key.split("|", 1)[1], file=output_file)
+        stats["deleted"] = len(deleted)
+    return stats, index
+
+def write_index(output_path, template, index):
+    tmp_path = output_path + INDEX_SUFFIX + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "format": INDEX_FORMAT,
+            "template": template,
+            "dump_size": os.path.getsize(output_path),
+            "files": index
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, output_path + INDEX_SUFFIX)
 
 def main():
     """Основная функция"""
     # Парсинг аргументов
     config_path = None
     output_path = "output.txt"
-    
+    # --incremental: полный дамп, неизменившиеся файлы копируются из прошлого дампа
+    # --delta: в <output>.delta только изменённые и удалённые файлы относительно прошлого дампа
+    incremental = False
+    delta = False
+
     for arg in sys.argv[1:]:
-        if arg.endswith('.json'):
+        if arg == "--incremental":
+            incremental = True
+        elif arg == "--delta":
+            delta = True
+        elif arg.endswith('.json'):
             config_path = arg
         else:
             output_path = arg
-    
+
     config = load_config(config_path)
-    
+    template = config['files']['output']
+
     # Создание директории для выходного файла если нужно
     os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else '.', exist_ok=True)
-    
-    with open(output_path, 'w', encoding='utf-8') as output_file:
-        dump_folders(config, output_file)
-        dump_files(config, output_file)
-    
-    print(f"Дамп успешно создан: {output_path}")
+
+    started = time.perf_counter()
+    previous = PreviousDump(output_path, template) if (incremental or delta) else None
+    # Пишем во временный файл: прошлый дамп нужен как источник блоков до конца
+    target_path = output_path + ".delta" if delta else output_path
+    tmp_path = target_path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as raw_file:
+            output_file = DumpWriter(raw_file)
+            if not delta:
+                dump_folders(config, output_file)
+            own_files = {os.path.abspath(p) for p in (output_path, output_path + INDEX_SUFFIX, target_path, tmp_path)}
+            stats, index = dump_files(config, output_file, previous=previous, delta=delta, skip_paths=own_files)
+            output_file.flush()
+    finally:
+        if previous:
+            previous.close()
+    os.replace(tmp_path, target_path)
+    if not delta:
+        write_index(output_path, template, index)
+    elapsed = time.perf_counter() - started
+
+    print(f"Дамп успешно создан: {target_path}")
+    print(
+        f"Файлов: {stats['files']} (из прошлого дампа: {stats['reused']}, удалено: {stats['deleted']}), "
+        f"прочитано {stats['bytes_read']} байт, записано {os.path.getsize(target_path)} байт за {elapsed:.3f} с"
+    )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,142 @@
+# navigation/actions.py
+"""
+Кнопки view без dict на каждую кнопку каждого рендера.
+
+Action — объект со слотами, который читается как dict (Mapping): `a["label"]`,
+`a.get("context")`, `"target" in a`, `dict(a)` и сравнение с обычным dict
+работают как раньше, поэтому интерфейсы и тесты не меняются. Поле, которого
+у кнопки нет, — это незаполненный слот: в ключи оно не попадает.
+
+Кнопки, не зависящие от пользователя (статические, элементы `items`,
+листание, «Назад»), движок строит один раз на экран и переиспользует;
+id вида `dynamic_N` берутся из заранее построенной таблицы.
+"""
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+# Типы действий — интернированные константы
+NAVIGATE = sys.intern("navigate")
+ACTION = sys.intern("action")
+BACK = sys.intern("back")
+PAGINATE = sys.intern("paginate")
+UNKNOWN = sys.intern("unknown")
+
+# Порядок полей совпадает с порядком ключей в прежних dict-кнопках
+FIELDS = ("id", "label", "type", "target", "action", "payload", "context", "direction", "screen_id")
+_FIELD_SET = frozenset(FIELDS)
+
+
+def _ids(prefix: str, count: int):
+    return tuple(sys.intern(f"{prefix}_{i}") for i in range(count))
+
+
+_DYNAMIC_IDS = _ids("dynamic", 256)
+
+
+def dynamic_id(i: int) -> str:
+    return _DYNAMIC_IDS[i] if i < len(_DYNAMIC_IDS) else f"dynamic_{i}"
+
+
+_set = object.__setattr__
+
+
+class Action(Mapping):
+    """
+    Неизменяемая кнопка: общие экземпляры разделяются между пользователями,
+    поэтому поля задаются только при создании — нужна правка, берите
+    `to_dict()`. Все конструкторы (`__init__`, `navigation`) проходят
+    через этот класс.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, action_id: str, label: str, action_type: str, **fields: Any):
+        _set(self, "id", action_id)
+        _set(self, "label", label)
+        _set(self, "type", action_type)
+        for name, value in fields.items():
+            if name not in _FIELD_SET:
+                raise TypeError(f"Неизвестное поле кнопки: {name}")
+            _set(self, name, value)
+
+    @classmethod
+    def navigation(cls, action_id: str, label: str, target: str, context: Optional[Dict[str, Any]] = None) -> "Action":
+        """
+        Кнопка перехода без разбора **fields — динамических кнопок на рендер
+        больше всего. Слоты пишутся их дескрипторами: это быстрее
+        object.__setattr__ и не проходит через запрещающий __setattr__.
+        """
+        action = _new(cls)
+        _SET_ID(action, action_id)
+        _SET_LABEL(action, label)
+        _SET_TYPE(action, NAVIGATE)
+        _SET_TARGET(action, target)
+        if context is not None:
+            _SET_CONTEXT(action, context)
+        return action
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("Action неизменяем: используйте to_dict()")
+
+    def __delattr__(self, name: str):
+        raise AttributeError("Action неизменяем: используйте to_dict()")
+
+    def __reduce__(self):
+        # Слоты восстанавливаются не через __setattr__
+        return _restore, (tuple((name, getattr(self, name)) for name in self),)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in _FIELD_SET and hasattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in FIELDS if hasattr(self, name))
+
+    def __len__(self) -> int:
+        return sum(1 for name in FIELDS if hasattr(self, name))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Обычный dict для тех, кому нужна изменяемая копия или JSON."""
+        return {name: getattr(self, name) for name in self}
+
+    def __repr__(self) -> str:
+        return f"Action({self.to_dict()!r})"
+
+
+_new = object.__new__
+_SET_ID, _SET_LABEL, _SET_TYPE, _SET_TARGET, _SET_CONTEXT = (
+    getattr(Action, name).__set__ for name in ("id", "label", "type", "target", "context")
+)
+
+
+def _restore(fields) -> Action:
+    action = object.__new__(Action)
+    for name, value in fields:
+        _set(action, name, value)
+    return action
+
+
+def navigate(action_id: str, label: str, target: str, context: Optional[Dict[str, Any]] = None) -> Action:
+    return Action.navigation(action_id, label, target, context)
+
+
+def back(label: str) -> Action:
+    return Action("back", label, BACK)
+
+
+def paginate(label: str, direction: str, screen_id: str) -> Action:
+    action_id = "next_page" if direction == "next" else "prev_page"
+    return Action(action_id, label, PAGINATE, direction=direction, screen_id=screen_id)
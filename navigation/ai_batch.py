@@ -0,0 +1,268 @@
+# navigation/ai_batch.py
+"""
+Микро-батчинг запросов к AI-бэкенду (ai_api экранов chat_mode и ai_help).
+
+Запросы копятся в очереди не дольше `window_ms` или до `max_batch` штук и
+уходят одним POST на батч-эндпоинт:
+
+    -> {"requests": [{"id": "0", "url": "/api/ai/help", "body": {...}}, ...]}
+    <- {"responses": [{"id": "0", "response": {...}} | {"id": "1", "error": "..."}]}
+
+Ответы раскладываются по Future отправителей. Вызов модели — не
+идемпотентный POST, поэтому ни батч, ни одиночный запрос не повторяются.
+По одному на свои url запросы батча уходят, только если батч точно не
+дошёл до модели: не удалось подключиться, либо бэкенд ответил 4xx или
+ответом не того вида (батч-эндпоинта нет — тогда батчинг выключается на
+`batch_retry_after` секунд). Если батч мог дойти (таймаут, обрыв, 5xx),
+его запросы завершаются ошибкой, как и запрос, чей ответ не пришёл в
+батче. Таймаут — на каждый запрос: просроченный до отправки в бэкенд не
+уходит, ответ на него не ждут.
+
+    dispatcher = AIBatchDispatcher(HttpApiClient(AI_BASE_URL))
+    answer = dispatcher.request(*engine.ai_request(user_id, text), timeout=10)
+"""
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+
+from .http_client import ApiError
+
+
+class _Pending:
+    __slots__ = ("url", "body", "deadline", "enqueued", "future")
+
+    def __init__(self, url: str, body: Dict[str, Any], deadline: float):
+        self.url = url
+        self.body = body
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.future: Future = Future()
+
+
+class AIBatchDispatcher:
+    def __init__(
+        self,
+        client: Any,
+        batch_url: str = "/api/ai/batch",
+        window_ms: float = 5.0,
+        max_batch: int = 16,
+        timeout: float = 10.0,
+        max_in_flight: int = 4,
+        batch_retry_after: float = 30.0,
+        logger: Optional[Any] = None
+    ):
+        self.client = client
+        self.batch_url = batch_url
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.batch_retry_after = batch_retry_after
+        self.logger = logger
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        # Батчи и одиночные запросы уходят из пула: сборщик не ждёт бэкенд
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="ai-batch")
+        self._batch_disabled_until = 0.0
+        self._lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._waits: deque = deque(maxlen=4096)
+        self._counters: Counter = Counter()
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect, name="ai-batch-collector", daemon=True)
+        self._collector.start()
+
+    # --- интерфейс ---
+
+    def submit(self, url: str, body: Dict[str, Any], timeout: Optional[float] = None) -> Future:
+        """Ставит запрос в очередь; Future получит ответ бэкенда или исключение."""
+        if self._closed:
+            raise RuntimeError("AIBatchDispatcher закрыт")
+        pending = _Pending(url, body, time.monotonic() + (timeout or self.timeout))
+        with self._lock:
+            self._counters["requests"] += 1
+        self._queue.put(pending)
+        return pending.future
+
+    def request(self, url: str, body: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """Синхронный вариант submit: ждёт ответ не дольше таймаута запроса."""
+        timeout = timeout or self.timeout
+        future = self.submit(url, body, timeout)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self._counters["timeouts"] += 1
+            raise TimeoutError(f"AI-запрос {url} не уложился в {timeout} с")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = dict(sorted(self._batch_sizes.items()))
+            waits = sorted(self._waits)
+            counters = dict(self._counters)
+        groups = sum(sizes.values())
+        return {
+            "requests": counters.get("requests", 0),
+            # размер группы, собранной за окно (1 — ушёл одиночным запросом)
+            "batch_sizes": sizes,
+            "avg_batch": round(sum(size * count for size, count in sizes.items()) / groups, 2) if groups else 0.0,
+            "batch_requests": counters.get("batch_requests", 0),
+            "single_requests": counters.get("single_requests", 0),
+            "fallback_batches": counters.get("fallback_batches", 0),
+            "expired": counters.get("expired", 0),
+            "timeouts": counters.get("timeouts", 0),
+            "errors": counters.get("errors", 0),
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+            "p95_wait_ms": round(waits[int(len(waits) * 0.95)] * 1000, 3) if waits else 0.0,
+        }
+
+    def close(self):
+        """Останавливает сборщик; ещё не отправленные запросы завершаются ошибкой."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._collector.join()
+        self._executor.shutdown(wait=True)
+
+    # --- сборщик ---
+
+    def _collect(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            window_end = time.monotonic() + self.window
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = window_end - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if stop:
+                break
+        # Закрытие: всё, что осталось в очереди, отклоняем
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(RuntimeError("AIBatchDispatcher закрыт"))
+
+    def _dispatch(self, batch: List[_Pending]):
+        now = time.monotonic()
+        live = []
+        for item in batch:
+            # Отменённые (вызвавший уже не ждёт) пропускаем, просроченные не отправляем
+            if not item.future.set_running_or_notify_cancel():
+                continue
+            if item.deadline <= now:
+                item.future.set_exception(TimeoutError(f"AI-запрос {item.url} просрочен в очереди"))
+                with self._lock:
+                    self._counters["expired"] += 1
+                continue
+            live.append(item)
+        if not live:
+            return
+        with self._lock:
+            self._batch_sizes[len(live)] += 1
+            self._waits.extend(now - item.enqueued for item in live)
+        if len(live) == 1 or now < self._batch_disabled_until:
+            for item in live:
+                self._executor.submit(self._send_single, item)
+        else:
+            self._executor.submit(self._send_batch, live)
+
+    def _send_batch(self, batch: List[_Pending]):
+        with self._lock:
+            self._counters["batch_requests"] += 1
+        payload = {"requests": [{"id": str(i), "url": item.url, "body": item.body} for i, item in enumerate(batch)]}
+        timeout = max(0.001, max(item.deadline for item in batch) - time.monotonic())
+        try:
+            response = self.client.call(self.batch_url, "POST", json=payload, timeout=timeout,
+                                        deadline=max(item.deadline for item in batch),
+                                        idempotent=False, raise_errors=True)
+        except ApiError as e:
+            self._log_error(f"AI-батч из {len(batch)} запросов: {e}")
+            if e.sent and (e.status is None or e.status >= 500):
+                # Батч мог дойти до модели: повтор по одному спросил бы её дважды
+                self._fail(batch, e)
+                return
+            # Не подключились или эндпоинт отверг батч (4xx) — модель его не видела
+            self._fallback(batch, disable=e.status is not None)
+            return
+        except Exception as e:
+            self._log_error(f"AI-батч из {len(batch)} запросов: {e!r}")
+            self._fail(batch, e)
+            return
+        results = response.get("responses") if isinstance(response, dict) else None
+        if not isinstance(results, list):
+            # Ответ не того вида — батч-эндпоинта нет; какое-то время не батчим
+            self._fallback(batch, disable=True)
+            return
+
+        by_id = {str(result.get("id")): result for result in results if isinstance(result, dict)}
+        for i, item in enumerate(batch):
+            result = by_id.get(str(i))
+            if result is None or "error" in result:
+                with self._lock:
+                    self._counters["errors"] += 1
+                error = result["error"] if result is not None else "ответ не пришёл в батче"
+                item.future.set_exception(RuntimeError(f"AI-бэкенд: {error}"))
+            else:
+                item.future.set_result(result.get("response"))
+
+    def _fallback(self, batch: List[_Pending], disable: bool):
+        with self._lock:
+            self._counters["fallback_batches"] += 1
+        if disable:
+            self._batch_disabled_until = time.monotonic() + self.batch_retry_after
+        for item in batch:
+            self._send_single_async(item)
+
+    def _fail(self, batch: List[_Pending], error: Exception):
+        with self._lock:
+            self._counters["errors"] += len(batch)
+        for item in batch:
+            item.future.set_exception(error)
+
+    def _send_single_async(self, item: _Pending):
+        try:
+            self._executor.submit(self._send_single, item)
+        except RuntimeError:
+            self._send_single(item)  # пул уже останавливается (close) — отправляем здесь
+
+    def _send_single(self, item: _Pending):
+        remaining = item.deadline - time.monotonic()
+        if remaining <= 0:
+            with self._lock:
+                self._counters["expired"] += 1
+            item.future.set_exception(TimeoutError(f"AI-запрос {item.url} просрочен"))
+            return
+        with self._lock:
+            self._counters["single_requests"] += 1
+        try:
+            result = self.client.call(item.url, "POST", json=item.body, timeout=remaining, deadline=item.deadline,
+                                      idempotent=False, raise_errors=True)
+        except Exception as e:
+            with self._lock:
+                self._counters["errors"] += 1
+            item.future.set_exception(e)
+            return
+        item.future.set_result(result)
+
+    def _log_error(self, message: str):
+        if self.logger:
+            self.logger.log_error(message)
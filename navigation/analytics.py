@@ -0,0 +1,261 @@
+# navigation/analytics.py
+"""
+Колоночное append-only хранилище событий выбора.
+
+События лежат в массивах `array.array` (по колонке на поле), строки —
+в общей таблице интернирования, в колонках хранятся только их номера.
+Заполненные данные сбрасываются в сегменты на диске, которые затем читаются
+через mmap без копирования (memoryview.cast поверх отображения). Таблица
+строк одна на каталог (strings.jsonl): при сбросе в неё дописываются только
+новые строки, а сегмент хранит лишь их число на момент записи.
+
+Агрегации — обычный проход Python по элементам колонок (map/compress/zip
+и Counter): без копирования колонок, но и без векторных операций.
+Исключение — recent_context, который зовётся на каждый показ quick_grade:
+последние значения по (user, key) держатся в маленьком индексе, который
+обновляется в append и перестраивается при открытии каталога.
+
+Сброс в сегмент автоматический: по числу накопленных событий
+(`flush_every`) или по времени с прошлого сброса (`flush_interval`).
+
+Две таблицы:
+- events:   user, screen, target, timestamp — по строке на выбор;
+- contexts: user, key, value, label, timestamp — по строке на каждый
+  `*_id` из контекста перехода (label берётся из парного `*_name`).
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import Counter
+from itertools import compress
+from typing import Any, Dict, List, Optional, Tuple
+
+SEGMENT_MAGIC = b"NSELSEG2"  # 8 байт: колонки начинаются выровненными
+STRINGS_FILE = "strings.jsonl"  # по строке JSON на номер, начиная с 1
+EVENT_COLUMNS = (("user", "I"), ("screen", "I"), ("target", "I"), ("timestamp", "d"))
+CONTEXT_COLUMNS = (("user", "I"), ("key", "I"), ("value", "I"), ("label", "I"), ("timestamp", "d"))
+_NO_STRING = 0  # номер 0 зарезервирован под «нет значения»
+RECENT_LIMIT = 16  # сколько последних значений на (user, key) держит индекс
+
+
+class _Table:
+    """Набор колонок одинаковой длины: в памяти (array) или из сегмента (memoryview)."""
+
+    def __init__(self, spec, columns=None):
+        self.spec = spec
+        self.columns = columns or {name: array(code) for name, code in spec}
+
+    def append(self, *values):
+        for (name, _), value in zip(self.spec, values):
+            self.columns[name].append(value)
+
+    def __len__(self):
+        return len(self.columns[self.spec[0][0]])
+
+
+class Segment:
+    """Сегмент на диске, отображённый в память только для чтения."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError(f"Не сегмент событий: {path}")
+        # Формат: magic | колонки (выровнены по 8) | заголовок JSON | длина заголовка (<Q)
+        header_len = struct.unpack_from("<Q", self._mmap, len(self._mmap) - 8)[0]
+        header_start = len(self._mmap) - 8 - header_len
+        self.header = json.loads(self._mmap[header_start:header_start + header_len].decode("utf-8"))
+        view = memoryview(self._mmap)
+        self.events = self._table(view, EVENT_COLUMNS, self.header["events"])
+        self.contexts = self._table(view, CONTEXT_COLUMNS, self.header["contexts"])
+
+    @staticmethod
+    def _table(view, spec, layout):
+        columns = {}
+        for name, code in spec:
+            offset, nbytes = layout[name]
+            columns[name] = view[offset:offset + nbytes].cast(code)
+        return _Table(spec, columns)
+
+
+class SelectionStore:
+    def __init__(self, directory: Optional[str] = None, flush_every: int = 50_000,
+                 flush_interval: Optional[float] = 300.0):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        # append зовётся из потоков движка (по потоку на пользователя)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # (user, key) -> {value: label}, в порядке появления, не больше RECENT_LIMIT
+        self._recent: Dict[Tuple[int, int], Dict[int, int]] = {}
+        self._strings: List[Optional[str]] = [None]
+        self._string_ids: Dict[str, int] = {}
+        self._segments: List[Segment] = []
+        self._events = _Table(EVENT_COLUMNS)
+        self._contexts = _Table(CONTEXT_COLUMNS)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            for path in sorted(glob.glob(os.path.join(directory, "*.seg"))):
+                self._segments.append(Segment(path))
+            self._strings += self._load_strings()
+            self._string_ids = {s: i for i, s in enumerate(self._strings) if i}
+            for segment in self._segments:
+                cols = segment.contexts.columns
+                for row in zip(cols["user"], cols["key"], cols["value"], cols["label"]):
+                    self._remember(*row)
+        self._saved_strings = len(self._strings)
+
+    def _load_strings(self) -> List[str]:
+        path = os.path.join(self.directory, STRINGS_FILE)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raw = b""
+        complete = raw.rfind(b"\n") + 1
+        if complete < len(raw):
+            # Оборванная дозапись (упали посреди flush): ни один сегмент на неё не ссылается
+            with open(path, "r+b") as f:
+                f.truncate(complete)
+        strings = [json.loads(line) for line in raw[:complete].splitlines()]
+        needed = max((segment.header["strings"] for segment in self._segments), default=0)
+        if len(strings) < needed:
+            raise ValueError(f"В {path} {len(strings)} строк, сегментам нужно {needed}")
+        return strings
+
+    # --- Запись ---
+
+    def _intern(self, value: Any) -> int:
+        if value is None:
+            return _NO_STRING
+        value = str(value)
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def _remember(self, user: int, key: int, value: int, label: int):
+        recent = self._recent.get((user, key))
+        if recent is None:
+            recent = self._recent[(user, key)] = {}
+        else:
+            recent.pop(value, None)
+        recent[value] = label
+        if len(recent) > RECENT_LIMIT:
+            del recent[next(iter(recent))]
+
+    def append(self, user_id: str, screen_id: str, target: Optional[str], context: Optional[Dict[str, Any]], timestamp: float):
+        with self._lock:
+            user = self._intern(user_id)
+            self._events.append(user, self._intern(screen_id), self._intern(target), timestamp)
+            for key, value in (context or {}).items():
+                if key.endswith("_id"):
+                    label = context.get(key[:-3] + "_name")
+                    row = (user, self._intern(key), self._intern(value), self._intern(label))
+                    self._contexts.append(*row, timestamp)
+                    self._remember(*row)
+            if self.directory and (
+                len(self._events) >= self.flush_every
+                or (self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval)
+            ):
+                self._flush()
+
+    def flush(self) -> Optional[str]:
+        """Сбрасывает накопленные в памяти события в новый сегмент."""
+        with self._lock:
+            return self._flush()
+
+    def _flush(self) -> Optional[str]:
+        self._last_flush = time.monotonic()
+        if not self.directory or not len(self._events):
+            return None
+        # Сначала новые строки: сегмент не должен ссылаться на ещё не записанные
+        with open(os.path.join(self.directory, STRINGS_FILE), "a", encoding="utf-8") as f:
+            new_strings = self._strings[self._saved_strings:]
+            f.writelines(json.dumps(value, ensure_ascii=False) + "\n" for value in new_strings)
+        self._saved_strings = len(self._strings)
+        path = os.path.join(self.directory, f"{len(self._segments):06d}.seg")
+        layout: Dict[str, Dict[str, Tuple[int, int]]] = {"events": {}, "contexts": {}}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SEGMENT_MAGIC)
+            for table_name, table in (("events", self._events), ("contexts", self._contexts)):
+                for name, _ in table.spec:
+                    blob = table.columns[name].tobytes()
+                    layout[table_name][name] = (f.tell(), len(blob))
+                    f.write(blob)
+                    f.write(b"\0" * (-len(blob) % 8))
+            header = json.dumps({**layout, "strings": len(self._strings) - 1}).encode("utf-8")
+            f.write(header)
+            f.write(struct.pack("<Q", len(header)))
+        os.replace(tmp_path, path)
+        self._segments.append(Segment(path))
+        self._events = _Table(EVENT_COLUMNS)
+        self._contexts = _Table(CONTEXT_COLUMNS)
+        return path
+
+    # --- Агрегации ---
+
+    def _tables(self, kind: str) -> List[_Table]:
+        return [getattr(segment, kind) for segment in self._segments] + [getattr(self, f"_{kind}")]
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self._tables("events"))
+
+    def recent_context(self, user_id: str, key: str, limit: int = 5) -> List[Tuple[str, Optional[str]]]:
+        """Последние различные значения `key` (например student_id) у пользователя, новые первыми."""
+        user, key_id = self._string_ids.get(user_id), self._string_ids.get(key)
+        if user is None or key_id is None:
+            return []
+        if limit <= RECENT_LIMIT:
+            with self._lock:
+                recent = list(self._recent.get((user, key_id), {}).items())
+            return [(self._strings[v], self._strings[l]) for v, l in reversed(recent)][:limit]
+        # Больше, чем держит индекс: полный проход по колонкам
+        result: Dict[int, int] = {}
+        for table in reversed(self._tables("contexts")):
+            cols = table.columns
+            mask = map(lambda u, k: u == user and k == key_id, cols["user"], cols["key"])
+            # Строки дописываются по времени, поэтому свежие — в конце
+            rows = list(compress(zip(cols["value"], cols["label"]), mask))
+            for value, label in reversed(rows):
+                if value not in result:
+                    result[value] = label
+                    if len(result) >= limit:
+                        return [(self._strings[v], self._strings[l]) for v, l in result.items()]
+        return [(self._strings[v], self._strings[l]) for v, l in result.items()]
+
+    def recent_items(self, user_id: str, key: str, limit: int, id_field: str = "id", label_field: str = "name") -> List[Dict[str, Any]]:
+        """recent_context в формате элементов API: [{id_field: ..., label_field: ...}]."""
+        return [{id_field: value, label_field: label or value} for value, label in self.recent_context(user_id, key, limit)]
+
+    def context_counts(self, key: str, user_id: Optional[str] = None) -> Counter:
+        """Частота значений `key` (например, какие метрики ставят чаще)."""
+        key_id = self._string_ids.get(key)
+        counts: Counter = Counter()
+        if key_id is None:
+            return counts
+        user = self._string_ids.get(user_id) if user_id is not None else None
+        for table in self._tables("contexts"):
+            cols = table.columns
+            if user is None:
+                mask = map(key_id.__eq__, cols["key"])
+            else:
+                mask = map(lambda u, k: u == user and k == key_id, cols["user"], cols["key"])
+            counts.update(compress(cols["value"], mask))
+        return Counter({self._strings[v]: n for v, n in counts.items()})
+
+    def transition_counts(self) -> Counter:
+        """Сколько раз переходили screen -> target."""
+        counts: Counter = Counter()
+        for table in self._tables("events"):
+            counts.update(zip(table.columns["screen"], table.columns["target"]))
+        return Counter({(self._strings[s], self._strings[t]): n for (s, t), n in counts.items()})
@@ -6,7 +6,7 @@ class APISimulator:
     """
     Умная заглушка для внешних API.
     Легко расширить: просто добавь ключ в MOCK_DATA.
-    В продакшене — замени на requests/aiohttp.
+    В продакшене — используй HttpApiClient (navigation/http_client.py).
     """
     MOCK_DATA = {
         "/api/teacher/tracks": [
@@ -34,6 +34,15 @@ class APISimulator:
         "/api/tracks/architecture/students": [
             {"id": "sidorov", "full_name": "Сидоров Сидор"},
         ],
+        "/api/students": [
+            {"id": "ivanov", "full_name": "Иванов Иван"},
+            {"id": "petrov", "full_name": "Петров Пётр"},
+            {"id": "sidorov", "full_name": "Сидоров Сидор"},
+        ],
+        "/api/teacher/meetings": [
+            {"id": "m1", "title": "Защита проектов", "time": "10:00", "starts_at": "2030-09-01T10:00:00"},
+            {"id": "m2", "title": "Планёрка треков", "time": "15:30", "starts_at": "2030-09-01T15:30:00"},
+        ],
         "/api/teacher/recent_students": [
             {"id": "ivanov", "full_name": "Иванов Иван"},
             {"id": "sidorov", "full_name": "Сидоров Сидор"},
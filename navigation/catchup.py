@@ -0,0 +1,119 @@
+# navigation/catchup.py
+"""
+Разбор очереди апдейтов, накопившейся, пока бот лежал.
+
+Кнопка обрабатывается по id в текущем view пользователя, а пока бота не
+было, ответов пользователь не получал — значит, всё, что он нажимал, он
+нажимал на клавиатурах, показанных до остановки. Из нескольких нажатий
+подряд смысл имеет только последнее: остальные ботом всё равно были бы
+отрисованы и тут же перезаписаны. Но текст после нажатия (вопрос в
+чат-режиме, строка поиска) зависит от экрана, на который нажатие привело,
+поэтому сообщения делят нажатия на серии. Правила для каждого чата:
+
+- из каждой серии нажатий между сообщениями остаётся одно — последнее,
+  на самом свежем сообщении;
+- /start сбрасывает навигацию, поэтому нажатия до последнего /start и
+  предыдущие /start отбрасываются;
+- остальные сообщения (вопросы в чат-режиме, строки поиска) сохраняются
+  в исходном порядке;
+- апдейты других видов не трогаем.
+
+Оставшееся прогоняется через обработчики параллельно по чатам
+(replay_backlog), внутри чата — по порядку. Параллельность настоящая,
+только если обработчики не блокируют event loop: работа с движком идёт
+через BotInstance.run.
+
+Модуль не зависит от aiogram: нужны только атрибуты update_id, message
+(chat.id, text, from_user.id) и callback_query (message.chat.id,
+message.message_id, from_user.id).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+START_COMMAND = "/start"
+
+
+def _is_start(message: Any) -> bool:
+    text = (getattr(message, "text", None) or "").strip()
+    return text == START_COMMAND or text.startswith(START_COMMAND + " ") or text.startswith(START_COMMAND + "@")
+
+
+def update_chat(update: Any) -> Any:
+    """Чат апдейта; None — апдейт не из чата (его пропускаем как есть)."""
+    if getattr(update, "callback_query", None) is not None:
+        query = update.callback_query
+        if query.message is not None:
+            return query.message.chat.id
+        return query.from_user.id
+    if getattr(update, "message", None) is not None:
+        return update.message.chat.id
+    return None
+
+
+def collapse_backlog(updates: Sequence[Any]) -> Tuple[Dict[Any, List[Any]], List[Any]]:
+    """
+    Делит очередь на то, что стоит обработать (по чатам, в исходном
+    порядке), и то, что устарело. Апдейты не из чата попадают под ключ None.
+    """
+    by_chat: Dict[Any, List[Any]] = {}
+    for update in sorted(updates, key=lambda u: u.update_id):
+        by_chat.setdefault(update_chat(update), []).append(update)
+
+    kept: Dict[Any, List[Any]] = {}
+    dropped: List[Any] = []
+    for chat, chat_updates in by_chat.items():
+        if chat is None:
+            kept[chat] = chat_updates
+            continue
+        last_start = max((i for i, u in enumerate(chat_updates) if u.message is not None and _is_start(u.message)),
+                         default=-1)
+        chat_kept = []
+        latest_click = None  # (апдейт, message_id) — лучший в текущей серии нажатий
+        for i, update in enumerate(chat_updates):
+            query = getattr(update, "callback_query", None)
+            if query is not None:
+                if i < last_start:
+                    dropped.append(update)
+                    continue
+                message_id = query.message.message_id if query.message is not None else -1
+                if latest_click is None or message_id >= latest_click[1]:
+                    if latest_click is not None:
+                        dropped.append(latest_click[0])
+                    latest_click = (update, message_id)
+                else:
+                    dropped.append(update)
+                continue
+            if _is_start(update.message) and i != last_start:
+                dropped.append(update)
+                continue
+            # Сообщение обрабатывается на экране, куда привело последнее нажатие серии
+            if latest_click is not None:
+                chat_kept.append(latest_click[0])
+                latest_click = None
+            chat_kept.append(update)
+        if latest_click is not None:
+            chat_kept.append(latest_click[0])
+        if chat_kept:
+            kept[chat] = chat_kept
+    return kept, dropped
+
+
+async def replay_backlog(
+    kept: Dict[Any, List[Any]],
+    feed: Callable[[Any], Awaitable[Any]],
+    on_error: Optional[Callable[[Any, Exception], None]] = None
+):
+    """
+    Скармливает апдейты из collapse_backlog обработчику `feed`: чаты —
+    одновременно, апдейты одного чата — строго по очереди. Ошибка апдейта
+    передаётся в on_error и не останавливает остальные.
+    """
+    async def feed_chat(updates):
+        for update in updates:
+            try:
+                await feed(update)
+            except Exception as e:
+                if on_error is not None:
+                    on_error(update, e)
+
+    await asyncio.gather(*(feed_chat(updates) for updates in kept.values()))
@@ -0,0 +1,123 @@
+# navigation/context_analysis.py
+"""
+Анализ зависимостей контекста по манифесту.
+
+Для каждого экрана вычисляется множество ключей контекста, которые ещё могут
+понадобиться на нём или ниже по любому пути навигации (заголовки, URL,
+шаблоны тел запросов). Ключ, определяемый переходом (`context_fields`),
+«убивает» старое значение: выше по графу он живым не считается.
+
+Возврат по CONTEXTUAL в граф не входит — он зависит от return_stack,
+поэтому движок объединяет живые ключи текущего экрана и всех экранов в стеке.
+
+LiveKeys — результат в сжатом виде для кэша, индекса разбитого манифеста
+и движка: ключи, живые на всех экранах (обычно почти все — с любого экрана
+можно вернуться на main), хранятся один раз, у экрана — только свои.
+"""
+from collections.abc import Mapping
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Set, Tuple
+
+from .manifest import template_keys
+
+# Эти ключи не удаляются никогда
+PERSISTENT_KEYS = frozenset({"user_id"})
+_NO_KEYS: FrozenSet[str] = frozenset()
+
+
+def _strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def screen_references(screen_def: Dict[str, Any]) -> Set[str]:
+    """Ключи контекста, которые экран использует сам."""
+    templates = [screen_def.get("title", "")]
+    templates.extend(_strings(screen_def.get("data_source", {}).get("url")))
+    templates.extend(_strings(screen_def.get("ai_api")))
+    templates.extend(_strings(screen_def.get("search", {}).get("query")))
+    for button in screen_def.get("buttons", []):
+        templates.extend(_strings(button.get("request")))
+    refs: Set[str] = set()
+    for template in templates:
+        refs.update(template_keys(template))
+    return refs
+
+
+def screen_edges(screen_def: Dict[str, Any]) -> List[Tuple[str, FrozenSet[str]]]:
+    """Переходы с экрана: (целевой экран, ключи, которые переход задаёт заново)."""
+    edges: List[Tuple[str, FrozenSet[str]]] = []
+    for button in screen_def.get("buttons", []):
+        if "target" in button:
+            edges.append((button["target"], frozenset()))
+    if screen_def.get("paginated") and "items" in screen_def:
+        context_key = screen_def.get("context_key")
+        edges.append((screen_def.get("target", "item_selected"), frozenset([context_key] if context_key else [])))
+    template = screen_def.get("button_template")
+    if template:
+        edges.append((template["target_screen"], frozenset(template.get("context_fields", {}))))
+    back_path = screen_def.get("back_path")
+    if back_path and back_path != "CONTEXTUAL":
+        edges.append((back_path, frozenset()))
+    else:
+        # Без back_path и при пустом return_stack движок возвращает на main
+        edges.append(("main", frozenset()))
+    return edges
+
+
+def analyze_context(screens: Mapping) -> Dict[str, FrozenSet[str]]:
+    """Возвращает screen_id -> живые ключи контекста (итерация до неподвижной точки)."""
+    live: Dict[str, Set[str]] = {}
+    edges: Dict[str, List[Tuple[str, FrozenSet[str]]]] = {}
+    for screen_id in screens:
+        screen_def = screens[screen_id]
+        live[screen_id] = screen_references(screen_def)
+        edges[screen_id] = screen_edges(screen_def)
+
+    changed = True
+    while changed:
+        changed = False
+        for screen_id, out in edges.items():
+            current = live[screen_id]
+            for target, defined in out:
+                target_live = live.get(target)
+                if target_live is None:
+                    continue
+                extra = target_live - defined - current
+                if extra:
+                    current |= extra
+                    changed = True
+    return {screen_id: frozenset(keys) for screen_id, keys in live.items()}
+
+
+class LiveKeys(Mapping):
+    """screen_id -> живые ключи: общие для всех экранов (`common`) плюс свои (`own`)."""
+
+    __slots__ = ("common", "own")
+
+    def __init__(self, common: Iterable[str], own: Dict[str, Iterable[str]]):
+        self.common = frozenset(common)
+        # Пустые множества у большинства экранов — один общий объект
+        self.own = {screen_id: frozenset(keys) or _NO_KEYS for screen_id, keys in own.items()}
+
+    @classmethod
+    def from_analysis(cls, live: Dict[str, FrozenSet[str]]) -> "LiveKeys":
+        common = frozenset.intersection(*live.values()) if live else _NO_KEYS
+        return cls(common, {screen_id: keys - common for screen_id, keys in live.items()})
+
+    def __getitem__(self, screen_id: str) -> FrozenSet[str]:
+        return self.common | self.own[screen_id]
+
+    def __contains__(self, screen_id: object) -> bool:
+        return screen_id in self.own
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.own)
+
+    def __len__(self) -> int:
+        return len(self.own)
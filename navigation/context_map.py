@@ -0,0 +1,105 @@
+# navigation/context_map.py
+"""
+Неизменяемый контекст пользователя со структурным разделением.
+
+ContextMap — цепочка узлов: каждый хранит только изменённые ключи и ссылку
+на предыдущую версию. Поэтому снимок контекста перед переходом стоит O(1),
+а память растёт пропорционально изменениям, а не размеру контекста.
+Когда цепочка становится длиннее MAX_CHAIN, новая версия уплотняется
+в один узел, чтобы поиск ключа оставался коротким.
+"""
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# Длина цепочки, после которой версия уплотняется в один узел
+MAX_CHAIN = 8
+
+
+class _Deleted:
+    """Метка удалённого ключа; при pickle восстанавливается как тот же объект."""
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "_DELETED"
+
+    def __repr__(self) -> str:
+        return "<deleted>"
+
+
+_DELETED = _Deleted()
+
+
+class ContextMap(Mapping):
+    __slots__ = ("_changes", "_parent", "_depth", "_len")
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        self._changes: Dict[str, Any] = dict(data or {})
+        self._parent: Optional[ContextMap] = None
+        self._depth = 0
+        self._len = len(self._changes)
+
+    def _derive(self, changes: Dict[str, Any]) -> "ContextMap":
+        node = ContextMap.__new__(ContextMap)
+        node._changes = changes
+        node._parent = self
+        node._depth = self._depth + 1
+        size = self._len
+        for key, value in changes.items():
+            present = key in self
+            if value is _DELETED:
+                size -= present
+            elif not present:
+                size += 1
+        node._len = size
+        if node._depth > MAX_CHAIN:
+            return ContextMap(dict(node.items()))
+        return node
+
+    # --- Mapping ---
+
+    def __getitem__(self, key: str) -> Any:
+        node = self
+        while node is not None:
+            value = node._changes.get(key, node)
+            if value is not node:
+                if value is _DELETED:
+                    break
+                return value
+            node = node._parent
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        seen = set()
+        node = self
+        while node is not None:
+            for key, value in node._changes.items():
+                if key not in seen:
+                    seen.add(key)
+                    if value is not _DELETED:
+                        yield key
+            node = node._parent
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __repr__(self) -> str:
+        return f"ContextMap({dict(self.items())!r})"
+
+    # --- Новые версии ---
+
+    def set_many(self, updates: Dict[str, Any]) -> "ContextMap":
+        """Версия с обновлёнными ключами; если ничего не меняется — сам контекст."""
+        changes = {key: value for key, value in updates.items() if self.get(key, _DELETED) != value}
+        return self._derive(changes) if changes else self
+
+    def set(self, key: str, value: Any) -> "ContextMap":
+        return self.set_many({key: value})
+
+    def without(self, keys: Iterable[str]) -> "ContextMap":
+        """Версия без указанных ключей."""
+        changes = {key: _DELETED for key in keys if key in self}
+        return self._derive(changes) if changes else self
+
+    @property
+    def depth(self) -> int:
+        return self._depth
@@ -0,0 +1,119 @@
+# navigation/datasource.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+SourceKey = Tuple[str, str]  # (url, method)
+
+
+class DataSourceCache:
+    """
+    Последние ответы источников данных по ключу (url, method).
+
+    Подписчики (`subscribe`) получают (key, items), только когда ответ
+    изменился, — так производные структуры (поисковые индексы и т.п.)
+    обновляются инкрементально, а не на каждый рендер.
+
+    Записи из снимка (`attach`) разбираются лениво, при первом обращении,
+    и остаются «тёплыми» (`warm`), пока их не заменит свежий ответ (`put`).
+
+    URL источников параметризованы контекстом (по записи на трек, студента…),
+    поэтому в памяти держится не больше `max_entries` последних
+    использованных ответов; о вытесненных узнают подписчики `on_evict`.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[SourceKey, Tuple[Any, float]]" = OrderedDict()
+        self._listeners: List[Callable[[SourceKey, Any], None]] = []
+        self._evict_listeners: List[Callable[[SourceKey], None]] = []
+        self._lock = threading.Lock()
+        # key -> загрузчик (items, возраст в секундах) из снимка
+        self._lazy: Dict[SourceKey, Callable[[], Tuple[Any, float]]] = {}
+        self._warm: Set[SourceKey] = set()
+
+    def _entry(self, key: SourceKey) -> Optional[Tuple[Any, float]]:
+        evicted: List[SourceKey] = []
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif key in self._lazy:
+                loader = self._lazy.pop(key)
+                items, age = loader()
+                entry = self._entries[key] = (items, time.monotonic() - age)
+                self._warm.add(key)
+                evicted = self._trim()
+        self._notify_evicted(evicted)
+        return entry
+
+    def _trim(self) -> List[SourceKey]:
+        """Вытесняет самые давно использованные записи сверх лимита (под блокировкой)."""
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self._warm.discard(key)
+            evicted.append(key)
+        return evicted
+
+    def _notify_evicted(self, evicted: List[SourceKey]):
+        for key in evicted:
+            for listener in list(self._evict_listeners):
+                listener(key)
+
+    def get(self, key: SourceKey, max_age: Optional[float] = None) -> Optional[Any]:
+        """Закэшированный ответ; при `max_age` — только если он не старше max_age секунд."""
+        entry = self._entry(key)
+        if entry is None:
+            return None
+        items, fetched_at = entry
+        if max_age is not None and time.monotonic() - fetched_at > max_age:
+            return None
+        return items
+
+    def put(self, key: SourceKey, items: Any):
+        with self._lock:
+            self._lazy.pop(key, None)
+            self._warm.discard(key)
+            previous = self._entries.get(key)
+            self._entries[key] = (items, time.monotonic())
+            self._entries.move_to_end(key)
+            evicted = self._trim()
+        self._notify_evicted(evicted)
+        if previous is None or previous[0] != items:
+            for listener in list(self._listeners):
+                listener(key, items)
+
+    def attach(self, key: SourceKey, loader: Callable[[], Tuple[Any, float]]):
+        """Ленивая запись из снимка; уже полученный ответ не перекрывается."""
+        with self._lock:
+            if key not in self._entries:
+                self._lazy[key] = loader
+
+    def warm(self, key: SourceKey) -> Optional[Any]:
+        """Ответ из снимка, который ещё не перепроверен у источника, иначе None."""
+        if key not in self._warm and key not in self._lazy:
+            return None
+        entry = self._entry(key)
+        return entry[0] if entry is not None and key in self._warm else None
+
+    def entries(self) -> List[Tuple[SourceKey, Any, float]]:
+        """(key, items, возраст в секундах) всех записей, включая неразобранные."""
+        for key in list(self._lazy):
+            self._entry(key)
+        now = time.monotonic()
+        with self._lock:
+            return [(key, items, now - fetched_at) for key, (items, fetched_at) in self._entries.items()]
+
+    def subscribe(self, listener: Callable[[SourceKey, Any], None]):
+        self._listeners.append(listener)
+
+    def on_evict(self, listener: Callable[[SourceKey], None]):
+        self._evict_listeners.append(listener)
+
+    def __contains__(self, key: SourceKey) -> bool:
+        return key in self._entries or key in self._lazy
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._lazy)
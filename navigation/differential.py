@@ -0,0 +1,286 @@
+# navigation/differential.py
+"""
+Дифференциальная проверка: оптимизированный движок против эталонного.
+
+Генерирует случайные сессии — последовательности абстрактных шагов
+нескольких пользователей — и прогоняет их одновременно через
+NavigationEngine и ReferenceEngine (navigation.reference). После каждого
+шага сравниваются view пользователя и его состояние: экран, контекст,
+стек возврата, листание и история выборов. Исключение тоже считается
+результатом шага: оба движка должны упасть одинаково.
+
+Шаги абстрактные, чтобы сессию можно было воспроизвести и ужать:
+
+    ("click", user, k)      — k-я кнопка текущего view (по модулю числа кнопок)
+    ("back", user)          — действие «Назад»
+    ("input", user, text)   — ввод текста
+    ("goto", user, screen)  — переход на любой экран, в том числе несуществующий
+
+Найденное расхождение ужимается жадно (выкидываем куски и отдельные шаги,
+уменьшаем номера кнопок и пользователей), пока оно воспроизводится, и
+отдаётся вместе с готовым к вставке в тест воспроизведением.
+
+    python -m navigation.differential menu-manifest.json --sessions 300 --steps 40 --seed 1
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .api_stub import APISimulator
+from .engine import NavigationEngine
+from .logger import NavigationLogger
+from .reference import ReferenceEngine
+
+Step = Tuple[Any, ...]
+
+# Тексты для ввода: поиск по буквам и фамилиям, команды выхода из чата, мусор
+INPUT_TEXTS = ("", "  ", "и", "П", "ив", "Иван", "сидор", "петров ", "ё", "zz", "/finish", "/start", "привет")
+
+
+def _plain(value: Any) -> Any:
+    """View и состояние в обычные dict/list: Action, FrozenView и ContextMap сравниваются как данные."""
+    if type(value) is dict or isinstance(value, Mapping):
+        return {key: _plain(item) for key, item in value.items()}
+    if type(value) in (list, tuple) or isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def optimized_state(engine: NavigationEngine, user_id: str) -> Dict[str, Any]:
+    state = engine.get_user_state(user_id)
+    screen_index = engine.manifest.screen_index
+    return {
+        "current_screen": state["current_screen"],
+        "context": _plain(state["context"]),
+        "return_stack": [screen_index.name(screen_no) for screen_no in state["return_stack"]],
+        "pagination": dict(state["pagination"]),
+        "selections": [
+            {"screen_id": s["screen_id"], "selected_item": _plain(s["selected_item"])} for s in state["selections"]
+        ],
+    }
+
+
+def reference_state(engine: ReferenceEngine, user_id: str) -> Dict[str, Any]:
+    state = engine.get_user_state(user_id)
+    return {key: _plain(state[key]) for key in ("current_screen", "context", "return_stack", "pagination", "selections")}
+
+
+def default_engine(manifest_path: str) -> NavigationEngine:
+    # Эталон не логирует; чтобы сравнение скорости было про навигацию, а не про лог, — только ошибки
+    logger = NavigationLogger("Differential", level=logging.WARNING, log_file=os.devnull)
+    return NavigationEngine(manifest_path, logger=logger, api_client=APISimulator())
+
+
+def default_reference(manifest_path: str) -> ReferenceEngine:
+    return ReferenceEngine(manifest_path, api_client=APISimulator())
+
+
+class Divergence:
+    """Первое расхождение в сессии: шаг, что именно разошлось и оба значения."""
+
+    __slots__ = ("steps", "index", "kind", "reference", "optimized")
+
+    def __init__(self, steps: List[Step], index: int, kind: str, reference: Any, optimized: Any):
+        self.steps = steps
+        self.index = index
+        self.kind = kind  # "view" | "state" | "error"
+        self.reference = reference
+        self.optimized = optimized
+
+    def reproducer(self, manifest_path: str = "menu-manifest.json") -> str:
+        """Код, который повторяет расхождение вне харнесса."""
+        return "\n".join([
+            "from navigation.differential import default_engine, default_reference, replay",
+            f"steps = {self.steps!r}",
+            f"divergence = replay(default_reference({manifest_path!r}), default_engine({manifest_path!r}), steps)",
+            f"assert divergence is None, divergence  # ожидается: {self.kind} на шаге {self.index}",
+        ])
+
+    def __repr__(self) -> str:
+        step = self.steps[self.index] if self.index < len(self.steps) else None
+        return (f"Divergence({self.kind} на шаге {self.index} {step!r}:\n"
+                f"  reference: {self.reference!r}\n  optimized: {self.optimized!r})")
+
+
+def _user(index: int) -> str:
+    return f"user_{index}"
+
+
+def _call(timings: List[float], slot: int, fn: Callable, *args) -> Tuple[str, Any]:
+    started = time.perf_counter()
+    try:
+        return "ok", fn(*args)
+    except Exception as e:
+        return "error", f"{type(e).__name__}: {e}"
+    finally:
+        timings[slot] += time.perf_counter() - started
+
+
+def replay(reference: ReferenceEngine, optimized: NavigationEngine, steps: List[Step],
+           timings: Optional[List[float]] = None) -> Optional[Divergence]:
+    """
+    Прогоняет шаги через оба движка. Кнопку для "click" каждый движок берёт
+    из своего view (после сравнения view совпадают), поэтому проверяется и
+    путь с общими Action. timings: [эталон, оптимизированный] в секундах.
+    """
+    timings = timings if timings is not None else [0.0, 0.0]
+    views: Dict[str, Tuple[Any, Any]] = {}
+    for index, step in enumerate(steps):
+        user_id = _user(step[1])
+        if user_id not in views:
+            views[user_id] = (_call(timings, 0, reference.get_current_view, user_id),
+                              _call(timings, 1, optimized.get_current_view, user_id))
+        ref_view, opt_view = views[user_id]
+
+        kind = step[0]
+        if kind == "input":
+            ref_fn, opt_fn = reference.handle_user_input, optimized.handle_user_input
+            ref_args = opt_args = step[2]
+        else:
+            ref_fn, opt_fn = reference.handle_action, optimized.handle_action
+            if kind == "click" and ref_view[0] == "ok" and ref_view[1]["actions"]:
+                ref_actions, opt_actions = ref_view[1]["actions"], opt_view[1]["actions"]
+                ref_args = ref_actions[step[2] % len(ref_actions)]
+                opt_args = opt_actions[step[2] % len(opt_actions)]
+            elif kind == "goto":
+                ref_args = opt_args = {"id": "goto", "label": "goto", "type": "navigate", "target": step[2]}
+            else:
+                ref_args = opt_args = {"id": "back", "label": "back", "type": "back"}
+            ref_args = dict(ref_args)  # эталон может держать ссылку на кнопку — отдаём копию
+
+        ref_result = _call(timings, 0, ref_fn, user_id, ref_args)
+        opt_result = _call(timings, 1, opt_fn, user_id, opt_args)
+        if ref_result[0] != opt_result[0] or (ref_result[0] == "error" and ref_result[1] != opt_result[1]):
+            return Divergence(steps, index, "error", ref_result, opt_result)
+
+        ref_view = _call(timings, 0, reference.get_current_view, user_id)
+        opt_view = _call(timings, 1, optimized.get_current_view, user_id)
+        views[user_id] = (ref_view, opt_view)
+        if _plain(ref_view) != _plain(opt_view):
+            return Divergence(steps, index, "view", _plain(ref_view), _plain(opt_view))
+        ref_state, opt_state = reference_state(reference, user_id), optimized_state(optimized, user_id)
+        if ref_state != opt_state:
+            return Divergence(steps, index, "state", ref_state, opt_state)
+    return None
+
+
+def generate_session(rng: random.Random, screens: List[str], steps: int, users: int = 3) -> List[Step]:
+    """Случайная сессия: в основном клики, иногда «Назад», ввод и прямые переходы."""
+    session: List[Step] = []
+    for _ in range(steps):
+        user = rng.randrange(users)
+        roll = rng.random()
+        if roll < 0.70:
+            session.append(("click", user, rng.randrange(16)))
+        elif roll < 0.82:
+            session.append(("back", user))
+        elif roll < 0.95:
+            session.append(("input", user, rng.choice(INPUT_TEXTS)))
+        else:
+            session.append(("goto", user, rng.choice(screens + ["no_such_screen"])))
+    return session
+
+
+def shrink(steps: List[Step], fails: Callable[[List[Step]], Optional[Divergence]]) -> Divergence:
+    """
+    Жадно ужимает сессию, пока расхождение воспроизводится: сначала
+    выкидывает куски и отдельные шаги, затем упрощает оставшиеся.
+    """
+    found = fails(steps)
+    assert found is not None, "сессия не воспроизводит расхождение"
+    steps = steps[:found.index + 1]
+
+    chunk = max(1, len(steps) // 2)
+    while True:
+        removed = False
+        i = 0
+        while i < len(steps):
+            candidate = steps[:i] + steps[i + chunk:]
+            result = fails(candidate) if candidate else None
+            if result is not None:
+                steps, found, removed = candidate[:result.index + 1], result, True
+            else:
+                i += chunk
+        if chunk == 1 and not removed:
+            break
+        chunk = max(1, chunk // 2)
+
+    for i in range(len(steps)):
+        for simpler in _simpler(steps[i]):
+            candidate = steps[:i] + [simpler] + steps[i + 1:]
+            result = fails(candidate)
+            if result is not None and result.index == i:
+                steps, found = candidate, result
+                break
+    return found
+
+
+def _simpler(step: Step):
+    """Варианты шага попроще: пользователь 0, меньший номер кнопки."""
+    if step[1] != 0:
+        yield (step[0], 0, *step[2:])
+    if step[0] == "click":
+        for k in range(step[2]):
+            yield ("click", step[1], k)
+
+
+def run(manifest_path: str = "menu-manifest.json", sessions: int = 200, steps: int = 40, seed: int = 0, users: int = 3,
+        make_engine: Callable[[str], NavigationEngine] = default_engine,
+        make_reference: Callable[[str], ReferenceEngine] = default_reference) -> Dict[str, Any]:
+    """
+    Прогоняет `sessions` случайных сессий на свежих движках. Останавливается
+    на первом расхождении и ужимает его. Возвращает отчёт:
+    {"sessions", "steps", "divergence", "reproducer", "reference_s", "optimized_s", "speedup"}.
+    """
+    rng = random.Random(seed)
+    screens = list(make_reference(manifest_path).screens)
+    timings = [0.0, 0.0]
+    report: Dict[str, Any] = {"sessions": 0, "steps": 0, "divergence": None, "reproducer": None}
+
+    def fails(session: List[Step]) -> Optional[Divergence]:
+        return replay(make_reference(manifest_path), make_engine(manifest_path), session)
+
+    for _ in range(sessions):
+        session = generate_session(rng, screens, steps, users)
+        divergence = replay(make_reference(manifest_path), make_engine(manifest_path), session, timings)
+        report["sessions"] += 1
+        report["steps"] += len(session) if divergence is None else divergence.index + 1
+        if divergence is not None:
+            divergence = shrink(session, fails)
+            report["divergence"] = divergence
+            report["reproducer"] = divergence.reproducer(manifest_path)
+            break
+
+    report["reference_s"], report["optimized_s"] = timings
+    report["speedup"] = timings[0] / timings[1] if timings[1] else None
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Сравнение NavigationEngine с эталонным движком")
+    parser.add_argument("manifest", nargs="?", default="menu-manifest.json")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=40)
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = run(args.manifest, args.sessions, args.steps, args.seed, args.users)
+    print(f"Сессий: {report['sessions']}, шагов: {report['steps']}")
+    print(f"Эталон: {report['reference_s'] * 1000:.1f} мс, оптимизированный: {report['optimized_s'] * 1000:.1f} мс, "
+          f"ускорение: {report['speedup'] or 0:.2f}x")
+    if report["divergence"] is None:
+        print("Расхождений нет")
+        return 0
+    print(report["divergence"])
+    print("\nВоспроизведение:\n" + report["reproducer"])
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
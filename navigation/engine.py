@@ -1,38 +1,141 @@
-import copy
+import threading
 import time
-from typing import Any, Dict, List, Optional, Union
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FetchTimeout
+from contextvars import copy_context
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from .actions import ACTION, NAVIGATE, UNKNOWN, Action, back, dynamic_id, paginate
 from .logger import NavigationLogger
-from .api_stub import APISimulator
-from .manifest import ManifestLoader
+from .context_analysis import PERSISTENT_KEYS, LiveKeys
+from .context_map import ContextMap
+from .datasource import DataSourceCache
+from .manifest import ManifestLoader, template_keys
+from .return_stack import ReturnStack
+from .search import SearchIndex
+from .sessions import SessionStore
+from .tracing import NULL_TRACER, Tracer
+from .view_cache import ViewCache
+from .view_diff import diff_views
 
 class NavigationEngine:
     def __init__(
         self,
         manifest_path: str = "menu-manifest.json",
         logger: Optional[NavigationLogger] = None,
-        api_client: Optional[Any] = None
+        api_client: Optional[Any] = None,
+        view_cache_size: int = 512,
+        fetch_workers: int = 8,
+        analytics: Optional[Any] = None,
+        tracer: Optional[Tracer] = None,
+        memory_budget: Optional[int] = None,
+        session_spill_dir: Optional[str] = None,
+        return_stack_depth: int = 16,
+        context_snapshot_depth: int = 16,
+        manifest: Optional[ManifestLoader] = None,
+        view_cache: Optional[ViewCache] = None,
+        data_cache_size: int = 1024
     ):
-        self.manifest = ManifestLoader(manifest_path)
+        # Готовый ManifestLoader (и ViewCache) можно разделить между движками
+        # с одинаковым манифестом — см. navigation.hosting
+        self.manifest = manifest or ManifestLoader(manifest_path)
         self.logger = logger or NavigationLogger()
-        self.api_client = api_client or APISimulator()
-        self._user_states: Dict[str, Dict[str, Any]] = {}
+        if api_client is None:
+            # Заглушка нужна только в демо и тестах — импортируем по требованию
+            from .api_stub import APISimulator
+            api_client = APISimulator()
+        self.api_client = api_client
+        # Кэш готовых view для экранов без данных из API; 0 — отключить
+        if view_cache is None and view_cache_size:
+            view_cache = ViewCache(view_cache_size)
+        self.view_cache = view_cache
+        # Состояния пользователей; при memory_budget (байт) холодные сессии уходят на диск
+        self.sessions = SessionStore(memory_budget, session_spill_dir)
+        self.return_stack_depth = return_stack_depth
+        self.context_snapshot_depth = context_snapshot_depth
+        # Пул для параллельных запросов к источникам данных в batch-режиме
+        self.fetch_workers = fetch_workers
+        self._fetch_executor: Optional[ThreadPoolExecutor] = None
+        # Необязательное хранилище событий выбора (navigation.analytics.SelectionStore)
+        self.analytics = analytics
+        # screen_id -> живые ключи контекста; считается лениво по манифесту
+        self._context_keys: Optional[LiveKeys] = None
+        # Последние ответы источников данных (не больше data_cache_size) и построенные
+        # по ним поисковые индексы; индекс уходит вместе с вытесненным ответом
+        self.data_cache = DataSourceCache(data_cache_size)
+        self.search_indexes: Dict[Tuple[str, str, str], SearchIndex] = {}
+        self.data_cache.subscribe(self._refresh_search_indexes)
+        self.data_cache.on_evict(self._drop_search_indexes)
+        # Трассировка (navigation.tracing); по умолчанию выключена
+        self.tracer = tracer or NULL_TRACER
+        if tracer is not None and getattr(self.logger, "tracer", None) is NULL_TRACER:
+            self.logger.tracer = tracer
+        # Бюджеты задержки (latency_budget_ms): запросы, не уложившиеся в бюджет,
+        # дорабатывают в фоне; кто их ждёт и кому уже можно показать результат
+        self.budget_violations: Counter = Counter()
+        self._pending_fetches: Dict[Tuple[str, str], Future] = {}
+        self._waiting_users: Dict[Tuple[str, str], Set[str]] = {}
+        self._ready_users: Dict[Tuple[str, str], Set[str]] = {}
+        self._pending_lock = threading.Lock()
+        self._ready_listeners: List[Callable[[str, Tuple[str, str]], None]] = []
+        # Снимок прогретых кэшей (navigation.snapshot), подключённый при старте
+        self.snapshot = None
+        # Готовые Action, не зависящие от пользователя: (вид, screen_id, ...) -> кнопки;
+        # сбрасываются при смене версии манифеста
+        self._shared_actions: Dict[tuple, Any] = {}
+        self._shared_actions_version: Optional[str] = None
 
     def init_user(self, user_id: str):
-        self._user_states[user_id] = {
+        self.sessions[user_id] = {
             "current_screen": "main",
-            "context": {"user_id": user_id},
-            "return_stack": [],
+            "context": ContextMap({"user_id": user_id}),
+            # (номер экрана, контекст на момент ухода с него) — для восстановления по «Назад»
+            "context_snapshots": [],
+            "return_stack": ReturnStack(self.return_stack_depth),
             "pagination": {},
-            "selections": [] # <-- Новое поле для истории выборов
+            "selections": [], # <-- Новое поле для истории выборов
+            # Последний view, доставленный в интерфейс (для get_view_delta)
+            "delivered_view": None
         }
         self.logger.log_view_rendered(user_id, "main", "Инициализация")
 
     def get_user_state(self, user_id: str) -> Dict[str, Any]:
-        if user_id not in self._user_states:
+        if user_id not in self.sessions:
             self.init_user(user_id)
-        return self._user_states[user_id]
+        return self.sessions[user_id]
 
     def get_current_view(self, user_id: str) -> Dict[str, Any]:
+        with self.tracer.span("get_current_view", user_id=user_id):
+            return self._get_view(user_id)
+
+    def get_view_delta(self, user_id: str, full: bool = False) -> Dict[str, Any]:
+        """
+        Текущий view и его отличия от последнего доставленного пользователю
+        (см. view_diff.diff_views). Вызов считается доставкой: следующий
+        diff строится уже относительно этого view. Доставленный view один
+        на пользователя — для нажатия в более старом сообщении интерфейс
+        передаёт `full=True` и получает полную отрисовку.
+        """
+        view = self.get_current_view(user_id)
+        state = self.get_user_state(user_id)
+        delta = diff_views(None if full else state.get("delivered_view"), view)
+        state["delivered_view"] = view
+        return delta
+
+    def open_deep_link(self, user_id: str, screen_id: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Открывает экран напрямую (уведомление, ссылка) так, будто пользователь
+        перешёл на него с текущего: «Назад» и снимки контекста работают как обычно.
+        Возвращает view, который считается доставленным (новое сообщение).
+        """
+        state = self.get_user_state(user_id)
+        if screen_id not in self.manifest.screens:
+            self.logger.log_error(f"Экран ссылки не найден: {screen_id}")
+        else:
+            self.logger.log_user_action(user_id, "deep_link", screen_id)
+            self._handle_navigate(user_id, state, {"target": screen_id, "context": context or {}})
+        return self.get_view_delta(user_id)["view"]
+
+    def _get_view(self, user_id: str, prefetched: Optional[Dict[Tuple[str, str], Any]] = None) -> Dict[str, Any]:
         state = self.get_user_state(user_id)
         screen_id = state["current_screen"]
         screen_def = self.manifest.screens.get(screen_id)
@@ -45,6 +148,334 @@ class NavigationEngine:
                 "screen_type": "error"
             }
 
+        cache_key = self._view_cache_key(state, screen_id, screen_def)
+        if cache_key is not None:
+            view = self.view_cache.get(cache_key)
+            if view is not None:
+                self.logger.log_view_rendered(user_id, screen_id, view["text"])
+                return view
+        view = self._render_view(user_id, state, screen_id, screen_def, prefetched)
+        if cache_key is not None:
+            view = self.view_cache.put(cache_key, view)
+        return view
+
+    def _view_cache_key(self, state: Dict[str, Any], screen_id: str, screen_def: Dict[str, Any]) -> Optional[tuple]:
+        """Ключ кэша view или None, если экран нельзя кэшировать."""
+        if self.view_cache is None or screen_def["type"] == "dynamic":
+            return None
+        context = state["context"]
+        key = (
+            screen_id,
+            self.manifest.version,
+            state["pagination"].get(screen_id, 0),
+            tuple(context.get(k) for k in self.view_cache.context_keys(screen_id, screen_def))
+        )
+        try:
+            hash(key)
+        except TypeError:
+            # В контексте лежит нехэшируемое значение — рендерим без кэша
+            return None
+        return key
+
+    def load_snapshot(self, path: str) -> bool:
+        """Подключает снимок кэшей (см. navigation.snapshot). False — снимка нет или он не подошёл."""
+        from .snapshot import load_snapshot
+        snapshot = load_snapshot(self, path)
+        if snapshot is None:
+            return False
+        # Прежний снимок не закрываем: его ленивые записи могут быть ещё не разобраны
+        self.snapshot = snapshot
+        return True
+
+    def save_snapshot(self, path: str) -> Dict[str, int]:
+        from .snapshot import save_snapshot
+        with self.tracer.span("snapshot.save", path=path):
+            return save_snapshot(self, path)
+
+    def reload_manifest(self) -> bool:
+        """Перечитывает манифест и сбрасывает кэш view."""
+        changed = self.manifest.reload()
+        if self.view_cache is not None:
+            self.view_cache.clear()
+        self._context_keys = None
+        return changed
+
+    def _prune_context(self, state: Dict[str, Any]):
+        """
+        Удаляет из контекста ключи, на которые уже нельзя сослаться ни с текущего
+        экрана, ни с экранов, куда можно вернуться по return_stack.
+        """
+        if self._context_keys is None:
+            self._context_keys = self.manifest.context_keys()
+        live = self._context_keys
+        keep = set(PERSISTENT_KEYS)
+        screen_index = self.manifest.screen_index
+        return_screens = (screen_index.name(screen_no) for screen_no in state["return_stack"])
+        for screen_id in (state["current_screen"], *return_screens):
+            keys = live.own.get(screen_id)
+            if keys is None:
+                return  # экрана нет в манифесте — ничего не трогаем
+            keep.update(keys)
+        context = state["context"]
+        state["context"] = context.without([key for key in context if key not in keep and key not in live.common])
+
+    def _snapshot_context(self, state: Dict[str, Any]):
+        """
+        Запоминает контекст текущего экрана перед переходом. ContextMap
+        неизменяемый, поэтому снимок — это просто ссылка на текущую версию.
+        """
+        screen_no = self.manifest.screen_index.number(state["current_screen"])
+        snapshots = state["context_snapshots"]
+        for i, (snapshot_screen, _) in enumerate(snapshots):
+            if snapshot_screen == screen_no:
+                del snapshots[i:]  # повторный вход на экран схлопывает цикл
+                break
+        snapshots.append((screen_no, state["context"]))
+        if len(snapshots) > self.context_snapshot_depth:
+            del snapshots[0]
+
+    def _restore_context(self, state: Dict[str, Any]):
+        """После возврата восстанавливает контекст, с которым пользователь уходил с экрана."""
+        screen_no = self.manifest.screen_index.number(state["current_screen"])
+        snapshots = state["context_snapshots"]
+        for i in range(len(snapshots) - 1, -1, -1):
+            if snapshots[i][0] == screen_no:
+                state["context"] = snapshots[i][1]
+                del snapshots[i:]
+                return
+
+    def handle_actions_batch(self, actions: Iterable[Tuple[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Применяет пачку пар (user_id, action_data) в исходном порядке
+        (значит, и в порядке действий каждого пользователя), затем рендерит
+        итоговые view всех затронутых пользователей одним render_views_batch.
+        """
+        touched: Dict[str, None] = {}
+        for user_id, action_data in actions:
+            self.handle_action(user_id, action_data)
+            touched[user_id] = None
+        return self.render_views_batch(list(touched))
+
+    def render_views_batch(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Рендерит view для нескольких пользователей. Каждый уникальный запрос
+        к источнику данных выполняется один раз, разные — параллельно.
+        """
+        user_ids = list(user_ids)
+        requests: Dict[Tuple[str, str], Optional[float]] = {}
+        for user_id in user_ids:
+            state = self.get_user_state(user_id)
+            screen_def = self.manifest.screens.get(state["current_screen"])
+            if screen_def and screen_def["type"] == "dynamic":
+                if self.analytics is not None and "local" in screen_def["data_source"]:
+                    continue  # скорее всего обслужим из локальных данных
+                requests[self._data_source_request(screen_def, state["context"])] = screen_def["data_source"].get("ttl")
+        prefetched = self._fetch_many(requests)
+        return {user_id: self._get_view(user_id, prefetched) for user_id in user_ids}
+
+    def add_ready_listener(self, listener: Callable[[str, Tuple[str, str]], None]):
+        """
+        listener(user_id, (url, method)) вызывается из фонового потока, когда
+        запрос, не уложившийся в бюджет экрана, завершился: view пользователя
+        пора перерисовать.
+        """
+        self._ready_listeners.append(listener)
+
+    def _after_fork(self):
+        """
+        Вызывается в дочернем процессе после os.fork: потоки пула запросов
+        fork не переживают, а захваченные ими блокировки остались бы
+        захваченными навсегда. Пул и учёт запросов в полёте создаются заново;
+        keep-alive соединения клиента API и буфер трасс родителя не наследуются.
+        """
+        self._fetch_executor = None
+        self._pending_lock = threading.Lock()
+        self._pending_fetches = {}
+        self._waiting_users = {}
+        self._ready_users = {}
+        self.sessions._lock = threading.RLock()
+        if self.view_cache is not None:
+            self.view_cache._lock = threading.Lock()
+        if self.analytics is not None:
+            self.analytics._lock = threading.Lock()
+        after_fork = getattr(self.api_client, "_after_fork", None)
+        if after_fork is not None:
+            after_fork()
+        self.tracer._after_fork()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._fetch_executor is None:
+            self._fetch_executor = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="nav-fetch")
+        return self._fetch_executor
+
+    def _fetch_within_budget(self, user_id: str, screen_def: Dict[str, Any], request: Tuple[str, str]) -> Tuple[Any, str]:
+        """
+        Данные источника за `latency_budget_ms` экрана. Возвращает (items, freshness):
+        "fresh" — ответ успел; "stale" — последний ответ из data_cache;
+        "loading" — данных нет совсем (items = None).
+        """
+        source = screen_def["data_source"]
+        ttl = source.get("ttl")
+        if ttl:
+            items = self.data_cache.get(request, ttl)
+            if items is not None:
+                return items, "fresh"
+        with self._pending_lock:
+            ready = self._ready_users.get(request)
+            if ready and user_id in ready:
+                # Фоновый запрос для этого пользователя уже завершился — показываем его результат
+                ready.discard(user_id)
+                if not ready:
+                    del self._ready_users[request]
+                items = self.data_cache.get(request)
+                if items is not None:
+                    return items, "fresh"
+            deadline = time.monotonic() + screen_def["latency_budget_ms"] / 1000
+            future = self._pending_fetches.get(request)
+            started = future is None
+            if started:
+                # Один запрос в полёте на источник, сколько бы пользователей его ни ждали
+                future = self._executor().submit(copy_context().run, self._fetch_items, *request, None, deadline)
+                self._pending_fetches[request] = future
+        if started:
+            # Вне блокировки: уже завершившийся future вызовет колбэк сразу
+            future.add_done_callback(lambda done: self._fetch_done(request, done))
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic())), "fresh"
+        except FetchTimeout:
+            pass
+        self.budget_violations[source["url"]] += 1
+        with self._pending_lock:
+            if not future.done():
+                self._waiting_users.setdefault(request, set()).add(user_id)
+        if future.done() and future.exception() is None:
+            return future.result(), "fresh"  # успел, пока считали нарушение
+        items = self.data_cache.get(request)
+        if items is not None:
+            return items, "stale"
+        return None, "loading"
+
+    def _fetch_done(self, request: Tuple[str, str], future: Future):
+        users: Set[str] = set()
+        failed = True
+        try:
+            failed = future.cancelled() or future.exception() is not None
+            if failed:
+                error = "отменён" if future.cancelled() else f"не удался: {future.exception()!r}"
+                self.logger.log_error(f"Фоновый запрос {request[1]} {request[0]} {error}")
+        finally:
+            # Ожидающие снимаются при любом исходе запроса; готовыми они становятся
+            # только при успехе и только до следующего ответа этого источника
+            with self._pending_lock:
+                self._pending_fetches.pop(request, None)
+                users = self._waiting_users.pop(request, set())
+                if failed or not users:
+                    self._ready_users.pop(request, None)
+                else:
+                    self._ready_users[request] = users
+        if failed:
+            return
+        for user_id in users:
+            for listener in list(self._ready_listeners):
+                listener(user_id, request)
+
+    def _fetch_many(self, requests: Dict[Tuple[str, str], Optional[float]]) -> Dict[Tuple[str, str], Any]:
+        """Запросы -> ответы; значение в `requests` — допустимый возраст кэша (ttl)."""
+        if len(requests) <= 1 or self.fetch_workers <= 1:
+            return {request: self._fetch_items(*request, max_age=ttl) for request, ttl in requests.items()}
+        # Копия контекста на задачу: span'ы запросов остаются в трассе вызывающего
+        contexts = [copy_context() for _ in requests]
+        results = self._executor().map(
+            lambda ctx, request: ctx.run(self._fetch_items, *request, max_age=requests[request]), contexts, requests
+        )
+        return dict(zip(requests, results))
+
+    def _data_source_request(self, screen_def: Dict[str, Any], context: Dict[str, Any]) -> Tuple[str, str]:
+        source = screen_def["data_source"]
+        return self._render_template(source["url"], context), source["method"]
+
+    def _fetch_items(self, url: str, method: str, max_age: Optional[float] = None, deadline: Optional[float] = None) -> Any:
+        """
+        Запрос к источнику данных; при `max_age` (ttl из data_source) сперва смотрим кэш.
+        `deadline` (time.monotonic()) передаётся в api_client.call.
+        Ответ из снимка отдаётся сразу и перепроверяется в фоне.
+        """
+        warm = self.data_cache.warm((url, method))
+        if warm is not None:
+            self._revalidate((url, method))
+            return warm
+        if max_age:
+            items = self.data_cache.get((url, method), max_age)
+            if items is not None:
+                return items
+        return self._call_source(url, method, deadline)
+
+    def _revalidate(self, request: Tuple[str, str]):
+        """Фоновый запрос за свежим ответом; не больше одного в полёте на источник."""
+        with self._pending_lock:
+            if request in self._pending_fetches:
+                return
+            future = self._executor().submit(copy_context().run, self._call_source, *request)
+            self._pending_fetches[request] = future
+        future.add_done_callback(lambda done: self._fetch_done(request, done))
+
+    def _call_source(self, url: str, method: str, deadline: Optional[float] = None) -> Any:
+        self.logger.log_api_call(url, method)
+        with self.tracer.span("api_client.call", url=url, method=method):
+            if deadline is None:
+                items = self.api_client.call(url, method)
+            else:
+                items = self.api_client.call(url, method, deadline=deadline)
+        self.data_cache.put((url, method), items)
+        return items
+
+    def _refresh_search_indexes(self, source_key: Tuple[str, str], items: Any):
+        # Копия: потоки запросов в это время могут добавлять индексы
+        for (url, method, _), index in list(self.search_indexes.items()):
+            if (url, method) == source_key:
+                index.update(items)
+
+    def _drop_search_indexes(self, source_key: Tuple[str, str]):
+        for index_key in list(self.search_indexes):
+            if index_key[:2] == source_key:
+                self.search_indexes.pop(index_key, None)
+
+    def _search_items(self, screen_def: Dict[str, Any], request: Tuple[str, str], items: Any, context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Фильтрует элементы через поисковый индекс источника:
+        "search": {"field": "full_name", "query": "{{letter}}", "mode": "first_letter" | "prefix" | "substring"}.
+        """
+        search = screen_def["search"]
+        index_key = (*request, search["field"])
+        index = self.search_indexes.get(index_key)
+        if index is None:
+            # Индекс из снимка годится, только пока ответ источника тоже из снимка
+            restorable = self.snapshot is not None and ("search", index_key) in self.snapshot.sections
+            if restorable and self.data_cache.warm(request) is not None:
+                index = SearchIndex.restore(self.snapshot.read("search", index_key), items)
+            else:
+                index = SearchIndex(search["field"])
+                index.update(items)
+            # дальше индекс обновляет подписка на data_cache
+            self.search_indexes[index_key] = index
+        query = self._render_template(search["query"], context)
+        if "{{" in query:
+            query = ""  # ключ запроса ещё не задан — показываем всё
+        mode = search.get("mode", "substring")
+        if mode == "first_letter":
+            return index.prefix(query, first_word_only=True)
+        if mode == "prefix":
+            return index.prefix(query)
+        return index.search(query)
+
+    def _render_view(
+        self,
+        user_id: str,
+        state: Dict[str, Any],
+        screen_id: str,
+        screen_def: Dict[str, Any],
+        prefetched: Optional[Dict[Tuple[str, str], Any]] = None
+    ) -> Dict[str, Any]:
         title = self._render_template(screen_def["title"], state["context"])
 
         # Обработка чата: возвращаем специальный тип
@@ -54,33 +485,57 @@ class NavigationEngine:
             self.logger.log_view_rendered(user_id, screen_id, title)
             return {"text": title, "actions": [], "screen_type": "chat_input"}
 
+        freshness = "fresh"
+        if screen_def["type"] == "dynamic" and "latency_budget_ms" in screen_def:
+            request = self._data_source_request(screen_def, state["context"])
+            uses_local = self.analytics is not None and "local" in screen_def["data_source"]
+            if not uses_local and (prefetched is None or request not in prefetched):
+                items, freshness = self._fetch_within_budget(user_id, screen_def, request)
+                if freshness == "loading":
+                    return self._loading_view(user_id, screen_id, screen_def, title)
+                prefetched = {**(prefetched or {}), request: items}
+
         if screen_def["type"] == "dynamic":
-            actions = self._build_dynamic_actions(user_id, screen_def, state["context"])
+            with self.tracer.span("_build_dynamic_actions", screen_id=screen_id):
+                actions = self._build_dynamic_actions(user_id, screen_def, state["context"], prefetched)
         elif screen_def.get("paginated"):
-            actions = self._build_paginated_actions(user_id, screen_def, state["context"])
+            with self.tracer.span("_build_paginated_actions", screen_id=screen_id):
+                actions = self._build_paginated_actions(user_id, screen_def, state["context"])
         else:
-            actions = self._build_static_actions(screen_def)
+            with self.tracer.span("_build_static_actions", screen_id=screen_id):
+                actions = self._build_static_actions(screen_def)
 
-        back_path = screen_def.get("back_path")
-        if back_path:
-            back_label = screen_def.get("back_label", self.manifest.defaults["back_button_label"])
-            actions.append({"id": "back", "label": back_label, "type": "back"})
+        if screen_def.get("back_path"):
+            actions.append(self._back_action(screen_def))
 
         self.logger.log_view_rendered(user_id, screen_id, title)
         # Добавляем информацию о layout, если есть
         view_data = {"text": title, "actions": actions, "screen_type": screen_def["type"]}
+        if freshness == "stale":
+            # Бюджет задержки превышен: показаны последние известные данные
+            view_data["stale"] = True
+        if "input_context_key" in screen_def:
+            # Экран принимает текст (например, строку поиска) помимо кнопок
+            view_data["accepts_input"] = True
         if screen_def.get("layout") == "grid":
             view_data["layout"] = "grid"
             view_data["columns"] = screen_def.get("columns", 1)
         return view_data
 
+    def _loading_view(self, user_id: str, screen_id: str, screen_def: Dict[str, Any], title: str) -> Dict[str, Any]:
+        """Облегчённый view, пока данные экрана догружаются в фоне (см. add_ready_listener)."""
+        actions = [self._back_action(screen_def)] if screen_def.get("back_path") else []
+        text = f"{title}\n\n{self.manifest.defaults.get('loading_text', 'Загрузка…')}"
+        self.logger.log_view_rendered(user_id, screen_id, text)
+        return {"text": text, "actions": actions, "screen_type": screen_def["type"], "loading": True}
+
     def _render_template(self, template: str, context: Dict[str, Any]) -> str:
         result = template
         for key, value in context.items():
             result = result.replace(f"{{{{{key}}}}}", str(value))
         return result
 
-    def _record_selection(self, user_id: str, screen_id: str, selected_item: Dict[str, Any]):
+    def _record_selection(self, user_id: str, screen_id: str, selected_item: Dict[str, Any], context: Optional[Dict[str, Any]] = None):
         """
         Записывает выбор пользователя.
         Если экран не поддерживает мультивыбор, удаляет предыдущие выборы на этом экране.
@@ -95,96 +550,144 @@ class NavigationEngine:
 
         # Добавляем новый выбор
         # Используем time.time() для timestamp
+        timestamp = time.time()
         state["selections"].append({
             "screen_id": screen_id,
             "selected_item": selected_item,
-            "timestamp": time.time()
+            "timestamp": timestamp
         })
+        if self.analytics is not None:
+            target = selected_item.get("target") or selected_item.get("action")
+            self.analytics.append(user_id, screen_id, target, context, timestamp)
+
+    def _shared(self, key: tuple, build: Callable[[], Any]) -> Any:
+        """Кнопки, общие для всех пользователей, строятся один раз на версию манифеста."""
+        if self._shared_actions_version != self.manifest.version:
+            self._shared_actions = {}
+            self._shared_actions_version = self.manifest.version
+        value = self._shared_actions.get(key)
+        if value is None:
+            value = self._shared_actions[key] = build()
+        return value
 
-    def _build_static_actions(self, screen_def: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _back_action(self, screen_def: Dict[str, Any]) -> Action:
+        label = screen_def.get("back_label", self.manifest.defaults["back_button_label"])
+        return self._shared(("back", label), lambda: back(label))
+
+    def _build_static_actions(self, screen_def: Dict[str, Any]) -> List[Action]:
+        return list(self._shared(("static", screen_def["id"]), lambda: self._static_actions(screen_def)))
+
+    def _static_actions(self, screen_def: Dict[str, Any]) -> Tuple[Action, ...]:
         actions = []
         for i, btn in enumerate(screen_def["buttons"]):
-            action_dict = {
-                "id": f"static_{i}",
-                "label": btn["label"],
-            }
-            # Проверяем, есть ли 'target' — если есть, то это навигация
+            # Есть 'target' — навигация, есть 'action' — действие
+            # Добавляем payload, если он есть
+            fields = {"payload": btn["payload"]} if "payload" in btn else {}
             if "target" in btn:
-                action_dict["type"] = "navigate"
-                action_dict["target"] = btn["target"]
-            # Если 'target' нет, но есть 'action' — это действие
+                action = Action(f"static_{i}", btn["label"], NAVIGATE, target=btn["target"], **fields)
             elif "action" in btn:
-                action_dict["type"] = "action"
-                action_dict["action"] = btn["action"]
+                action = Action(f"static_{i}", btn["label"], ACTION, action=btn["action"], **fields)
             # Если нет ни 'target', ни 'action', ставим 'unknown' и логируем
             else:
-                action_dict["type"] = "unknown"
+                action = Action(f"static_{i}", btn["label"], UNKNOWN, **fields)
                 self.logger.log_error(f"Кнопка не имеет ни 'target', ни 'action': {btn}")
 
-            # Добавляем payload, если он есть
-            if "payload" in btn:
-                action_dict["payload"] = btn["payload"]
+            actions.append(action)
+        return tuple(actions)
 
-            actions.append(action_dict)
-        return actions
-
-    def _build_dynamic_actions(self, user_id: str, screen_def: Dict[str, Any], context: Dict[str, Any]) -> List[Dict[str, Any]]:
-        url = self._render_template(screen_def["data_source"]["url"], context)
-        self.logger.log_api_call(url, screen_def["data_source"]["method"])
-        items = self.api_client.call(url, screen_def["data_source"]["method"])
+    def _build_dynamic_actions(
+        self,
+        user_id: str,
+        screen_def: Dict[str, Any],
+        context: Dict[str, Any],
+        prefetched: Optional[Dict[Tuple[str, str], Any]] = None
+    ) -> List[Action]:
+        items = self._local_items(user_id, screen_def)
+        if not items:
+            request = self._data_source_request(screen_def, context)
+            if prefetched is not None and request in prefetched:
+                items = prefetched[request]
+            else:
+                items = self._fetch_items(*request, max_age=screen_def["data_source"].get("ttl"))
+            if "search" in screen_def:
+                items = self._search_items(screen_def, request, items, context)
+        start, end = 0, len(items)
+        if screen_def.get("paginated"):
+            start, end = self._page_bounds(user_id, screen_def, len(items))
         actions = []
         template = screen_def["button_template"]
-        for i, item in enumerate(items):
+        label_field, target = template["label_field"], template["target_screen"]
+        context_fields = tuple(template.get("context_fields", {}).items())
+        new_action = Action.navigation
+        for i, item in enumerate(items[start:end], start):
             next_context = {}
-            for ctx_key, item_key in template.get("context_fields", {}).items():
+            for ctx_key, item_key in context_fields:
                 next_context[ctx_key] = item.get(item_key, "")
-            actions.append({
-                "id": f"dynamic_{i}",
-                "label": item.get(template["label_field"], f"Item {i}"),
-                "type": "navigate",
-                "target": template["target_screen"],
-                "context": next_context
-            })
+            actions.append(new_action(dynamic_id(i), item.get(label_field, f"Item {i}"), target, next_context))
+        if screen_def.get("paginated"):
+            actions.extend(self._page_actions(user_id, screen_def, len(items)))
         return actions
 
-    def _build_paginated_actions(self, user_id: str, screen_def: Dict[str, Any], context: Dict[str, Any]) -> List[Dict[str, Any]]:
-        items = screen_def["items"]
+    def _local_items(self, user_id: str, screen_def: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Элементы из локальной аналитики вместо запроса к API, если экран это
+        разрешает: "local": {"query": "recent_context", "key": "student_id", "limit": 8}.
+        """
+        local = screen_def["data_source"].get("local")
+        if self.analytics is None or not local or local.get("query") != "recent_context":
+            return []
+        return self.analytics.recent_items(
+            user_id, local["key"], local.get("limit", 8),
+            label_field=screen_def["button_template"]["label_field"]
+        )
+
+    def _page_bounds(self, user_id: str, screen_def: Dict[str, Any], total: int) -> Tuple[int, int]:
         page_size = self.manifest.defaults["pagination"]["page_size"]
-        pagination_state = self._user_states[user_id]["pagination"]
-        screen_id_key = screen_def.get("id", "unknown")
-        current_page = pagination_state.get(screen_id_key, 0)
+        current_page = self.sessions[user_id]["pagination"].get(screen_def.get("id", "unknown"), 0)
         start = current_page * page_size
-        end = start + page_size
-        page_items = items[start:end]
+        return start, min(start + page_size, total)
+
+    def _page_actions(self, user_id: str, screen_def: Dict[str, Any], total: int) -> List[Action]:
+        """Кнопки листания для экрана с `total` элементами."""
+        screen_id_key = screen_def.get("id", "unknown")
+        start, end = self._page_bounds(user_id, screen_def, total)
+        labels = self.manifest.defaults["pagination"]
         actions = []
-        for i, item in enumerate(page_items):
-            actions.append({
-                "id": f"paginated_{start + i}",
-                "label": str(item),
-                "type": "navigate",
-                "target": screen_def.get("target", "item_selected"),
-                "payload": str(item)
-            })
-
-        if end < len(items):
-            actions.append({
-                "id": "next_page",
-                "label": self.manifest.defaults["pagination"]["next_label"],
-                "type": "paginate",
-                "direction": "next",
-                "screen_id": screen_id_key
-            })
-        if current_page > 0:
-            actions.append({
-                "id": "prev_page",
-                "label": self.manifest.defaults["pagination"]["prev_label"],
-                "type": "paginate",
-                "direction": "prev",
-                "screen_id": screen_id_key
-            })
+        if end < total:
+            actions.append(self._shared(
+                ("page", screen_id_key, "next"), lambda: paginate(labels["next_label"], "next", screen_id_key)
+            ))
+        if start > 0:
+            actions.append(self._shared(
+                ("page", screen_id_key, "prev"), lambda: paginate(labels["prev_label"], "prev", screen_id_key)
+            ))
+        return actions
+
+    def _build_paginated_actions(self, user_id: str, screen_def: Dict[str, Any], context: Dict[str, Any]) -> List[Action]:
+        items = self._shared(("items", screen_def["id"]), lambda: self._item_actions(screen_def))
+        start, end = self._page_bounds(user_id, screen_def, len(items))
+        actions = list(items[start:end])
+        actions.extend(self._page_actions(user_id, screen_def, len(items)))
         return actions
 
+    def _item_actions(self, screen_def: Dict[str, Any]) -> Tuple[Action, ...]:
+        """Кнопки всех элементов `items` экрана; страница — срез этого кортежа."""
+        context_key = screen_def.get("context_key")
+        target = screen_def.get("target", "item_selected")
+        actions = []
+        for i, item in enumerate(screen_def["items"]):
+            fields = {"target": target, "payload": str(item)}
+            if context_key:
+                # Выбранный элемент передаётся дальше через контекст
+                fields["context"] = {context_key: str(item)}
+            actions.append(Action(f"paginated_{i}", str(item), NAVIGATE, **fields))
+        return tuple(actions)
+
     def handle_action(self, user_id: str, action_data: Dict[str, Any]) -> Union[Dict[str, Any], None]:
+        with self.tracer.span("handle_action", user_id=user_id, action_type=action_data.get("type")):
+            return self._handle_action(user_id, action_data)
+
+    def _handle_action(self, user_id: str, action_data: Dict[str, Any]) -> Union[Dict[str, Any], None]:
         state = self.get_user_state(user_id)
         action_type = action_data["type"]
         self.logger.log_user_action(user_id, "unknown", action_data["label"])
@@ -197,7 +700,11 @@ class NavigationEngine:
             self._handle_navigate(user_id, state, action_data)
             # Записываем выбор на *предыдущем* экране
             if "target" in action_data:
-                self._record_selection(user_id, current_screen_before_navigate, {"type": "navigate", "target": action_data["target"]})
+                self._record_selection(
+                    user_id, current_screen_before_navigate,
+                    {"type": "navigate", "target": action_data["target"]},
+                    action_data.get("context")
+                )
         elif action_type == "paginate":
             self._handle_paginate(user_id, state, action_data)
         elif action_type == "action":
@@ -224,13 +731,15 @@ class NavigationEngine:
         back_path = screen_def.get("back_path")
         if back_path == "CONTEXTUAL":
             if state["return_stack"]:
-                state["current_screen"] = state["return_stack"].pop()
+                state["current_screen"] = self.manifest.screen_index.name(state["return_stack"].pop())
             else:
                 state["current_screen"] = "main"
         elif back_path:
             state["current_screen"] = back_path
         else:
             state["current_screen"] = "main"
+        self._restore_context(state)
+        self._prune_context(state)
 
     def _handle_navigate(self, user_id: str, state: Dict[str, Any], action_data: Dict[str, Any]):
         target_screen = action_data["target"]
@@ -239,10 +748,16 @@ class NavigationEngine:
             return
         next_screen_def = self.manifest.screens.get(target_screen, {})
         if next_screen_def.get("back_path") == "CONTEXTUAL":
-            state["return_stack"].append(state["current_screen"])
+            # Повторный вход схлопывает цикл (select_metric <-> confirm_mark), глубина ограничена
+            state["return_stack"].push(self.manifest.screen_index.number(state["current_screen"]))
+        self._snapshot_context(state)
         state["current_screen"] = target_screen
         if "context" in action_data:
-            state["context"].update(action_data["context"])
+            state["context"] = state["context"].set_many(action_data["context"])
+            if next_screen_def.get("paginated"):
+                # Новый контекст — новый список: начинаем с первой страницы
+                state["pagination"].pop(target_screen, None)
+        self._prune_context(state)
 
     def _handle_paginate(self, user_id: str, state: Dict[str, Any], action_data: Dict[str, Any]):
         screen_id = action_data["screen_id"]
@@ -253,26 +768,53 @@ class NavigationEngine:
         pagination_state[screen_id] = max(0, new_page)
 
     def _submit_mark(self, user_id: str, state: Dict[str, Any], action_data: Dict[str, Any]):
-        # Логгируем API вызов
-        self.logger.log_api_call("/api/marks", "POST")
-        # Сохраняем важные данные контекста (например, student_id, student_name)
-        # которые должны остаться при возврате к select_metric
-        saved_context = {key: value for key, value in state["context"].items() if key in ["student_id", "student_name"]}
-        # Устанавливаем экран на 'select_metric' (указан в back_path для confirm_mark)
         screen_def = self.manifest.screens.get(state["current_screen"]) # Текущий экран - confirm_mark
+        # Логгируем API вызов (описан в манифесте у кнопки, см. "request")
+        request = next(
+            (btn["request"] for btn in (screen_def or {}).get("buttons", []) if btn.get("action") == "submit_mark" and "request" in btn),
+            {"url": "/api/marks", "method": "POST"}
+        )
+        self.logger.log_api_call(self._render_template(request["url"], state["context"]), request["method"])
+        # Устанавливаем экран на 'select_metric' (указан в back_path для confirm_mark)
         back_path = screen_def.get("back_path") if screen_def else "main"
         if back_path == "select_metric": # Явно проверяем, куда возвращаться
             state["current_screen"] = "select_metric"
-            # Восстанавливаем контекст студента
-            state["context"].update(saved_context)
             # Очищаем return_stack, так как возврат не по нему
-            state["return_stack"] = []
+            state["return_stack"].clear()
         else:
             # Если back_path не select_metric, возвращаемся по стеку или на main
             if state["return_stack"]:
-                state["current_screen"] = state["return_stack"].pop()
+                state["current_screen"] = self.manifest.screen_index.name(state["return_stack"].pop())
             else:
                 state["current_screen"] = "main"
+        # Нужные дальше ключи (student_id, student_name, ...) определяет анализ манифеста
+        self._prune_context(state)
+
+    def ai_request(self, user_id: str, text: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        (url, тело) запроса к AI по `ai_api` текущего экрана или None, если экран
+        его не объявляет. `{{user_message}}` — текст пользователя; ключи, которых
+        нет в контексте, подставляются пустой строкой.
+        """
+        state = self.get_user_state(user_id)
+        screen_def = self.manifest.screens.get(state["current_screen"])
+        ai_api = (screen_def or {}).get("ai_api")
+        if not ai_api:
+            return None
+        values = {**state["context"], "user_message": text}
+
+        def render(value: Any) -> Any:
+            if isinstance(value, str):
+                for key in template_keys(value):
+                    value = value.replace(f"{{{{{key}}}}}", str(values.get(key, "")))
+                return value
+            if isinstance(value, dict):
+                return {key: render(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [render(item) for item in value]
+            return value
+
+        return render(ai_api["url"]), render(ai_api.get("body_template", {}))
 
     def handle_user_input(self, user_id: str, text: str):
         state = self.get_user_state(user_id)
@@ -288,6 +830,8 @@ class NavigationEngine:
                 # Возвращаемся на back_path
                 back_path = screen_def.get("back_path", "main")
                 state["current_screen"] = back_path
+                self._restore_context(state)
+                self._prune_context(state)
                 # Очищаем контекст чата, если есть
                 # (например, если хранится история, её можно сбросить)
                 # state["context"].pop("chat_history", None)
@@ -304,6 +848,12 @@ class NavigationEngine:
             self.logger.log_api_call("/api/ai/teacher-assist", "POST")
             self.logger.logger.info(f"USER[{user_id}] AI_RESPONSE: {ai_response}")
 
+        elif screen_def and "input_context_key" in screen_def:
+            # Экран с полем ввода (поиск): текст попадает в контекст, листание сбрасывается
+            self.logger.log_user_action(user_id, "user_input", f"«{text}»")
+            state["context"] = state["context"].set(screen_def["input_context_key"], text.strip())
+            state["pagination"].pop(screen_id, None)
+
         else:
             # Если не в чат-режиме, можно игнорировать или логировать
             self.logger.log_user_action(user_id, "user_input_ignored", f"«{text}» - not in chat mode")
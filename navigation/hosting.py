@@ -0,0 +1,348 @@
+# navigation/hosting.py
+"""
+Несколько ботов (школ) в одном процессе и одном event loop.
+
+У каждого бота свой NavigationEngine, а значит своё пространство сессий
+(и свой каталог выгрузки холодных сессий). Общим держится то, что от бота
+не зависит:
+
+- ManifestRegistry — манифесты дедуплицируются по хэшу содержимого:
+  одинаковые файлы разных школ дают один скомпилированный манифест
+  с интернированными строками, один кэш view и один анализ контекста;
+  номера экранов (ScreenIndex) у всех его манифестов общие, поэтому
+  сессии переживают reload;
+- ApiClientPool — клиенты API по (base_url, токен) и пулы соединений
+  по хосту, так что школы на одном сервере делят keep-alive соединения;
+- пул потоков для запросов к источникам данных один на все движки;
+- BotMetrics — счётчики у каждого бота свои (обёртка MeteredApiClient
+  считает вызовы API поверх общего клиента).
+
+    host = BotHost()
+    host.add("school1", "manifests/school1.json", api_base_url="https://a.example")
+    host.add("school2", "manifests/school2.json", api_base_url="https://a.example")
+    view = host.get("school1").engine.get_current_view("42")
+    print(host.metrics(), host.stats())
+
+Движок блокирующий (запросы к API с таймаутами и повторами, ожидание
+бюджета задержки), поэтому из обработчиков event loop его вызывают через
+`await instance.run(user_id, func, *args)`: в потоке, по очереди для
+одного пользователя и параллельно для разных.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .context_analysis import LiveKeys
+from .engine import NavigationEngine
+from .logger import NavigationLogger
+from .manifest import ManifestLoader, ScreenIndex
+from .view_cache import ViewCache
+
+
+def intern_strings(value: Any) -> Any:
+    """
+    Интернирует строки в скомпилированном манифесте (ключи и значения):
+    одинаковые подписи кнопок и ключи экранов разных манифестов
+    становятся одним объектом. dict и list меняются на месте.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        items = [(sys.intern(k) if isinstance(k, str) else k, intern_strings(v)) for k, v in value.items()]
+        value.clear()
+        value.update(items)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            value[i] = intern_strings(item)
+    return value
+
+
+class SharedManifest:
+    """Скомпилированный манифест и всё, что по нему можно посчитать один раз."""
+
+    __slots__ = ("loader", "view_cache", "refs")
+
+    def __init__(self, loader: ManifestLoader, view_cache: Optional[ViewCache]):
+        self.loader = loader
+        self.view_cache = view_cache
+        self.refs = 0
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.loader.version
+
+    def context_keys(self) -> LiveKeys:
+        return self.loader.context_keys()
+
+
+class ManifestRegistry:
+    def __init__(self, view_cache_size: int = 512):
+        self.view_cache_size = view_cache_size
+        self._by_hash: Dict[str, SharedManifest] = {}
+        self._lock = threading.Lock()
+        # Стеки возврата и снимки контекста хранят номера экранов: после
+        # перехода бота на новую версию манифеста они должны значить то же
+        self.screen_index = ScreenIndex()
+
+    def acquire(self, manifest_path: str) -> SharedManifest:
+        """Манифест по пути; если такое же содержимое уже загружено — он же."""
+        loader = ManifestLoader(manifest_path, screen_index=self.screen_index)
+        with self._lock:
+            shared = self._by_hash.get(loader.version)
+            if shared is None:
+                if isinstance(loader.screens, dict):
+                    # Разбитый манифест (LazyScreens) читается по экранам — его не трогаем
+                    intern_strings(loader.data)
+                view_cache = ViewCache(self.view_cache_size) if self.view_cache_size else None
+                shared = self._by_hash[loader.version] = SharedManifest(loader, view_cache)
+            shared.refs += 1
+        return shared
+
+    def release(self, shared: SharedManifest):
+        with self._lock:
+            shared.refs -= 1
+            if shared.refs <= 0 and self._by_hash.get(shared.version) is shared:
+                del self._by_hash[shared.version]
+
+    def __len__(self) -> int:
+        return len(self._by_hash)
+
+
+class ApiClientPool:
+    """
+    Общие клиенты API. Без base_url — одна заглушка APISimulator на всех;
+    иначе HttpApiClient на пару (base_url, токен) поверх общего для хоста
+    пула соединений.
+    """
+
+    def __init__(self, pool_size: int = 8, **client_kwargs):
+        self.pool_size = pool_size
+        self.client_kwargs = client_kwargs
+        self._clients: Dict[Tuple[Optional[str], Optional[str]], Any] = {}
+        self._pools: Dict[Tuple[str, str, Optional[int]], Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: Optional[str] = None, token: Optional[str] = None) -> Any:
+        key = (base_url, token)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self._new_client(base_url, token)
+        return client
+
+    def _new_client(self, base_url: Optional[str], token: Optional[str]) -> Any:
+        if base_url is None:
+            from .api_stub import APISimulator
+            return APISimulator()
+        from .http_client import ConnectionPool, HttpApiClient
+        parts = urlsplit(base_url)
+        pool_key = (parts.scheme, parts.hostname, parts.port)
+        pool = self._pools.get(pool_key)
+        if pool is None:
+            pool = self._pools[pool_key] = ConnectionPool(*pool_key, size=self.pool_size)
+        return HttpApiClient(
+            base_url,
+            headers={"Authorization": f"Bearer {token}"} if token else None,
+            pool=pool,
+            **self.client_kwargs
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {"api_clients": len(self._clients), "connection_pools": len(self._pools)}
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.close()
+
+
+class BotMetrics:
+    """Счётчики одного бота: события, ошибки и время их обработки."""
+
+    def __init__(self):
+        self.counters: Counter = Counter()
+        self.seconds: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, event: str, elapsed: float, error: bool = False):
+        # Вызовы API приходят и из пула запросов движка
+        with self._lock:
+            self.counters[event] += 1
+            self.seconds[event] += elapsed
+            if error:
+                self.counters[f"{event}.errors"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                event: {
+                    "count": count,
+                    "errors": self.counters[f"{event}.errors"],
+                    "avg_ms": round(self.seconds[event] / count * 1000, 3),
+                }
+                for event, count in self.counters.items()
+                if not event.endswith(".errors")
+            }
+
+
+class MeteredApiClient:
+    """Обёртка над общим клиентом API: вызовы считаются в метрики своего бота."""
+
+    def __init__(self, client: Any, metrics: BotMetrics):
+        self.client = client
+        self.metrics = metrics
+
+    def call(self, url: str, method: str = "GET", **kwargs) -> Any:
+        started = time.perf_counter()
+        try:
+            result = self.client.call(url, method, **kwargs)
+        except Exception:
+            self.metrics.observe("api.call", time.perf_counter() - started, error=True)
+            raise
+        self.metrics.observe("api.call", time.perf_counter() - started)
+        return result
+
+
+class BotInstance:
+    __slots__ = ("name", "manifest_path", "engine", "metrics", "shared", "_user_locks")
+
+    def __init__(self, name: str, manifest_path: str, engine: NavigationEngine, metrics: BotMetrics, shared: SharedManifest):
+        self.name = name
+        self.manifest_path = manifest_path
+        self.engine = engine
+        self.metrics = metrics
+        self.shared = shared
+        # Блокировка живёт, пока её держат или ждут вызовы пользователя
+        self._user_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def run(self, user_id: str, func: Callable[..., Any], *args) -> Any:
+        """
+        Выполняет func(*args) — работу с движком для user_id — в потоке, не
+        занимая event loop. Вызовы одного пользователя идут по очереди (его
+        состояние меняется на месте), разных пользователей — параллельно.
+        """
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        async with lock:
+            return await asyncio.to_thread(self._run_held, user_id, func, args)
+
+    def _run_held(self, user_id: str, func: Callable[..., Any], args: tuple) -> Any:
+        with self.engine.sessions.hold(user_id):
+            return func(*args)
+
+
+class BotHost:
+    """
+    Набор ботов одного процесса. Параметры движка по умолчанию передаются
+    в конструктор и могут быть переопределены в add(); выгрузка сессий
+    идёт в `<session_spill_dir>/<имя бота>`.
+    """
+
+    def __init__(
+        self,
+        registry: Optional[ManifestRegistry] = None,
+        clients: Optional[ApiClientPool] = None,
+        session_spill_dir: Optional[str] = None,
+        log_file: str = "navigation.log",
+        fetch_workers: int = 16,
+        **engine_kwargs
+    ):
+        self.registry = registry or ManifestRegistry()
+        self.clients = clients or ApiClientPool()
+        self.session_spill_dir = session_spill_dir
+        self.log_file = log_file
+        self.engine_kwargs = engine_kwargs
+        self._executor = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="host-fetch")
+        self._bots: Dict[str, BotInstance] = {}
+
+    def add(
+        self,
+        name: str,
+        manifest_path: str = "menu-manifest.json",
+        api_base_url: Optional[str] = None,
+        api_token: Optional[str] = None,
+        **engine_kwargs
+    ) -> BotInstance:
+        if name in self._bots:
+            raise ValueError(f"Бот '{name}' уже добавлен")
+        shared = self.registry.acquire(manifest_path)
+        metrics = BotMetrics()
+        kwargs = {**self.engine_kwargs, **engine_kwargs}
+        if self.session_spill_dir and "session_spill_dir" not in kwargs:
+            kwargs["session_spill_dir"] = os.path.join(self.session_spill_dir, name)
+        engine = NavigationEngine(
+            manifest_path,
+            logger=NavigationLogger(f"NavigationBot[{name}]", log_file=self.log_file),
+            api_client=MeteredApiClient(self.clients.get(api_base_url, api_token), metrics),
+            manifest=shared.loader,
+            view_cache=shared.view_cache,
+            **kwargs
+        )
+        engine._context_keys = shared.context_keys()
+        engine._fetch_executor = self._executor
+        instance = self._bots[name] = BotInstance(name, manifest_path, engine, metrics, shared)
+        return instance
+
+    def get(self, name: str) -> BotInstance:
+        return self._bots[name]
+
+    def __iter__(self) -> Iterator[BotInstance]:
+        return iter(list(self._bots.values()))
+
+    def __len__(self) -> int:
+        return len(self._bots)
+
+    def remove(self, name: str):
+        instance = self._bots.pop(name)
+        self.registry.release(instance.shared)
+
+    def reload(self, name: str) -> bool:
+        """
+        Перечитывает манифест бота. Общий загрузчик не трогается: бот
+        переходит на запись реестра для нового содержимого. Номера экранов
+        в сессиях остаются верными — индекс экранов у записей реестра общий.
+        Возвращает True, если версия изменилась.
+        """
+        instance = self._bots[name]
+        shared = self.registry.acquire(instance.manifest_path)
+        old = instance.shared
+        if shared is old:
+            self.registry.release(shared)
+            return False
+        engine = instance.engine
+        engine.manifest = shared.loader
+        engine.view_cache = shared.view_cache
+        engine._context_keys = shared.context_keys()
+        instance.shared = shared
+        self.registry.release(old)
+        return True
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for instance in self:
+            engine = instance.engine
+            report[instance.name] = {
+                "events": instance.metrics.snapshot(),
+                "sessions": len(engine.sessions),
+                "session_bytes": engine.sessions.hot_bytes,
+                "budget_violations": sum(engine.budget_violations.values()),
+                "manifest": instance.shared.version,
+            }
+        return report
+
+    def stats(self) -> Dict[str, int]:
+        """Сколько общего состояния реально разделено."""
+        return {"bots": len(self._bots), "manifests": len(self.registry), **self.clients.stats()}
+
+    def close(self):
+        for name in list(self._bots):
+            self.remove(name)
+        self._executor.shutdown(wait=False)
+        self.clients.close()
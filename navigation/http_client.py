@@ -0,0 +1,335 @@
+# navigation/http_client.py
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from queue import Empty, LifoQueue
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+# Повтор этих запросов не меняет состояние бэкенда; остальные повторяются
+# только с явным idempotent=True
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+# Так отказывает keep-alive соединение, которое бэкенд закрыл, пока оно
+# лежало в пуле: запрос ушёл в закрытый сокет, ответа не пришло ни байта
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+class RequestNotSent(OSError):
+    """Запрос не ушёл на бэкенд: нет свободного соединения или не удалось подключиться."""
+
+
+class ApiError(Exception):
+    """
+    Неудачный запрос при call(..., raise_errors=True). `status` — код ответа
+    (None — ответа не было); `sent` — запрос мог дойти до бэкенда.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, sent: bool = True):
+        super().__init__(message)
+        self.status = status
+        self.sent = sent
+
+
+class CircuitBreaker:
+    """
+    Классический автомат closed -> open -> half_open.
+    После `failure_threshold` неудач подряд запросы не выполняются
+    `reset_timeout` секунд, затем пропускается одна пробная попытка.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Пропускаем ровно одну пробную попытку
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class ConnectionPool:
+    """Пул keep-alive соединений к одному хосту."""
+
+    def __init__(self, scheme: str, host: str, port: Optional[int], size: int = 4):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.size = size
+        self._idle: LifoQueue = LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def acquire(self, timeout: float) -> http.client.HTTPConnection:
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"Пул соединений исчерпан ({self.size})")
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            return self._new_connection(timeout)
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool = True):
+        if reusable:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+    def _after_fork(self):
+        """
+        В дочернем процессе после os.fork: соединения пула общие с родителем,
+        и ответы на запросы двух процессов перемешались бы в одном сокете.
+        Закрываем только свою копию дескриптора (без shutdown — соединение
+        родителя живо), слоты пула создаём заново.
+        """
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            if conn.sock is not None:
+                os.close(conn.sock.detach())
+                conn.sock = None
+        self._slots = threading.BoundedSemaphore(self.size)
+
+
+class HttpApiClient:
+    """
+    Боевая реализация контракта `api_client`: `call(url, method, **kwargs)`.
+
+    - соединения переиспользуются через пул (keep-alive);
+    - `base_url` и `headers` (например, авторизация) задаются один раз;
+    - таймауты можно задать по префиксу пути источника данных (`source_timeouts`);
+    - ошибки сети и 5xx у GET/HEAD (и у запросов с idempotent=True)
+      повторяются ограниченное число раз с jitter: повтор POST после того,
+      как бэкенд уже записал изменение, создал бы дубликат;
+    - отказ соединения из пула, закрытого бэкендом за время простоя,
+      повтором не считается: запрос до бэкенда не дошёл и сразу уходит
+      по новому соединению (так и для POST);
+    - при открытом circuit breaker сразу возвращается последний удачный
+      ответ для этого URL или пустой список.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        pool_size: int = 4,
+        timeout: float = 5.0,
+        source_timeouts: Optional[Dict[str, float]] = None,
+        retries: int = 2,
+        backoff: float = 0.1,
+        max_backoff: float = 2.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        cache_size: int = 256,
+        logger: Optional[Any] = None,
+        pool: Optional[ConnectionPool] = None
+    ):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Неподдерживаемая схема base_url: {base_url}")
+        self.base_path = parts.path.rstrip("/")
+        self.headers = {"Accept": "application/json", **(headers or {})}
+        self.timeout = timeout
+        # Длинные префиксы проверяем первыми
+        self.source_timeouts = sorted((source_timeouts or {}).items(), key=lambda kv: -len(kv[0]))
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        # Пул можно разделить между клиентами одного хоста с разными заголовками
+        self.pool = pool or ConnectionPool(parts.scheme, parts.hostname, parts.port, pool_size)
+        self.logger = logger
+        self._cache: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+
+    def call(self, url: str, method: str = "GET", **kwargs) -> Any:
+        """
+        Выполняет запрос и возвращает разобранный JSON.
+        :param url: путь относительно base_url (/api/metrics)
+        :param method: HTTP-метод
+        :param kwargs: params (query), json (тело), timeout (секунды на попытку),
+            deadline (time.monotonic(), после которого ответ уже не ждут:
+            попытки, их таймауты и паузы между ними за него не выходят),
+            idempotent (повторять ли запрос; по умолчанию — только GET/HEAD),
+            raise_errors (вместо кэша или [] выбросить ApiError)
+        :return: ответ API; при недоступности бэкенда — кэш или []
+        """
+        path = self.base_path + url
+        if kwargs.get("params"):
+            path += "?" + urlencode(kwargs["params"])
+        # Кэш последних ответов — по пути вместе с query: другие params — другие данные
+        key = (method, path)
+        deadline = kwargs.get("deadline")
+        raise_errors = kwargs.get("raise_errors", False)
+        # Дедлайн проверяем до breaker: пробная попытка half_open не должна пропасть
+        if deadline is not None and deadline <= time.monotonic():
+            if raise_errors:
+                raise ApiError(f"HTTP {method} {url}: дедлайн истёк", sent=False)
+            return self._fallback(key)
+        if not self.breaker.allow():
+            if raise_errors:
+                raise ApiError(f"HTTP {method} {url}: circuit breaker открыт", sent=False)
+            return self._fallback(key)
+
+        timeout = kwargs.get("timeout") or self._timeout_for(url)
+        idempotent = kwargs.get("idempotent")
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        retries = self.retries if idempotent else 0
+        body = None
+        headers = dict(self.headers)
+        if "json" in kwargs:
+            body = json.dumps(kwargs["json"], ensure_ascii=False).encode("utf-8")
+            headers["Content-Type"] = "application/json; charset=utf-8"
+
+        # Для raise_errors: последняя ошибка и могла ли хоть одна попытка дойти до бэкенда
+        failure, failed_status, sent = "нет ответа", None, False
+        for attempt in range(retries + 1):
+            attempt_timeout = timeout
+            if deadline is not None:
+                # Попытка не переживает дедлайн (паузы перед повторами проверены ниже)
+                attempt_timeout = max(0.001, min(timeout, deadline - time.monotonic()))
+            try:
+                status, data = self._request(method, path, body, headers, attempt_timeout)
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                self._log_error(f"HTTP {method} {url}: {e!r} (попытка {attempt + 1})")
+                failure, failed_status = repr(e), None
+                sent = sent or not isinstance(e, RequestNotSent)
+            else:
+                sent = True
+                if status < 400:
+                    self.breaker.record_success()
+                    self._remember(key, data)
+                    return data
+                if status < 500:
+                    # Ошибка клиента — повтор не поможет, бэкенд при этом жив
+                    self.breaker.record_success()
+                    self._log_error(f"HTTP {method} {url}: статус {status}")
+                    if raise_errors:
+                        raise ApiError(f"HTTP {method} {url}: статус {status}", status)
+                    return []
+                self._log_error(f"HTTP {method} {url}: статус {status} (попытка {attempt + 1})")
+                failure, failed_status = f"статус {status}", status
+            if attempt < retries:
+                # Full jitter: равномерно в [0, backoff * 2^attempt]
+                pause = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+                if deadline is not None and time.monotonic() + pause >= deadline:
+                    break  # повтор уже никто не дождётся
+                time.sleep(pause)
+
+        self.breaker.record_failure()
+        if raise_errors:
+            raise ApiError(f"HTTP {method} {url}: {failure}", failed_status, sent)
+        return self._fallback(key)
+
+    def close(self):
+        self.pool.close()
+
+    def _after_fork(self):
+        """Дочерний процесс: свои соединения и блокировки (захваченные при fork не освободятся)."""
+        self.pool._after_fork()
+        self.breaker._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+
+    def _request(self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str], timeout: float):
+        try:
+            conn = self.pool.acquire(timeout)
+        except TimeoutError as e:
+            raise RequestNotSent(str(e)) from e
+        reusable = False
+        try:
+            response = None
+            if conn.sock is not None:
+                try:
+                    response, raw = self._exchange(conn, method, path, body, headers)
+                except _STALE_CONNECTION_ERRORS as e:
+                    self._log_error(f"HTTP {method} {path}: соединение из пула закрыто бэкендом ({e!r}), "
+                                    f"запрос не дошёл — отправляем по новому")
+                    conn.close()
+            if response is None:
+                try:
+                    conn.connect()
+                except OSError as e:
+                    raise RequestNotSent(f"не удалось подключиться: {e!r}") from e
+                response, raw = self._exchange(conn, method, path, body, headers)
+            reusable = not response.will_close
+        finally:
+            self.pool.release(conn, reusable)
+        data = json.loads(raw.decode("utf-8")) if raw else []
+        return response.status, data
+
+    @staticmethod
+    def _exchange(
+        conn: http.client.HTTPConnection, method: str, path: str, body: Optional[bytes], headers: Dict[str, str]
+    ):
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        return response, response.read()
+
+    def _timeout_for(self, url: str) -> float:
+        for prefix, timeout in self.source_timeouts:
+            if url.startswith(prefix):
+                return timeout
+        return self.timeout
+
+    def _remember(self, key: Tuple[str, str], data: Any):
+        if key[0] != "GET":
+            return
+        with self._cache_lock:
+            self._cache[key] = data
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _fallback(self, key: Tuple[str, str]) -> Any:
+        with self._cache_lock:
+            return self._cache.get(key, [])
+
+    def _log_error(self, message: str):
+        if self.logger:
+            self.logger.log_error(message)
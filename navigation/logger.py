@@ -1,8 +1,12 @@
 import logging
 from typing import Optional
 
+from .tracing import NULL_TRACER, Tracer
+
 class NavigationLogger:
-    def __init__(self, name: str = "NavigationEngine", level: int = logging.INFO, log_file: str = "navigation.log"):
+    def __init__(self, name: str = "NavigationEngine", level: int = logging.INFO, log_file: str = "navigation.log", tracer: Optional[Tracer] = None):
+        # Запись в лог — тоже отдельный span, если трассировка включена
+        self.tracer = tracer or NULL_TRACER
         self.logger = logging.getLogger(name)
         self.logger.setLevel(level)
         if not self.logger.handlers:
@@ -16,13 +20,17 @@ class NavigationLogger:
             self.logger.addHandler(file_handler)
 
     def log_view_rendered(self, user_id: str, screen_id: str, text: str):
-        self.logger.info(f"USER[{user_id}] VIEW[{screen_id}]: {text[:60]}...")
+        with self.tracer.span("logger.write", kind="log_view_rendered"):
+            self.logger.info(f"USER[{user_id}] VIEW[{screen_id}]: {text[:60]}...")
 
     def log_user_action(self, user_id: str, action_id: str, label: str):
-        self.logger.info(f"USER[{user_id}] ACTION: '{label}' (id={action_id})")
+        with self.tracer.span("logger.write", kind="log_user_action"):
+            self.logger.info(f"USER[{user_id}] ACTION: '{label}' (id={action_id})")
 
     def log_api_call(self, url: str, method: str):
-        self.logger.debug(f"API CALL: {method} {url}")
+        with self.tracer.span("logger.write", kind="log_api_call"):
+            self.logger.debug(f"API CALL: {method} {url}")
 
     def log_error(self, message: str):
-        self.logger.error(message)
\ No newline at end of file
+        with self.tracer.span("logger.write", kind="log_error"):
+            self.logger.error(message)
\ No newline at end of file
@@ -1,29 +1,321 @@
+import hashlib
 import json
-from typing import Dict, Any
+import marshal
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Any, Iterator, List, Optional
+
+# Версия формата скомпилированного кэша: меняется при изменении compile_manifest
+CACHE_FORMAT = 2
+SCREEN_TYPES = ("static", "dynamic", "chat_input")
+# Имя индекса в каталоге разбитого манифеста
+INDEX_FILE = "index.json"
+_TEMPLATE_KEY = re.compile(r"\{\{(\w+)\}\}")
+
+
+def template_keys(template: str) -> List[str]:
+    """Ключи контекста, на которые ссылается шаблон вида `{{key}}`."""
+    return _TEMPLATE_KEY.findall(template)
+
+
+def compile_screen(screen_id: str, screen: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверяет описание экрана и приводит его к виду, который ожидает движок."""
+    if not isinstance(screen, dict):
+        raise ValueError(f"Экран '{screen_id}' должен быть объектом")
+    if not isinstance(screen.get("title"), str):
+        raise ValueError(f"Экран '{screen_id}': нет 'title'")
+    screen_type = screen.get("type")
+    if screen_type not in SCREEN_TYPES:
+        raise ValueError(f"Экран '{screen_id}': неизвестный тип '{screen_type}'")
+    if screen_type == "static":
+        key = "items" if screen.get("paginated") else "buttons"
+        if not isinstance(screen.get(key), list):
+            raise ValueError(f"Экран '{screen_id}': нет '{key}'")
+    elif screen_type == "dynamic":
+        source = screen.get("data_source") or {}
+        template = screen.get("button_template") or {}
+        if "url" not in source or "method" not in source:
+            raise ValueError(f"Экран '{screen_id}': data_source должен содержать 'url' и 'method'")
+        if "label_field" not in template or "target_screen" not in template:
+            raise ValueError(f"Экран '{screen_id}': button_template должен содержать 'label_field' и 'target_screen'")
+    budget = screen.get("latency_budget_ms")
+    if budget is not None and (not isinstance(budget, (int, float)) or budget <= 0):
+        raise ValueError(f"Экран '{screen_id}': latency_budget_ms должен быть положительным числом")
+    # Ключ пагинации и прочие ссылки на экран берутся из id
+    screen["id"] = screen_id
+    return screen
+
+
+def compile_manifest(data: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(data, dict) or "screens" not in data:
+        raise ValueError("Манифест должен содержать 'screens'")
+    if "defaults" not in data:
+        data["defaults"] = {}
+    for screen_id, screen in data["screens"].items():
+        compile_screen(screen_id, screen)
+    return data
+
+
+class LazyScreens(Mapping):
+    """
+    Экраны разбитого манифеста. Экран читается из своего файла по смещению
+    из индекса и компилируется при первом обращении; в памяти держится
+    не больше `cache_size` последних использованных экранов.
+    """
+
+    def __init__(self, root: str, index: Dict[str, Dict[str, Any]], cache_size: int = 256):
+        self._root = root
+        self._index = index
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, screen_id: str) -> Dict[str, Any]:
+        with self._lock:
+            screen = self._cache.get(screen_id)
+            if screen is not None:
+                self._cache.move_to_end(screen_id)
+                return screen
+        entry = self._index[screen_id]
+        with open(os.path.join(self._root, entry["file"]), "rb") as f:
+            f.seek(entry["offset"])
+            raw = f.read(entry["length"])
+        try:
+            screen = compile_screen(screen_id, json.loads(raw.decode("utf-8")))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise ValueError(f"Невалидный JSON экрана '{screen_id}': {e}")
+        with self._lock:
+            self._cache[screen_id] = screen
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return screen
+
+    def __contains__(self, screen_id: object) -> bool:
+        return screen_id in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class ScreenIndex:
+    """
+    Интернирование id экранов в номера (для компактных структур вроде
+    ReturnStack). Номера только добавляются, поэтому после перезагрузки
+    манифеста старые номера остаются действительными. Один индекс может
+    быть общим у нескольких загрузчиков (см. ManifestRegistry): сессии,
+    начатые на одной версии манифеста, продолжаются на другой.
+    """
+
+    def __init__(self):
+        self._names: List[str] = []
+        self._numbers: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def number(self, screen_id: str) -> int:
+        screen_no = self._numbers.get(screen_id)
+        if screen_no is None:
+            # Индекс общий для потоков движков: номер выдаётся один раз
+            with self._lock:
+                screen_no = self._numbers.get(screen_id)
+                if screen_no is None:
+                    self._names.append(screen_id)
+                    screen_no = self._numbers[screen_id] = len(self._names) - 1
+        return screen_no
+
+    def name(self, screen_no: int) -> str:
+        return self._names[screen_no]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
 
 class ManifestLoader:
-    def __init__(self, manifest_path: str = "menu-manifest.json"):
+    """
+    Загружает манифест и кэширует скомпилированную версию рядом с исходником
+    (`<manifest>.cache`). Кэш привязан к хэшу содержимого, поэтому любое
+    изменение манифеста приводит к перекомпиляции.
+
+    Если `manifest_path` — каталог, он читается как разбитый манифест
+    (см. `split_manifest`): экраны подгружаются лениво через `LazyScreens`.
+
+    Живые ключи контекста (`analyze_context`) считаются один раз при сборке
+    и лежат в кэше или в индексе разбитого манифеста: анализ всего графа
+    не заставляет читать все экраны при первом переходе.
+    """
+
+    def __init__(
+        self,
+        manifest_path: str = "menu-manifest.json",
+        use_cache: bool = True,
+        screen_cache_size: int = 256,
+        screen_index: Optional[ScreenIndex] = None
+    ):
         self.manifest_path = manifest_path
-        self.data = self._load()
+        self.use_cache = use_cache
+        self.screen_cache_size = screen_cache_size
+        self.cache_path = f"{manifest_path}.cache"
+        self.version: Optional[str] = None
+        self.screen_index = screen_index if screen_index is not None else ScreenIndex()
+        self._context_keys = None  # LiveKeys
+        self.data = self._load_any()
+
+    def _load_any(self) -> Dict[str, Any]:
+        self._context_keys = None
+        if os.path.isdir(self.manifest_path):
+            return self._load_split()
+        return self._load()
+
+    def reload(self) -> bool:
+        """Перечитывает манифест. Возвращает True, если версия изменилась."""
+        old_version = self.version
+        self.data = self._load_any()
+        return self.version != old_version
+
+    def _load_split(self) -> Dict[str, Any]:
+        index_path = os.path.join(self.manifest_path, INDEX_FILE)
+        try:
+            with open(index_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Индекс манифеста не найден: {index_path}")
+        # Индекс хранит хэши экранов, поэтому его хэш — версия всего манифеста
+        self.version = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        try:
+            index = json.loads(raw.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise ValueError(f"Невалидный JSON индекса: {e}")
+        if "screens" not in index:
+            raise ValueError("Индекс манифеста должен содержать 'screens'")
+        if "live_common" in index and all("live" in entry for entry in index["screens"].values()):
+            from .context_analysis import LiveKeys
+            self._context_keys = LiveKeys(index["live_common"],
+                                          {screen_id: entry["live"] for screen_id, entry in index["screens"].items()})
+        return {
+            "defaults": index.get("defaults", {}),
+            "screens": LazyScreens(self.manifest_path, index["screens"], self.screen_cache_size),
+        }
 
     def _load(self) -> Dict[str, Any]:
         try:
-            with open(self.manifest_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(self.manifest_path, "rb") as f:
+                raw = f.read()
         except FileNotFoundError:
             raise FileNotFoundError(f"Манифест не найден: {self.manifest_path}")
-        except json.JSONDecodeError as e:
+        self.version = hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+        if self.use_cache:
+            data = self._read_cache()
+            if data is not None:
+                return data
+        try:
+            data = json.loads(raw.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
             raise ValueError(f"Невалидный JSON: {e}")
-        if "screens" not in data:
-            raise ValueError("Манифест должен содержать 'screens'")
-        if "defaults" not in data:
-            data["defaults"] = {}
+        data = compile_manifest(data)
+        if self.use_cache:
+            self._write_cache(data, self._analyze_context(data["screens"]))
+        return data
+
+    def _cache_key(self):
+        return (CACHE_FORMAT, marshal.version, self.version)
+
+    def _read_cache(self) -> Optional[Dict[str, Any]]:
+        try:
+            # marshal.loads по готовому буферу заметно быстрее marshal.load(file)
+            with open(self.cache_path, "rb") as f:
+                key, data, (common, own) = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if key != self._cache_key():
+            return None
+        from .context_analysis import LiveKeys
+        self._context_keys = LiveKeys(common, own)
         return data
 
+    def _write_cache(self, data: Dict[str, Any], context_keys):
+        # Пишем атомарно; если каталог только для чтения — просто работаем без кэша
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                marshal.dump((self._cache_key(), data, (context_keys.common, context_keys.own)), f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _analyze_context(self, screens: Mapping):
+        from .context_analysis import LiveKeys, analyze_context  # context_analysis импортирует этот модуль
+        self._context_keys = LiveKeys.from_analysis(analyze_context(screens))
+        return self._context_keys
+
+    def context_keys(self):
+        """LiveKeys манифеста; без готовых из кэша/индекса — анализ по всем экранам."""
+        if self._context_keys is None:
+            self._analyze_context(self.screens)
+        return self._context_keys
+
     @property
-    def screens(self) -> Dict[str, Any]:
+    def screens(self) -> Mapping:
         return self.data["screens"]
 
     @property
     def defaults(self) -> Dict[str, Any]:
-        return self.data["defaults"]
\ No newline at end of file
+        return self.data["defaults"]
+
+
+def split_manifest(manifest_path: str, out_dir: str, screens_per_file: int = 64) -> str:
+    """
+    Разбивает монолитный манифест на файлы экранов и индекс
+    `screen_id -> {file, offset, length, hash, live}`, где live — свои
+    живые ключи контекста экрана, а общие для всех лежат в `live_common`.
+    Возвращает путь к индексу.
+    """
+    from .context_analysis import LiveKeys, analyze_context
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "screens" not in data:
+        raise ValueError("Манифест должен содержать 'screens'")
+    os.makedirs(out_dir, exist_ok=True)
+
+    index: Dict[str, Dict[str, Any]] = {}
+    screen_ids = list(data["screens"])
+    for chunk_no, start in enumerate(range(0, len(screen_ids), screens_per_file)):
+        file_name = f"screens-{chunk_no:04d}.json"
+        with open(os.path.join(out_dir, file_name), "wb") as f:
+            for screen_id in screen_ids[start:start + screens_per_file]:
+                blob = json.dumps(data["screens"][screen_id], ensure_ascii=False).encode("utf-8")
+                index[screen_id] = {
+                    "file": file_name,
+                    "offset": f.tell(),
+                    "length": len(blob),
+                    "hash": hashlib.blake2b(blob, digest_size=8).hexdigest(),
+                }
+                f.write(blob + b"\n")
+
+    live = LiveKeys.from_analysis(analyze_context(data["screens"]))
+    for screen_id, keys in live.own.items():
+        index[screen_id]["live"] = sorted(keys)
+
+    index_path = os.path.join(out_dir, INDEX_FILE)
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"defaults": data.get("defaults", {}), "live_common": sorted(live.common), "screens": index},
+                  f, ensure_ascii=False, indent=1)
+    return index_path
+
+
+if __name__ == "__main__":
+    # python -m navigation.manifest split menu-manifest.json manifest.d
+    if len(sys.argv) != 4 or sys.argv[1] != "split":
+        print("Использование: python -m navigation.manifest split <manifest.json> <каталог>")
+        sys.exit(1)
+    print(split_manifest(sys.argv[2], sys.argv[3]))
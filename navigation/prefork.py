@@ -0,0 +1,266 @@
+# navigation/prefork.py
+"""
+Prefork-запуск нескольких воркеров движка на одной машине.
+
+Родитель один раз загружает и компилирует манифест, прогревает кэши
+(анализ контекста, ответы источников без шаблонов, поисковые индексы),
+замораживает кучу через gc.freeze() и только потом делает fork.
+Воркеры наследуют эти страницы copy-on-write: сборщик мусора их не
+трогает, поэтому общими остаются страницы, где меняются лишь счётчики
+ссылок (до CPython 3.12 без immortal-объектов это неизбежно).
+
+Каждый воркер владеет своим разделом пользователей (стабильный хэш
+user_id), так что состояние одного пользователя живёт ровно в одном
+процессе. Родитель пересылает вызовы движка по Pipe:
+
+    pool = PreforkPool(engine, workers=4)
+    pool.start()
+    view = pool.call("42", "get_current_view")
+    print(pool.memory())   # USS/PSS/RSS каждого воркера из /proc/<pid>/smaps_rollup
+
+Fork делается до запуска потоков: прогрев не использует пул запросов
+движка, а воркер после fork всё равно создаёт его заново (engine._after_fork).
+Прогрев ходит в API через клиент движка, поэтому в его пуле остаются
+keep-alive соединения: воркер их не использует — _after_fork закрывает
+свою копию сокетов и открывает собственные соединения, а буфер трасс
+родителя сбрасывает.
+
+Запуск как сервиса: вызовы движка JSON-строками через stdin/stdout
+(например, из шлюза на другом языке):
+
+    python -m navigation.prefork menu-manifest.json --workers 4
+    -> {"user_id": "42", "method": "handle_action", "args": [{...}]}
+    <- {"ok": true, "result": ...}
+    -> {"method": "memory"}
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import sys
+import threading
+from multiprocessing import Pipe
+from typing import Any, Dict, List, Optional, TextIO
+
+# Методы движка, которые можно вызывать через воркер (первый аргумент — user_id)
+WORKER_METHODS = frozenset({"init_user", "handle_action", "get_current_view", "get_view_delta", "handle_user_input"})
+
+
+def user_partition(user_id: str, partitions: int) -> int:
+    """Раздел пользователя: стабилен между перезапусками (в отличие от hash())."""
+    digest = hashlib.blake2b(str(user_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % partitions
+
+
+def warm_engine(engine) -> Dict[str, int]:
+    """
+    Прогревает то, что одинаково для всех пользователей, чтобы воркеры
+    получили это общими страницами: все экраны манифеста, анализ
+    контекста и источники данных без шаблонов в URL (с их индексами поиска).
+    Потоков не запускает: ответы из снимка не перепроверяются в фоне.
+    """
+    from .search import SearchIndex
+
+    screens = engine.manifest.screens
+    engine._context_keys = engine.manifest.context_keys()
+    sources = 0
+    for screen_id in screens:
+        screen = screens[screen_id]
+        engine.manifest.screen_index.number(screen_id)
+        source = screen.get("data_source")
+        if screen.get("type") != "dynamic" or "{{" in source["url"]:
+            continue
+        request = (source["url"], source["method"])
+        if request not in engine.data_cache:
+            engine._call_source(*request)  # не _fetch_items: тот может запустить пул запросов
+            sources += 1
+        if "search" in screen:
+            index_key = (*request, screen["search"]["field"])
+            if index_key not in engine.search_indexes:
+                index = engine.search_indexes[index_key] = SearchIndex(screen["search"]["field"])
+                index.update(engine.data_cache.get(request))
+    return {"screens": len(screens), "sources": sources, "search_indexes": len(engine.search_indexes)}
+
+
+def read_smaps_rollup(pid: int) -> Dict[str, int]:
+    """Память процесса в кБ: uss (Private_*), pss, rss, shared (Shared_*)."""
+    fields: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "uss_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "rss_kb": fields.get("Rss", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+
+class _Worker:
+    __slots__ = ("pid", "conn", "lock")
+
+    def __init__(self, pid: int, conn):
+        self.pid = pid
+        self.conn = conn
+        self.lock = threading.Lock()
+
+
+class PreforkPool:
+    def __init__(self, engine, workers: int = 2, freeze: bool = True, warm: bool = True):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("PreforkPool требует os.fork (Linux/macOS)")
+        self.engine = engine
+        self.workers = workers
+        self.freeze = freeze
+        self.warm = warm
+        self._workers: List[_Worker] = []
+
+    def start(self) -> "PreforkPool":
+        if self.warm:
+            warm_engine(self.engine)
+        if self.freeze:
+            # Всё, что создано до fork, уходит в «вечное» поколение:
+            # сборщик мусора в воркерах не будет писать в эти страницы
+            gc.collect()
+            gc.freeze()
+        for _ in range(self.workers):
+            parent_conn, child_conn = Pipe()
+            pid = os.fork()
+            if pid == 0:
+                parent_conn.close()
+                for worker in self._workers:
+                    worker.conn.close()
+                self.engine._after_fork()
+                code = 0
+                try:
+                    self._serve(child_conn)
+                except BaseException:
+                    code = 1
+                finally:
+                    os._exit(code)
+            child_conn.close()
+            self._workers.append(_Worker(pid, parent_conn))
+        return self
+
+    def _serve(self, conn):
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                return
+            if message is None:
+                return
+            method, args = message
+            try:
+                if method not in WORKER_METHODS:
+                    raise ValueError(f"Метод недоступен воркеру: {method}")
+                result = getattr(self.engine, method)(*args)
+            except Exception as e:
+                conn.send((False, repr(e)))
+            else:
+                conn.send((True, result))
+
+    def partition(self, user_id: str) -> int:
+        return user_partition(user_id, self.workers)
+
+    def worker_pid(self, user_id: str) -> int:
+        return self._workers[self.partition(user_id)].pid
+
+    def call(self, user_id: str, method: str, *args) -> Any:
+        """Вызывает метод движка в воркере, которому принадлежит пользователь."""
+        worker = self._workers[self.partition(user_id)]
+        with worker.lock:
+            worker.conn.send((method, (user_id, *args)))
+            ok, result = worker.conn.recv()
+        if not ok:
+            raise RuntimeError(f"Воркер {worker.pid}: {result}")
+        return result
+
+    def memory(self) -> Dict[int, Dict[str, int]]:
+        """USS/PSS/RSS каждого воркера; пусто, если /proc недоступен."""
+        report = {}
+        for worker in self._workers:
+            try:
+                report[worker.pid] = read_smaps_rollup(worker.pid)
+            except OSError:
+                pass
+        return report
+
+    def stop(self):
+        for worker in self._workers:
+            try:
+                with worker.lock:
+                    worker.conn.send(None)
+            except OSError:
+                pass
+            worker.conn.close()
+        for worker in self._workers:
+            os.waitpid(worker.pid, 0)
+        self._workers = []
+        if self.freeze:
+            gc.unfreeze()
+
+    def __enter__(self) -> "PreforkPool":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def _json_default(value: Any) -> Any:
+    to_dict = getattr(value, "to_dict", None)  # Action
+    if to_dict is not None:
+        return to_dict()
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+
+def serve_lines(pool: PreforkPool, requests: TextIO, responses: TextIO):
+    """Вызовы движка JSON-строками: {"user_id", "method", "args"} -> {"ok", "result" | "error"}."""
+    for line in requests:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            if request.get("method") == "memory":
+                result = pool.memory()
+            else:
+                result = pool.call(str(request["user_id"]), request["method"], *request.get("args", []))
+            response = {"ok": True, "result": result}
+        except Exception as e:
+            response = {"ok": False, "error": repr(e)}
+        responses.write(json.dumps(response, ensure_ascii=False, default=_json_default) + "\n")
+        responses.flush()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prefork-воркеры NavigationEngine с вызовами через stdin/stdout")
+    parser.add_argument("manifest", nargs="?", default="menu-manifest.json")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--api-base-url", default=os.getenv("API_BASE_URL"))
+    parser.add_argument("--snapshot", default=os.getenv("SNAPSHOT_FILE"))
+    parser.add_argument("--log-file", default="navigation.log")
+    args = parser.parse_args(argv)
+
+    from .engine import NavigationEngine
+    from .logger import NavigationLogger
+
+    api_client = None
+    if args.api_base_url:
+        from .http_client import HttpApiClient
+        token = os.getenv("API_TOKEN")
+        api_client = HttpApiClient(args.api_base_url, headers={"Authorization": f"Bearer {token}"} if token else None)
+    engine = NavigationEngine(args.manifest, logger=NavigationLogger("Prefork", log_file=args.log_file),
+                              api_client=api_client)
+    if args.snapshot:
+        engine.load_snapshot(args.snapshot)
+    with PreforkPool(engine, workers=args.workers) as pool:
+        serve_lines(pool, sys.stdin, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+# navigation/reference.py
+"""
+Эталонный движок навигации для дифференциального тестирования.
+
+Намеренно простая реализация того же поведения, что у NavigationEngine
+на момент её заморозки: обычные dict и list вместо ContextMap, ReturnStack
+и Action, без кэшей view, без снимков, без пула запросов и бюджетов
+задержки, поиск — линейным проходом. Оптимизировать этот модуль нельзя:
+его задача — оставаться очевидно правильным. Меняется только вместе с
+осознанным изменением поведения движка.
+
+Переиспользуется лишь analyze_context — чистая функция манифеста.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from .context_analysis import PERSISTENT_KEYS, analyze_context
+from .manifest import ManifestLoader
+
+
+def _normalize(text: Any) -> str:
+    return str(text).casefold().replace("ё", "е")
+
+
+class ReferenceEngine:
+    def __init__(self, manifest_path: str = "menu-manifest.json", api_client: Optional[Any] = None,
+                 return_stack_depth: int = 16, context_snapshot_depth: int = 16):
+        loader = ManifestLoader(manifest_path, use_cache=False)
+        self.screens = loader.screens
+        self.defaults = loader.defaults
+        if api_client is None:
+            from .api_stub import APISimulator
+            api_client = APISimulator()
+        self.api_client = api_client
+        self.return_stack_depth = return_stack_depth
+        self.context_snapshot_depth = context_snapshot_depth
+        self.context_keys = analyze_context(self.screens)
+        self.states: Dict[str, Dict[str, Any]] = {}
+
+    # --- состояние ---
+
+    def init_user(self, user_id: str):
+        self.states[user_id] = {
+            "current_screen": "main",
+            "context": {"user_id": user_id},
+            "context_snapshots": [],  # (screen_id, копия контекста)
+            "return_stack": [],       # screen_id
+            "pagination": {},
+            "selections": [],
+        }
+
+    def get_user_state(self, user_id: str) -> Dict[str, Any]:
+        if user_id not in self.states:
+            self.init_user(user_id)
+        return self.states[user_id]
+
+    # --- рендер ---
+
+    def get_current_view(self, user_id: str) -> Dict[str, Any]:
+        state = self.get_user_state(user_id)
+        screen_id = state["current_screen"]
+        screen = self.screens.get(screen_id)
+        if not screen:
+            return {
+                "text": "Ошибка: экран не найден",
+                "actions": [{"id": "back", "label": "< Назад", "type": "back"}],
+                "screen_type": "error",
+            }
+        title = self._render(screen["title"], state["context"])
+        if screen["type"] == "chat_input":
+            return {"text": title, "actions": [], "screen_type": "chat_input"}
+
+        if screen["type"] == "dynamic":
+            actions = self._dynamic_actions(state, screen)
+        elif screen.get("paginated"):
+            actions = self._item_actions(state, screen)
+        else:
+            actions = self._static_actions(screen)
+        if screen.get("back_path"):
+            label = screen.get("back_label", self.defaults["back_button_label"])
+            actions.append({"id": "back", "label": label, "type": "back"})
+
+        view = {"text": title, "actions": actions, "screen_type": screen["type"]}
+        if "input_context_key" in screen:
+            view["accepts_input"] = True
+        if screen.get("layout") == "grid":
+            view["layout"] = "grid"
+            view["columns"] = screen.get("columns", 1)
+        return view
+
+    def _render(self, template: str, context: Dict[str, Any]) -> str:
+        for key, value in context.items():
+            template = template.replace("{{" + key + "}}", str(value))
+        return template
+
+    def _page(self, state: Dict[str, Any], screen: Dict[str, Any], total: int) -> Tuple[int, int]:
+        size = self.defaults["pagination"]["page_size"]
+        start = state["pagination"].get(screen.get("id", "unknown"), 0) * size
+        return start, min(start + size, total)
+
+    def _page_actions(self, state: Dict[str, Any], screen: Dict[str, Any], total: int) -> List[Dict[str, Any]]:
+        labels = self.defaults["pagination"]
+        screen_id = screen.get("id", "unknown")
+        start, end = self._page(state, screen, total)
+        actions = []
+        if end < total:
+            actions.append({"id": "next_page", "label": labels["next_label"], "type": "paginate",
+                            "direction": "next", "screen_id": screen_id})
+        if start > 0:
+            actions.append({"id": "prev_page", "label": labels["prev_label"], "type": "paginate",
+                            "direction": "prev", "screen_id": screen_id})
+        return actions
+
+    def _static_actions(self, screen: Dict[str, Any]) -> List[Dict[str, Any]]:
+        actions = []
+        for i, button in enumerate(screen["buttons"]):
+            action = {"id": f"static_{i}", "label": button["label"]}
+            if "target" in button:
+                action["type"] = "navigate"
+                action["target"] = button["target"]
+            elif "action" in button:
+                action["type"] = "action"
+                action["action"] = button["action"]
+            else:
+                action["type"] = "unknown"
+            if "payload" in button:
+                action["payload"] = button["payload"]
+            actions.append(action)
+        return actions
+
+    def _item_actions(self, state: Dict[str, Any], screen: Dict[str, Any]) -> List[Dict[str, Any]]:
+        items = screen["items"]
+        start, end = self._page(state, screen, len(items))
+        context_key = screen.get("context_key")
+        actions = []
+        for i in range(start, end):
+            item = str(items[i])
+            action = {"id": f"paginated_{i}", "label": item, "type": "navigate",
+                      "target": screen.get("target", "item_selected"), "payload": item}
+            if context_key:
+                action["context"] = {context_key: item}
+            actions.append(action)
+        return actions + self._page_actions(state, screen, len(items))
+
+    def _dynamic_actions(self, state: Dict[str, Any], screen: Dict[str, Any]) -> List[Dict[str, Any]]:
+        source = screen["data_source"]
+        items = self.api_client.call(self._render(source["url"], state["context"]), source["method"])
+        if "search" in screen:
+            items = self._search(screen["search"], items, state["context"])
+        start, end = 0, len(items)
+        if screen.get("paginated"):
+            start, end = self._page(state, screen, len(items))
+        template = screen["button_template"]
+        actions = []
+        for i in range(start, end):
+            item = items[i]
+            context = {}
+            for ctx_key, item_key in template.get("context_fields", {}).items():
+                context[ctx_key] = item.get(item_key, "")
+            actions.append({"id": f"dynamic_{i}", "label": item.get(template["label_field"], f"Item {i}"),
+                            "type": "navigate", "target": template["target_screen"], "context": context})
+        if screen.get("paginated"):
+            actions += self._page_actions(state, screen, len(items))
+        return actions
+
+    def _search(self, search: Dict[str, Any], items: List[Dict[str, Any]], context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        field = search["field"]
+        docs = {}
+        for item in items:
+            docs[item.get("id", item.get(field))] = item
+        texts = {doc_id: _normalize(item.get(field, "")) for doc_id, item in docs.items()}
+        query = self._render(search["query"], context)
+        if "{{" in query:
+            query = ""
+        query = _normalize(query).strip()
+        mode = search.get("mode", "substring")
+
+        def word_prefix(doc_id):
+            return any(word.startswith(query) for word in texts[doc_id].split())
+
+        if not query:
+            found = list(docs)
+        elif mode == "first_letter":
+            found = [d for d in docs if word_prefix(d) and texts[d].startswith(query)]
+        elif mode == "prefix" or len(query) < 3:
+            found = [d for d in docs if word_prefix(d)]
+        else:
+            found = [d for d in docs if query in texts[d]]
+        found.sort(key=lambda d: (texts[d], str(d)))
+        return [docs[d] for d in found]
+
+    # --- действия ---
+
+    def handle_action(self, user_id: str, action: Dict[str, Any]):
+        state = self.get_user_state(user_id)
+        action_type = action["type"]
+        action["label"]  # без подписи движок падает так же
+        if action_type == "back":
+            self._back(state)
+        elif action_type == "navigate":
+            previous = state["current_screen"]
+            self._navigate(state, action)
+            if "target" in action:
+                self._select(state, previous, {"type": "navigate", "target": action["target"]})
+        elif action_type == "paginate":
+            page = state["pagination"].get(action["screen_id"], 0)
+            page += 1 if action["direction"] == "next" else -1
+            state["pagination"][action["screen_id"]] = max(0, page)
+        elif action_type == "action" and action.get("action") == "submit_mark":
+            self._submit_mark(state)
+            self._select(state, state["current_screen"], {"type": "action", "action": "submit_mark"})
+
+    def _back(self, state: Dict[str, Any]):
+        screen = self.screens.get(state["current_screen"])
+        if not screen:
+            state["current_screen"] = "main"
+            return
+        back_path = screen.get("back_path")
+        if back_path == "CONTEXTUAL":
+            state["current_screen"] = state["return_stack"].pop() if state["return_stack"] else "main"
+        else:
+            state["current_screen"] = back_path or "main"
+        self._restore(state)
+        self._prune(state)
+
+    def _navigate(self, state: Dict[str, Any], action: Dict[str, Any]):
+        target = action["target"]
+        if target not in self.screens:
+            return
+        next_screen = self.screens[target]
+        if next_screen.get("back_path") == "CONTEXTUAL":
+            stack = state["return_stack"]
+            if state["current_screen"] in stack:
+                del stack[stack.index(state["current_screen"]):]
+            stack.append(state["current_screen"])
+            del stack[:max(0, len(stack) - self.return_stack_depth)]
+        snapshots = state["context_snapshots"]
+        for i, (screen_id, _) in enumerate(snapshots):
+            if screen_id == state["current_screen"]:
+                del snapshots[i:]
+                break
+        snapshots.append((state["current_screen"], dict(state["context"])))
+        del snapshots[:max(0, len(snapshots) - self.context_snapshot_depth)]
+        state["current_screen"] = target
+        if "context" in action:
+            state["context"].update(action["context"])
+            if next_screen.get("paginated"):
+                state["pagination"].pop(target, None)
+        self._prune(state)
+
+    def _restore(self, state: Dict[str, Any]):
+        snapshots = state["context_snapshots"]
+        for i in range(len(snapshots) - 1, -1, -1):
+            if snapshots[i][0] == state["current_screen"]:
+                state["context"] = dict(snapshots[i][1])
+                del snapshots[i:]
+                return
+
+    def _prune(self, state: Dict[str, Any]):
+        keep = set(PERSISTENT_KEYS)
+        for screen_id in [state["current_screen"], *state["return_stack"]]:
+            if screen_id not in self.context_keys:
+                return
+            keep.update(self.context_keys[screen_id])
+        state["context"] = {k: v for k, v in state["context"].items() if k in keep}
+
+    def _submit_mark(self, state: Dict[str, Any]):
+        screen = self.screens.get(state["current_screen"])
+        back_path = screen.get("back_path") if screen else "main"
+        if back_path == "select_metric":
+            state["current_screen"] = "select_metric"
+            state["return_stack"].clear()
+        else:
+            state["current_screen"] = state["return_stack"].pop() if state["return_stack"] else "main"
+        self._prune(state)
+
+    def _select(self, state: Dict[str, Any], screen_id: str, selected: Dict[str, Any]):
+        screen = self.screens.get(screen_id)
+        if not screen.get("supports_multi_select", False):
+            state["selections"] = [s for s in state["selections"] if s["screen_id"] != screen_id]
+        state["selections"].append({"screen_id": screen_id, "selected_item": selected})
+
+    def handle_user_input(self, user_id: str, text: str):
+        state = self.get_user_state(user_id)
+        screen_id = state["current_screen"]
+        screen = self.screens.get(screen_id)
+        if screen and screen.get("type") == "chat_input":
+            if text.strip() in self.defaults["chat_mode"]["finish_commands"]:
+                state["current_screen"] = screen.get("back_path", "main")
+                self._restore(state)
+                self._prune(state)
+        elif screen and "input_context_key" in screen:
+            state["context"][screen["input_context_key"]] = text.strip()
+            state["pagination"].pop(screen_id, None)
@@ -0,0 +1,60 @@
+# navigation/return_stack.py
+from array import array
+from typing import Iterator
+
+
+class ReturnStack:
+    """
+    Стек возврата для `back_path: "CONTEXTUAL"`.
+
+    Хранит номера экранов (см. ScreenIndex в manifest.py) в компактном
+    array. Повторный вход на экран, который уже лежит в стеке, схлопывает
+    цикл: всё, что было положено после него, отбрасывается. Глубина
+    ограничена `max_depth` — самые старые записи вытесняются.
+    """
+    __slots__ = ("_items", "max_depth")
+
+    def __init__(self, max_depth: int = 16):
+        self._items = array("I")
+        self.max_depth = max_depth
+
+    def push(self, screen_no: int):
+        items = self._items
+        try:
+            del items[items.index(screen_no):]
+        except ValueError:
+            pass
+        items.append(screen_no)
+        if len(items) > self.max_depth:
+            del items[:len(items) - self.max_depth]
+
+    def pop(self) -> int:
+        return self._items.pop()
+
+    def clear(self):
+        del self._items[:]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._items)
+
+    def __contains__(self, screen_no: object) -> bool:
+        return screen_no in self._items
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ReturnStack):
+            return NotImplemented
+        return self._items == other._items and self.max_depth == other.max_depth
+
+    def __getstate__(self):
+        return (self._items.tobytes(), self.max_depth)
+
+    def __setstate__(self, state):
+        raw, self.max_depth = state
+        self._items = array("I")
+        self._items.frombytes(raw)
+
+    def __repr__(self) -> str:
+        return f"ReturnStack({list(self._items)!r}, max_depth={self.max_depth})"
@@ -0,0 +1,384 @@
+# navigation/scheduler.py
+"""
+Напоминания и массовые уведомления по времени.
+
+- TimerWheel — иерархическое колесо таймеров (4 уровня по 256 слотов):
+  вставка и отмена O(1), срабатывание пачкой за тик, без задачи
+  asyncio.sleep на каждого пользователя.
+- ReminderJournal — журнал ожидающих напоминаний (JSON-lines: add /
+  cancel / fired), переживает перезапуск; уплотняется при открытии и
+  когда записей становится вдвое больше, чем ожидающих напоминаний.
+- ReminderScheduler — связывает колесо, журнал и движок: напоминание
+  открывает экран с контекстом (deep link) через NavigationEngine,
+  а готовый view уходит в исходящую очередь.
+- RateLimitedSender — единственный путь отправки: token bucket
+  ограничивает поток сообщений (лимиты Telegram ~30 сообщений/с).
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+LEVEL_BITS = 8
+SLOTS = 1 << LEVEL_BITS
+LEVELS = 4
+_SLOT_MASK = SLOTS - 1
+
+
+class Reminder:
+    __slots__ = ("id", "due", "user_id", "screen_id", "context", "text", "_tick", "_level", "_bucket")
+
+    def __init__(self, reminder_id: int, due: float, user_id: str, screen_id: str,
+                 context: Optional[Dict[str, Any]] = None, text: Optional[str] = None):
+        self.id = reminder_id
+        self.due = due
+        self.user_id = user_id
+        self.screen_id = screen_id
+        self.context = context
+        self.text = text
+        self._tick = 0
+        self._level = -1
+        self._bucket: Optional[Dict[int, "Reminder"]] = None
+
+    def to_record(self) -> Dict[str, Any]:
+        return {"op": "add", "id": self.id, "due": self.due, "user": self.user_id,
+                "screen": self.screen_id, "context": self.context, "text": self.text}
+
+
+class TimerWheel:
+    """
+    Иерархическое колесо: таймер с задержкой < 256^(L+1) тиков лежит на уровне L
+    в слоте по битам своего тика; при переполнении младшего уровня слот старшего
+    «осыпается» вниз. Слот — dict id -> Reminder, поэтому отмена O(1).
+    """
+
+    def __init__(self, tick: float = 1.0, start: Optional[float] = None):
+        self.tick = tick
+        self._now_tick = int((time.time() if start is None else start) // tick)
+        self._levels: List[List[Optional[Dict[int, Reminder]]]] = [[None] * SLOTS for _ in range(LEVELS)]
+        self._counts = [0] * LEVELS  # таймеров на уровне: пустые уровни проскакиваем
+        self._expired: Dict[int, Reminder] = {}
+        self._timers: Dict[int, Reminder] = {}
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    @property
+    def now(self) -> float:
+        """Время, до которого колесо уже провёрнуто."""
+        return self._now_tick * self.tick
+
+    def __contains__(self, reminder_id: object) -> bool:
+        return reminder_id in self._timers
+
+    def add(self, reminder: Reminder):
+        if reminder.id in self._timers:
+            raise ValueError(f"Напоминание {reminder.id} уже запланировано")
+        # Срабатываем не раньше due: тик округляется вверх
+        reminder._tick = -int(-reminder.due // self.tick)
+        self._timers[reminder.id] = reminder
+        self._place(reminder, reminder._tick <= self._now_tick)
+
+    def _place(self, reminder: Reminder, expired: bool = False):
+        if expired:
+            bucket = self._expired
+            level = -1
+        else:
+            delta = reminder._tick - self._now_tick
+            level = 0
+            while delta >= SLOTS ** (level + 1):
+                level += 1
+                if level == LEVELS:
+                    del self._timers[reminder.id]
+                    raise ValueError(f"Напоминание {reminder.id} слишком далеко в будущем")
+            slot = (reminder._tick >> (LEVEL_BITS * level)) & _SLOT_MASK
+            bucket = self._levels[level][slot]
+            if bucket is None:
+                bucket = self._levels[level][slot] = {}
+            self._counts[level] += 1
+        bucket[reminder.id] = reminder
+        reminder._bucket = bucket
+        reminder._level = level
+
+    def cancel(self, reminder_id: int) -> Optional[Reminder]:
+        reminder = self._timers.pop(reminder_id, None)
+        if reminder is not None:
+            del reminder._bucket[reminder_id]
+            if reminder._level >= 0:
+                self._counts[reminder._level] -= 1
+            reminder._bucket = None
+        return reminder
+
+    def advance(self, now: Optional[float] = None) -> List[Reminder]:
+        """Сдвигает колесо до `now` и возвращает всё, что пора отправить."""
+        target = int((time.time() if now is None else now) // self.tick)
+        fired = list(self._expired.values())
+        self._expired.clear()
+        while self._now_tick < target:
+            if not self._timers:
+                self._now_tick = target  # пустое колесо — пропускаем тики разом
+                break
+            # Пока младшие уровни пусты, до ближайшей границы старшего ничего не случится
+            empty = 0
+            while empty < LEVELS - 1 and not self._counts[empty]:
+                empty += 1
+            if empty:
+                span = 1 << (LEVEL_BITS * empty)
+                boundary = (self._now_tick // span + 1) * span
+                if boundary - 1 > self._now_tick:
+                    self._now_tick = min(target, boundary - 1)
+                    continue
+            self._now_tick += 1
+            tick = self._now_tick
+            # Осыпаем старшие уровни, начиная с самого верхнего
+            for level in range(LEVELS - 1, 0, -1):
+                if tick & ((1 << (LEVEL_BITS * level)) - 1) == 0:
+                    slot = (tick >> (LEVEL_BITS * level)) & _SLOT_MASK
+                    bucket = self._levels[level][slot]
+                    if bucket:
+                        self._levels[level][slot] = None
+                        self._counts[level] -= len(bucket)
+                        for reminder in bucket.values():
+                            self._place(reminder)
+            slot = tick & _SLOT_MASK
+            bucket = self._levels[0][slot]
+            if bucket:
+                self._levels[0][slot] = None
+                self._counts[0] -= len(bucket)
+                fired.extend(bucket.values())
+        for reminder in fired:
+            del self._timers[reminder.id]
+            reminder._bucket = None
+        return fired
+
+    def pending(self) -> Iterable[Reminder]:
+        return self._timers.values()
+
+
+class ReminderJournal:
+    """Append-only журнал напоминаний; load() восстанавливает ожидающие."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records = 0  # строк в файле: по ним решается, пора ли уплотнять
+
+    def load(self) -> List[Reminder]:
+        pending: Dict[int, Dict[str, Any]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # недописанная строка после аварийной остановки
+                    self.records += 1
+                    op = record["op"]
+                    if op == "add":
+                        pending[record["id"]] = record
+                    elif op == "cancel":
+                        pending.pop(record["id"], None)
+                    elif op == "fired":
+                        for reminder_id in record["ids"]:
+                            pending.pop(reminder_id, None)
+        except FileNotFoundError:
+            return []
+        return [
+            Reminder(r["id"], r["due"], r["user"], r["screen"], r.get("context"), r.get("text"))
+            for r in pending.values()
+        ]
+
+    def append(self, records: Iterable[Dict[str, Any]]):
+        lines = [json.dumps(record, ensure_ascii=False) for record in records]
+        if not lines:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self.records += len(lines)
+
+    def compact(self, reminders: Iterable[Reminder]):
+        """Переписывает журнал: остаются только ожидающие напоминания."""
+        tmp_path = f"{self.path}.tmp"
+        records = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for reminder in reminders:
+                f.write(json.dumps(reminder.to_record(), ensure_ascii=False) + "\n")
+                records += 1
+        os.replace(tmp_path, self.path)
+        self.records = records
+
+
+class TokenBucket:
+    """Ограничитель потока: `rate` токенов в секунду, не больше `burst` подряд."""
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def reserve(self) -> float:
+        """Забирает токен; возвращает, сколько секунд подождать перед отправкой."""
+        now = self.clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RateLimitedSender:
+    """
+    Исходящая очередь: все уведомления отправляются через неё.
+    `send(user_id, view)` — корутина фронтенда (например, bot.send_message).
+    """
+
+    def __init__(self, send: Callable[[str, Dict[str, Any]], Awaitable[Any]], rate: float = 25.0, burst: int = 25):
+        self.send = send
+        self.bucket = TokenBucket(rate, burst)
+        self.queue: "asyncio.Queue" = asyncio.Queue()
+        self.sent = 0
+        self.failed = 0
+
+    def submit(self, user_id: str, view: Dict[str, Any]):
+        self.queue.put_nowait((user_id, view))
+
+    async def run(self):
+        while True:
+            user_id, view = await self.queue.get()
+            try:
+                delay = self.bucket.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+                await self.send(user_id, view)
+                self.sent += 1
+            except Exception:
+                self.failed += 1
+            finally:
+                self.queue.task_done()
+
+
+class ReminderScheduler:
+    def __init__(self, engine, journal_path: Optional[str] = None, tick: float = 1.0, start: Optional[float] = None,
+                 compact_min: int = 10_000):
+        self.engine = engine
+        # Журнал уплотняется, когда в нём не меньше compact_min записей и вдвое больше, чем ожидающих
+        self.compact_min = compact_min
+        self.wheel = TimerWheel(tick, start)
+        self.journal = ReminderJournal(journal_path) if journal_path else None
+        self._next_id = 1
+        # (user_id, meeting_id) -> id напоминания: проверка «уже запланировано» за O(1)
+        self._meetings: Dict[tuple, int] = {}
+        if self.journal is not None:
+            restored = self.journal.load()
+            for reminder in restored:
+                self.wheel.add(reminder)  # просроченные за время простоя сработают на первом тике
+                self._index(reminder)
+                self._next_id = max(self._next_id, reminder.id + 1)
+            self.journal.compact(restored)
+
+    def schedule(self, user_id: str, due: float, screen_id: str, context: Optional[Dict[str, Any]] = None, text: Optional[str] = None) -> int:
+        return self.schedule_many([(user_id, due, screen_id, context, text)])[0]
+
+    def schedule_many(self, items: Iterable[tuple]) -> List[int]:
+        """Пачка (user_id, due, screen_id[, context[, text]]) одной записью в журнал."""
+        reminders = []
+        for user_id, due, screen_id, *rest in items:
+            reminder = Reminder(self._next_id, due, user_id, screen_id, *rest)
+            self._next_id += 1
+            self.wheel.add(reminder)
+            self._index(reminder)
+            reminders.append(reminder)
+        self._log(reminder.to_record() for reminder in reminders)
+        return [reminder.id for reminder in reminders]
+
+    def cancel(self, reminder_id: int) -> bool:
+        reminder = self.wheel.cancel(reminder_id)
+        if reminder is None:
+            return False
+        self._unindex(reminder)
+        self._log([{"op": "cancel", "id": reminder_id}])
+        return True
+
+    def due(self, now: Optional[float] = None) -> List[Reminder]:
+        fired = self.wheel.advance(now)
+        for reminder in fired:
+            self._unindex(reminder)
+        if fired:
+            self._log([{"op": "fired", "ids": [reminder.id for reminder in fired]}])
+        return fired
+
+    def _log(self, records: Iterable[Dict[str, Any]]):
+        if self.journal is None:
+            return
+        self.journal.append(records)
+        if self.journal.records >= max(self.compact_min, 2 * len(self.wheel)):
+            # Отменённые и сработавшие больше не нужны: переписываем только ожидающие
+            self.journal.compact(self.wheel.pending())
+
+    def meeting_reminder(self, user_id: str, meeting_id: Any) -> Optional[int]:
+        """id ожидающего напоминания пользователя о встрече или None."""
+        return self._meetings.get((user_id, meeting_id))
+
+    def _index(self, reminder: Reminder):
+        meeting_id = (reminder.context or {}).get("meeting_id")
+        if meeting_id is not None:
+            self._meetings[(reminder.user_id, meeting_id)] = reminder.id
+
+    def _unindex(self, reminder: Reminder):
+        key = (reminder.user_id, (reminder.context or {}).get("meeting_id"))
+        if self._meetings.get(key) == reminder.id:
+            del self._meetings[key]
+
+    def deliver(self, reminders: Iterable[Reminder], sender: RateLimitedSender) -> int:
+        """Открывает экран напоминания у пользователя и ставит view в очередь отправки."""
+        count = 0
+        for reminder in reminders:
+            sender.submit(reminder.user_id, self._open(reminder))
+            count += 1
+        return count
+
+    def _open(self, reminder: Reminder) -> Dict[str, Any]:
+        view = self.engine.open_deep_link(reminder.user_id, reminder.screen_id, reminder.context)
+        if reminder.text:
+            view = {**view, "text": f"{reminder.text}\n\n{view['text']}"}
+        return view
+
+    async def run(self, sender: RateLimitedSender, run_engine: Optional[Callable[..., Awaitable[Any]]] = None):
+        """
+        Тикает колесо и отправляет сработавшие напоминания пачками.
+        run_engine(user_id, func, *args) — как BotInstance.run: экраны
+        напоминаний открываются вне event loop и по очереди с остальными
+        вызовами движка для того же пользователя.
+        """
+        while True:
+            due = self.due()
+            if run_engine is None:
+                self.deliver(due, sender)
+            elif due:
+                views = await asyncio.gather(*(run_engine(r.user_id, self._open, r) for r in due))
+                for reminder, view in zip(due, views):
+                    sender.submit(reminder.user_id, view)
+            await asyncio.sleep(self.wheel.tick)
+
+
+def schedule_meeting_reminders(scheduler: ReminderScheduler, user_id: str, meetings: List[Dict[str, Any]], lead: float = 900.0) -> List[int]:
+    """
+    Напоминания за `lead` секунд до встреч из /api/teacher/meetings
+    (поля id, title, time, starts_at в ISO 8601) с переходом на meeting_detail.
+    Уже начавшиеся встречи, встречи без starts_at и те, о которых этому
+    пользователю уже напоминание запланировано, пропускаются.
+    """
+    items = []
+    for meeting in meetings:
+        if not meeting.get("starts_at") or scheduler.meeting_reminder(user_id, meeting["id"]) is not None:
+            continue
+        starts_at = datetime.fromisoformat(meeting["starts_at"]).timestamp()
+        if starts_at <= scheduler.wheel.now:
+            continue
+        context = {"meeting_id": meeting["id"], "meeting_title": meeting["title"], "meeting_time": meeting.get("time", "")}
+        items.append((user_id, starts_at - lead, "meeting_detail", context, f"Скоро встреча: {meeting['title']}"))
+    return scheduler.schedule_many(items)
@@ -0,0 +1,148 @@
+# navigation/search.py
+"""
+Поисковый индекс по элементам источника данных.
+
+- префиксы: отсортированный список (нормализованное слово, id) + bisect;
+- подстроки: триграммы -> множества id, кандидаты проверяются вхождением.
+
+Индекс обновляется инкрементально: `update(items)` сравнивает элементы по id
+и трогает только добавленные, изменённые и удалённые. id приводятся к str
+(пары (слово, id) в списке префиксов должны сравниваться между собой),
+элементы без id и без поля поиска пропускаются. Обновление приходит
+из потоков загрузки источников, пока потоки запросов ищут, поэтому
+обновление и запросы идут под блокировкой индекса.
+"""
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+
+def normalize(text: str) -> str:
+    return str(text).casefold().replace("ё", "е")
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, field: str, id_field: str = "id"):
+        self.field = field
+        self.id_field = id_field
+        self._items: Dict[Any, Dict[str, Any]] = {}
+        self._texts: Dict[Any, str] = {}
+        self._prefixes: List[Tuple[str, Any]] = []
+        self._trigrams: Dict[str, Set[Any]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _documents(self, items: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        fresh = {}
+        for item in items:
+            doc_id = item.get(self.id_field, item.get(self.field))
+            if doc_id is not None:
+                fresh[str(doc_id)] = item
+        return fresh
+
+    def export_state(self) -> Tuple[Any, ...]:
+        """Состояние без самих элементов — они восстанавливаются из ответа источника."""
+        with self._lock:
+            trigrams = {gram: set(ids) for gram, ids in self._trigrams.items()}
+            return (self.field, self.id_field, dict(self._texts), list(self._prefixes), trigrams)
+
+    @classmethod
+    def restore(cls, state: Tuple[Any, ...], items: Iterable[Dict[str, Any]]) -> "SearchIndex":
+        """
+        Индекс из export_state() и того же ответа источника. Если элементы
+        не совпадают с сохранёнными, индекс перестраивается через update().
+        """
+        field, id_field, texts, prefixes, trigrams = state
+        index = cls(field, id_field)
+        fresh = index._documents(items)
+        if fresh.keys() != texts.keys():
+            index.update(fresh.values())
+            return index
+        index._items = fresh
+        index._texts = texts
+        index._prefixes = prefixes
+        index._trigrams = trigrams
+        return index
+
+    def update(self, items: Iterable[Dict[str, Any]]):
+        fresh = self._documents(items)
+        with self._lock:
+            self._apply(fresh)
+
+    def _apply(self, fresh: Dict[Any, Dict[str, Any]]):
+        for doc_id in [doc_id for doc_id in self._items if doc_id not in fresh]:
+            self._remove(doc_id)
+        for doc_id, item in fresh.items():
+            old = self._items.get(doc_id)
+            if old is None:
+                self._add(doc_id, item)
+            elif old != item:
+                self._remove(doc_id)
+                self._add(doc_id, item)
+
+    def _add(self, doc_id: Any, item: Dict[str, Any]):
+        text = normalize(item.get(self.field, ""))
+        self._items[doc_id] = item
+        self._texts[doc_id] = text
+        for word in set(text.split()):
+            insort(self._prefixes, (word, doc_id))
+        for gram in _trigrams(text):
+            self._trigrams.setdefault(gram, set()).add(doc_id)
+
+    def _remove(self, doc_id: Any):
+        text = self._texts.pop(doc_id)
+        del self._items[doc_id]
+        for word in set(text.split()):
+            pos = bisect_left(self._prefixes, (word, doc_id))
+            if pos < len(self._prefixes) and self._prefixes[pos] == (word, doc_id):
+                del self._prefixes[pos]
+        for gram in _trigrams(text):
+            ids = self._trigrams.get(gram)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._trigrams[gram]
+
+    def _sorted(self, doc_ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        return [self._items[doc_id] for doc_id in sorted(doc_ids, key=lambda d: (self._texts[d], str(d)))]
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self._sorted(self._items)
+
+    def prefix(self, query: str, first_word_only: bool = False) -> List[Dict[str, Any]]:
+        """Элементы, у которых слово (или только первое слово) начинается с query."""
+        query = normalize(query).strip()
+        if not query:
+            return self.all()
+        found = set()
+        with self._lock:
+            pos = bisect_left(self._prefixes, (query,))
+            while pos < len(self._prefixes) and self._prefixes[pos][0].startswith(query):
+                doc_id = self._prefixes[pos][1]
+                if not first_word_only or self._texts[doc_id].startswith(query):
+                    found.add(doc_id)
+                pos += 1
+            return self._sorted(found)
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Поиск подстроки: триграммы сужают кандидатов, короткие запросы идут по префиксам."""
+        query = normalize(query).strip()
+        if len(query) < 3:
+            return self.prefix(query)
+        candidates = None
+        with self._lock:
+            for gram in sorted(_trigrams(query), key=lambda g: len(self._trigrams.get(g, ()))):
+                ids = self._trigrams.get(gram)
+                if not ids:
+                    return []
+                candidates = set(ids) if candidates is None else candidates & ids
+                if not candidates:
+                    return []
+            return self._sorted(doc_id for doc_id in candidates if query in self._texts[doc_id])
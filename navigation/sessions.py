@@ -0,0 +1,244 @@
+# navigation/sessions.py
+"""
+Хранилище состояний пользователей с учётом памяти.
+
+SessionStore ведёт себя как dict `user_id -> state`, но:
+- считает приблизительный размер каждой сессии по полям
+  (current_screen, context, context_snapshots, return_stack, pagination, selections);
+- при заданном `memory_budget` (байт на весь процесс) выгружает самые
+  холодные сессии на диск (pickle + zlib) и прозрачно подгружает их
+  обратно при следующем обращении;
+- `report()` показывает самые большие сессии и поля, которые их раздувают.
+
+Состояние меняется движком на месте, поэтому размер сессии
+перемеряется лениво: при следующей проверке бюджета после обращения к ней.
+
+Движок вызывают из нескольких потоков (по потоку на пользователя, см.
+BotInstance.run): хранилище защищено блокировкой, а сессии, удерживаемые
+через `hold(user_id)`, не перемеряются и не выгружаются, пока с ними
+работает другой поток.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+
+def deep_sizeof(value: Any, seen: Optional[Set[int]] = None) -> int:
+    """Приблизительный размер объекта вместе с вложенными контейнерами."""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float)) or value is None:
+        return size
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(item, seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += deep_sizeof(item, seen)
+    else:
+        # Объекты со __slots__ (ContextMap, ReturnStack): общие узлы считаются один раз
+        for cls in type(value).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                size += deep_sizeof(getattr(value, slot, None), seen)
+    return size
+
+
+def measure_state(state: Dict[str, Any]) -> Dict[str, int]:
+    """Размер сессии по полям состояния (байты)."""
+    seen: Set[int] = set()
+    return {field: deep_sizeof(value, seen) for field, value in state.items()}
+
+
+class SessionStore(MutableMapping):
+    def __init__(self, memory_budget: Optional[int] = None, spill_dir: Optional[str] = None, compress_level: int = 6):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.compress_level = compress_level
+        # Горячие сессии в порядке LRU: в начале — самые холодные
+        self._hot: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._fields: Dict[str, Dict[str, int]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._dirty: Set[str] = set()
+        self._hot_bytes = 0
+        # user_id -> (путь, размер по полям на момент выгрузки, байт на диске)
+        self._spilled: Dict[str, tuple] = {}
+        self.spills = 0
+        self.faults = 0
+        # user_id -> сколько потоков сейчас работают с сессией (hold)
+        self._held: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    # --- Mapping ---
+
+    def __getitem__(self, user_id: str) -> Dict[str, Any]:
+        with self._lock:
+            state = self._hot.get(user_id)
+            if state is None:
+                if user_id not in self._spilled:
+                    raise KeyError(user_id)
+                state = self._fault_in(user_id)
+            else:
+                self._hot.move_to_end(user_id)
+            self._touch(user_id)
+            return state
+
+    def __setitem__(self, user_id: str, state: Dict[str, Any]):
+        with self._lock:
+            if user_id in self._spilled:
+                self._drop_spilled(user_id)
+            self._hot[user_id] = state
+            self._hot.move_to_end(user_id)
+            self._touch(user_id)
+
+    def __delitem__(self, user_id: str):
+        with self._lock:
+            if user_id in self._hot:
+                del self._hot[user_id]
+                self._hot_bytes -= self._sizes.pop(user_id, 0)
+                self._fields.pop(user_id, None)
+                self._dirty.discard(user_id)
+            elif user_id in self._spilled:
+                self._drop_spilled(user_id)
+            else:
+                raise KeyError(user_id)
+
+    def __contains__(self, user_id: object) -> bool:
+        # Проверка наличия не подгружает сессию с диска
+        with self._lock:
+            return user_id in self._hot or user_id in self._spilled
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            users = list(self._hot) + list(self._spilled)
+        yield from users
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._hot) + len(self._spilled)
+
+    @contextmanager
+    def hold(self, user_id: str):
+        """Пока блок выполняется, сессию меняет вызвавший поток: не мерить и не выгружать."""
+        with self._lock:
+            self._held[user_id] = self._held.get(user_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._held[user_id] > 1:
+                    self._held[user_id] -= 1
+                else:
+                    del self._held[user_id]
+
+    # --- Учёт памяти ---
+
+    def _touch(self, user_id: str):
+        """Сессия могла измениться: перемерить её при следующей проверке бюджета."""
+        if self.memory_budget is None:
+            self._dirty.add(user_id)
+            return
+        # Текущую сессию меряем позже: движок изменит её уже после обращения
+        self._measure_dirty(exclude=user_id)
+        self._dirty.add(user_id)
+        self._enforce_budget()
+
+    def _measure(self, user_id: str):
+        fields = measure_state(self._hot[user_id])
+        size = sum(fields.values())
+        self._hot_bytes += size - self._sizes.get(user_id, 0)
+        self._sizes[user_id] = size
+        self._fields[user_id] = fields
+
+    def _measure_dirty(self, exclude: Optional[str] = None):
+        # Удерживаемые сессии меняются в другом потоке — перемеряем после hold
+        for user_id in [u for u in self._dirty if u != exclude and u not in self._held]:
+            self._dirty.discard(user_id)
+            if user_id in self._hot:
+                self._measure(user_id)
+
+    def _enforce_budget(self):
+        # Последнюю (только что использованную) сессию не выгружаем никогда
+        while self._hot_bytes > self.memory_budget and len(self._hot) > 1:
+            user_id = next((u for u in self._hot if u not in self._held), None)
+            if user_id is None or user_id == next(reversed(self._hot)):
+                break
+            self._spill(user_id)
+
+    @property
+    def hot_bytes(self) -> int:
+        """Оценка памяти горячих сессий (по последнему замеру)."""
+        return self._hot_bytes
+
+    # --- Выгрузка на диск ---
+
+    def _spill_path(self, user_id: str) -> str:
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="nav-sessions-")
+        else:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        name = hashlib.blake2b(str(user_id).encode("utf-8"), digest_size=12).hexdigest()
+        return os.path.join(self.spill_dir, f"{name}.session")
+
+    def _spill(self, user_id: str):
+        if user_id in self._dirty:
+            self._dirty.discard(user_id)
+            self._measure(user_id)
+        state = self._hot.pop(user_id)
+        blob = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), self.compress_level)
+        path = self._spill_path(user_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+        self._hot_bytes -= self._sizes.pop(user_id)
+        self._spilled[user_id] = (path, self._fields.pop(user_id), len(blob))
+        self.spills += 1
+
+    def _fault_in(self, user_id: str) -> Dict[str, Any]:
+        path = self._spilled[user_id][0]
+        with open(path, "rb") as f:
+            state = pickle.loads(zlib.decompress(f.read()))
+        self._drop_spilled(user_id)
+        self._hot[user_id] = state
+        self.faults += 1
+        return state
+
+    def _drop_spilled(self, user_id: str):
+        path = self._spilled.pop(user_id)[0]
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # --- Отчёт ---
+
+    def report(self, top: int = 10) -> List[Dict[str, Any]]:
+        """
+        Самые большие сессии: [{user_id, bytes, fields, spilled, disk_bytes}],
+        поля отсортированы по убыванию размера.
+        """
+        with self._lock:
+            self._measure_dirty()
+            rows = []
+            for user_id in self._hot:
+                fields = self._fields.get(user_id, {})  # удерживаемая и ещё не мерянная — пусто
+                rows.append({"user_id": user_id, "fields": fields, "spilled": False, "disk_bytes": 0})
+            for user_id, (_, fields, disk_bytes) in self._spilled.items():
+                rows.append({"user_id": user_id, "fields": fields, "spilled": True, "disk_bytes": disk_bytes})
+        for row in rows:
+            row["bytes"] = sum(row["fields"].values())
+            row["fields"] = dict(sorted(row["fields"].items(), key=lambda item: item[1], reverse=True))
+        rows.sort(key=lambda row: row["bytes"], reverse=True)
+        return rows[:top]
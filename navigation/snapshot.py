@@ -0,0 +1,147 @@
+# navigation/snapshot.py
+"""
+Снимок прогретых кэшей движка для быстрого старта после деплоя.
+
+В снимок попадают ответы источников данных (data_cache), поисковые
+индексы по ним и готовые view статических экранов. Формат:
+
+    MAGIC | длина заголовка (<Q) | заголовок (marshal) | секции (marshal)
+
+Заголовок хранит версию формата, marshal.version, версию манифеста и
+таблицу секций (вид, ключ, смещение, длина, время получения). При старте
+файл открывается через mmap и читается только заголовок: ответ источника
+разбирается при первом обращении к нему, индекс — при первом поиске.
+Записи из снимка отдаются сразу, но помечаются «тёплыми»: движок
+перепроверяет их у источника в фоне, по одному запросу на источник.
+View берутся, только если версия манифеста совпала.
+
+    engine.load_snapshot("nav.snapshot")   # при старте
+    engine.save_snapshot("nav.snapshot")   # периодически и при остановке
+"""
+import marshal
+import mmap
+import os
+import struct
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, Tuple
+
+SNAPSHOT_FORMAT = 1
+MAGIC = b"NAVSNAP\0"
+_HEADER_LEN = struct.Struct("<Q")
+
+
+def _thaw(value: Any) -> Any:
+    """FrozenView/FrozenList/Action -> обычные dict/list: marshal не пишет подклассы."""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def save_snapshot(engine, path: str) -> Dict[str, int]:
+    """Пишет снимок атомарно (tmp + os.replace). Возвращает число секций по видам."""
+    now = time.time()
+    sections: List[Tuple[str, Any, bytes, float]] = []
+    for key, items, age in engine.data_cache.entries():
+        try:
+            sections.append(("source", key, marshal.dumps(items), now - age))
+        except ValueError:
+            continue  # ответ с типами, которые marshal не умеет, — просто не сохраняем
+    for index_key, index in list(engine.search_indexes.items()):
+        sections.append(("search", index_key, marshal.dumps(index.export_state()), now))
+    if engine.view_cache is not None:
+        views = [(key, _thaw(view)) for key, view in engine.view_cache.items()]
+        try:
+            sections.append(("views", None, marshal.dumps(views), now))
+        except ValueError:
+            pass
+
+    table, offset = [], 0
+    for kind, key, payload, fetched_at in sections:
+        table.append((kind, key, offset, len(payload), fetched_at))
+        offset += len(payload)
+    header = marshal.dumps({
+        "format": SNAPSHOT_FORMAT,
+        "marshal": marshal.version,
+        "manifest": engine.manifest.version,
+        "created": now,
+        "sections": table,
+    })
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LEN.pack(len(header)))
+        f.write(header)
+        for _, _, payload, _ in sections:
+            f.write(payload)
+    os.replace(tmp_path, path)
+    counts: Dict[str, int] = {}
+    for kind, *_ in sections:
+        counts[kind] = counts.get(kind, 0) + 1
+    return counts
+
+
+class Snapshot:
+    """Открытый через mmap снимок; секции разбираются по требованию."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"Не снимок движка: {path}")
+            start = len(MAGIC) + _HEADER_LEN.size
+            (header_len,) = _HEADER_LEN.unpack_from(self._mm, len(MAGIC))
+            header = marshal.loads(self._mm[start:start + header_len])
+            if header.get("format") != SNAPSHOT_FORMAT or header.get("marshal") != marshal.version:
+                raise ValueError(f"Несовместимая версия снимка: {path}")
+        except Exception:
+            self._mm.close()
+            raise
+        self._body = start + header_len
+        self.manifest_version: Optional[str] = header["manifest"]
+        self.created: float = header["created"]
+        self.sections: Dict[Tuple[str, Any], Tuple[int, int, float]] = {
+            (kind, key): (offset, length, fetched_at)
+            for kind, key, offset, length, fetched_at in header["sections"]
+        }
+
+    def read(self, kind: str, key: Any) -> Any:
+        offset, length, _ = self.sections[(kind, key)]
+        start = self._body + offset
+        with memoryview(self._mm)[start:start + length] as view:
+            return marshal.loads(view)
+
+    def loader(self, key: Any):
+        """Загрузчик для DataSourceCache.attach: (items, возраст в секундах)."""
+        def load():
+            return self.read("source", key), max(0.0, time.time() - self.sections[("source", key)][2])
+        return load
+
+    def keys(self, kind: str) -> List[Any]:
+        return [key for section_kind, key in self.sections if section_kind == kind]
+
+    def close(self):
+        self._mm.close()
+
+
+def load_snapshot(engine, path: str) -> Optional[Snapshot]:
+    """
+    Подключает снимок к движку. Отсутствующий, повреждённый или
+    несовместимый файл не мешает старту — возвращается None.
+    """
+    try:
+        snapshot = Snapshot(path)
+    except (OSError, ValueError, EOFError, TypeError, struct.error) as e:
+        if not isinstance(e, FileNotFoundError):
+            engine.logger.log_error(f"Снимок {path} не загружен: {e!r}")
+        return None
+    for key in snapshot.keys("source"):
+        engine.data_cache.attach(key, snapshot.loader(key))
+    if engine.view_cache is not None and snapshot.manifest_version == engine.manifest.version and ("views", None) in snapshot.sections:
+        for key, view in snapshot.read("views", None):
+            engine.view_cache.put(key, view)
+    return snapshot
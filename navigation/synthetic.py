@@ -0,0 +1,213 @@
+# navigation/synthetic.py
+"""
+Синтетические манифесты заданного размера и формы и данные к ним.
+
+Реальный manifest — полтора десятка экранов. Генератор строит дерево меню
+(main -> разделы -> подразделы) и развешивает по его листьям экраны тех же
+видов, что в боевом манифесте:
+
+    list      — динамический листаемый список (list_items элементов)
+    chain     — цепочка из chain_depth динамических экранов с back_path
+                CONTEXTUAL; каждый уровень берёт id из предыдущего в URL
+    alphabet  — статический листаемый экран из list_items строк + поиск
+                по первой букве
+    grid      — сетка из grid_items кнопок
+    search    — поиск по подстроке с вводом текста
+    chat      — чат-режим
+
+Ответы источников генерирует SyntheticAPI: детерминированно по URL, с
+русскими именами, чтобы поиск работал как на живых данных.
+
+    manifest, sources = generate_manifest(screens=10_000, seed=1)
+    write_manifest("big.json", manifest)
+    engine = NavigationEngine("big.json", api_client=SyntheticAPI(sources))
+"""
+import json
+import random
+import re
+import zlib
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from .api_stub import APISimulator
+
+FEATURES = ("list", "chain", "alphabet", "grid", "search", "chat")
+
+DEFAULTS = {
+    "back_button_label": "< Назад",
+    "chat_mode": {"finish_commands": ["/finish", "/start"], "finish_button_label": "Закончить разговор"},
+    "pagination": {"page_size": 8, "prev_label": "<<", "next_label": ">>"},
+    "loading_text": "Загружаем данные…",
+}
+
+_SURNAMES = ("Иван", "Петр", "Сидор", "Смирн", "Кузнец", "Попов", "Волк", "Соколов", "Лебедев", "Козлов",
+             "Новик", "Морозов", "Орлов", "Ёлкин", "Зайцев", "Белов", "Жуков", "Фёдоров", "Щукин", "Яковлев")
+_SUFFIXES = ("", "ов", "ин", "ский", "енко")
+_NAMES = ("Анна", "Борис", "Вера", "Глеб", "Дарья", "Егор", "Жанна", "Зоя", "Илья", "Ксения", "Лев", "Мария")
+_LETTERS = "АБВГДЕЖЗИКЛМНОПРСТУФХЦЧШЩЭЮЯ"
+_TEMPLATE_KEY = re.compile(r"\\\{\\\{\w+\\\}\\\}")
+
+
+class _Builder:
+    def __init__(self, rng: random.Random, list_items: int, grid_items: int, grid_columns: int, chain_depth: int):
+        self.rng = rng
+        self.list_items = list_items
+        self.grid_items = grid_items
+        self.grid_columns = grid_columns
+        self.chain_depth = chain_depth
+        self.screens: Dict[str, Dict[str, Any]] = {}
+        self.sources: Dict[str, int] = {}
+
+    def menu(self, screen_id: str, title: str, back_path: Optional[str]) -> Dict[str, Any]:
+        screen = {"title": title, "type": "static", "buttons": []}
+        if back_path:
+            screen["back_path"] = back_path
+        self.screens[screen_id] = screen
+        return screen
+
+    def dynamic(self, screen_id: str, title: str, url: str, count: int, target: str, prefix: str,
+                back_path: str, **extra: Any) -> Dict[str, Any]:
+        self.sources[url] = count
+        screen = {
+            "title": title, "type": "dynamic",
+            "data_source": {"url": url, "method": "GET"},
+            "button_template": {
+                "label_field": "name", "target_screen": target,
+                "context_fields": {f"{prefix}_id": "id", f"{prefix}_name": "name"},
+            },
+            "back_path": back_path,
+        }
+        screen.update(extra)
+        self.screens[screen_id] = screen
+        return screen
+
+    def done(self, screen_id: str, keys: List[str], back_path: str):
+        title = "Выбрано: " + ", ".join("{{" + key + "}}" for key in keys)
+        self.screens[screen_id] = {
+            "title": title, "type": "static", "back_path": back_path,
+            "buttons": [{"label": "Сохранить", "action": "submit_mark"}, {"label": "В главное меню", "target": "main"}],
+        }
+
+    def feature(self, kind: str, n: int, parent: str) -> str:
+        """Добавляет экраны одной функции и возвращает id входного экрана."""
+        entry = f"{kind}_{n}"
+        if kind == "list":
+            self.dynamic(entry, f"Список {n}", f"/api/syn/list/{n}", self.list_items, f"{entry}_done", f"l{n}",
+                         parent, paginated=True)
+            self.done(f"{entry}_done", [f"l{n}_name"], entry)
+        elif kind == "chain":
+            keys = []
+            for level in range(self.chain_depth):
+                screen_id = f"{entry}_{level}" if level else entry
+                last = level == self.chain_depth - 1
+                target = f"{entry}_done" if last else f"{entry}_{level + 1}"
+                url = f"/api/syn/chain/{n}/{level}" + (f"/{{{{c{n}_{level - 1}_id}}}}" if level else "")
+                title = f"Шаг {level + 1}" + (f" после {{{{c{n}_{level - 1}_name}}}}" if level else "")
+                self.dynamic(screen_id, title, url, self.rng.randint(3, 12), target, f"c{n}_{level}",
+                             "CONTEXTUAL" if level else parent)
+                keys.append(f"c{n}_{level}_name")
+            self.done(f"{entry}_done", keys, "CONTEXTUAL")
+        elif kind == "alphabet":
+            items = [_LETTERS[i % len(_LETTERS)] + (str(i // len(_LETTERS)) if i >= len(_LETTERS) else "")
+                     for i in range(self.list_items)]
+            self.screens[entry] = {
+                "title": f"Алфавит {n}", "type": "static", "paginated": True, "items": items,
+                "target": f"{entry}_people", "context_key": f"a{n}_letter", "back_path": parent,
+            }
+            url = f"/api/syn/people/{n}"
+            self.dynamic(f"{entry}_people", f"На букву «{{{{a{n}_letter}}}}»", url, self.list_items,
+                         f"{entry}_done", f"a{n}", entry, paginated=True,
+                         search={"field": "name", "query": f"{{{{a{n}_letter}}}}", "mode": "first_letter"})
+            self.done(f"{entry}_done", [f"a{n}_name"], "CONTEXTUAL")
+        elif kind == "grid":
+            self.dynamic(entry, f"Сетка {n}", f"/api/syn/grid/{n}", self.grid_items, f"{entry}_done", f"g{n}",
+                         parent, layout="grid", columns=self.grid_columns)
+            self.done(f"{entry}_done", [f"g{n}_name"], entry)
+        elif kind == "search":
+            self.dynamic(entry, f"Поиск {n}", f"/api/syn/people/s{n}", self.list_items, f"{entry}_done", f"s{n}",
+                         parent, paginated=True, input_context_key=f"s{n}_query",
+                         search={"field": "name", "query": f"{{{{s{n}_query}}}}", "mode": "substring"})
+            self.done(f"{entry}_done", [f"s{n}_name"], entry)
+        else:
+            self.screens[entry] = {"title": f"Чат {n}: задайте вопрос", "type": "chat_input", "back_path": parent}
+        return entry
+
+
+def generate_manifest(screens: int = 1000, menu_fanout: int = 8, chain_depth: int = 6, list_items: int = 1000,
+                      grid_items: int = 60, grid_columns: int = 4, feature_share: float = 0.6,
+                      seed: int = 0) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Манифест примерно из `screens` экранов (последняя функция может
+    немного превысить лимит) и описание источников: URL-шаблон -> число
+    элементов, которое отдаёт SyntheticAPI.
+    """
+    rng = random.Random(seed)
+    builder = _Builder(rng, list_items, grid_items, grid_columns, chain_depth)
+    builder.menu("main", "Главное меню", None)
+    frontier = deque(["main"])
+    counts = dict.fromkeys(FEATURES + ("menu",), 0)
+    while frontier and len(builder.screens) < screens:
+        parent = frontier.popleft()
+        for j in range(menu_fanout):
+            if len(builder.screens) >= screens:
+                break
+            # первая кнопка каждого меню — подменю, чтобы дерево росло до нужного размера
+            if j and rng.random() < feature_share:
+                kind = rng.choice(FEATURES)
+                target = builder.feature(kind, counts[kind], parent)
+                label = builder.screens[target]["title"]
+            else:
+                kind = "menu"
+                target = f"menu_{counts['menu']}"
+                label = f"Раздел {counts['menu']}"
+                builder.menu(target, label, parent)
+                frontier.append(target)
+            counts[kind] += 1
+            builder.screens[parent]["buttons"].append({"label": label, "target": target})
+    return {"defaults": json.loads(json.dumps(DEFAULTS)), "screens": builder.screens}, builder.sources
+
+
+def write_manifest(path: str, manifest: Dict[str, Any]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+
+def _person(rng: random.Random) -> str:
+    return f"{rng.choice(_SURNAMES)}{rng.choice(_SUFFIXES)} {rng.choice(_NAMES)}"
+
+
+class SyntheticAPI(APISimulator):
+    """
+    Заглушка API для синтетического манифеста. Элементы строятся по URL
+    детерминированно; ответы без параметров запоминаются в MOCK_DATA,
+    параметризованные (уровни цепочек) строятся при каждом вызове.
+    """
+
+    def __init__(self, sources: Dict[str, int], seed: int = 0):
+        self.MOCK_DATA: Dict[str, List[Dict[str, Any]]] = {}
+        self.seed = seed
+        self._patterns: List[Tuple[Any, int]] = []
+        self._fixed: Dict[str, int] = {}
+        for url, count in sources.items():
+            if "{{" in url:
+                pattern = _TEMPLATE_KEY.sub("[^/]+", re.escape(url))
+                self._patterns.append((re.compile(pattern + "$"), count))
+            else:
+                self._fixed[url] = count
+
+    def _items(self, url: str, count: int) -> List[Dict[str, Any]]:
+        rng = random.Random(zlib.crc32(url.encode("utf-8")) ^ self.seed)
+        slug = url.rstrip("/").rsplit("/", 1)[-1]
+        return [{"id": f"{slug}-{i}", "name": _person(rng)} for i in range(count)]
+
+    def call(self, url: str, method: str = "GET", **kwargs) -> List[Dict[str, Any]]:
+        items = self.MOCK_DATA.get(url)
+        if items is not None:
+            return items
+        if url in self._fixed:
+            items = self.MOCK_DATA[url] = self._items(url, self._fixed[url])
+            return items
+        for pattern, count in self._patterns:
+            if pattern.match(url):
+                return self._items(url, count)
+        return []
@@ -43,6 +43,8 @@ class NavigationTextualApp(App):
         self.engine = NavigationEngine()
         self.user_id = "test-user"
         self.engine.init_user(self.user_id)
+        # Ключ действия (view_diff.action_key) -> кнопка, для правки на месте
+        self._buttons = {}
         # self._chat_widgets больше не нужен, так как используем buttons_container.remove_children()
 
     def compose(self) -> ComposeResult:
@@ -50,8 +52,17 @@ class NavigationTextualApp(App):
         yield Vertical(id="buttons_container")
         yield Footer()
 
+    def _make_button(self, key, action) -> Button:
+        btn = Button(action["label"])
+        btn.action_data = action
+        self._buttons[key] = btn
+        return btn
+
     def update_ui(self):
-        view = self.engine.get_current_view(self.user_id)
+        delta = self.engine.get_view_delta(self.user_id)
+        if not delta["changed"]:
+            return  # на экране всё то же самое
+        view = delta["view"]
         title_widget = self.query_one("#title", Static)
         buttons_container = self.query_one("#buttons_container", Vertical)
         footer_widget = self.query_one(Footer)
@@ -64,10 +75,21 @@ class NavigationTextualApp(App):
             footer_widget.display = True
             title_widget.remove_class("chat-mode")
 
-        title_widget.update(view["text"])
+        if delta["title"] is not None:
+            title_widget.update(delta["title"])
+        if not delta["keyboard_changed"]:
+            return
+        if not (delta["full"] or delta["layout_changed"] or delta["added"] or delta["removed"] or delta["moved"]):
+            # Те же кнопки на тех же местах — меняем только подписи и данные
+            for key, action in delta["updated"]:
+                btn = self._buttons[key]
+                btn.label = action["label"]
+                btn.action_data = action
+            return
 
         # Удаляем *все* предыдущие элементы из контейнера кнопок
         buttons_container.remove_children()
+        self._buttons = {}
 
         if view.get("screen_type") == "chat_input":
             # Режим чата
@@ -79,13 +101,19 @@ class NavigationTextualApp(App):
 
         else:
             # Стандартный режим
+            if view.get("accepts_input"):
+                # Экран поиска: поле ввода над списком результатов
+                input_widget = Input(placeholder="Поиск...", classes="chat_input_widget")
+                buttons_container.mount(input_widget)
+                self.set_focus(input_widget)
             layout = view.get("layout")
             columns = view.get("columns", 1)
 
             if layout == "grid" and columns > 1:
-                all_actions = view["actions"]
+                # view может быть общим закэшированным объектом — работаем с копией
+                all_actions = list(zip(delta["keys"], view["actions"]))
                 back_action = None
-                if all_actions and all_actions[-1].get("type") == "back":
+                if all_actions and all_actions[-1][1].get("type") == "back":
                     back_action = all_actions.pop()
 
                 rows = []
@@ -96,23 +124,19 @@ class NavigationTextualApp(App):
                 for row_actions in rows:
                     row_container = Horizontal()
                     buttons_container.mount(row_container)
-                    for action in row_actions:
-                        btn = Button(action["label"])
-                        btn.action_data = action
-                        row_container.mount(btn)
+                    for key, action in row_actions:
+                        row_container.mount(self._make_button(key, action))
 
                 if back_action:
-                    back_btn = Button(back_action["label"])
-                    back_btn.action_data = back_action
-                    buttons_container.mount(back_btn)
+                    buttons_container.mount(self._make_button(*back_action))
 
             else:
-                for action in view["actions"]:
-                    btn = Button(action["label"])
-                    btn.action_data = action
-                    buttons_container.mount(btn)
+                for key, action in zip(delta["keys"], view["actions"]):
+                    buttons_container.mount(self._make_button(key, action))
 
     def on_mount(self):
+        # Данные медленного экрана догрузились в фоне — перерисовываемся в потоке UI
+        self.engine.add_ready_listener(lambda user_id, request: self.call_from_thread(self.update_ui))
         self.update_ui()
 
     def on_button_pressed(self, event: Button.Pressed):
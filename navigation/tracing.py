@@ -0,0 +1,209 @@
+# navigation/tracing.py
+"""
+Лёгкая трассировка в духе OpenTelemetry, без зависимостей.
+
+    tracer = Tracer(JsonLinesExporter("traces.jsonl"), sample_rate=0.1)
+    with tracer.span("handle_action", trace_id="tg-123", user_id="42"):
+        ...
+
+Текущий span хранится в contextvars, поэтому вложенные span'ы (в том числе
+в asyncio-задачах) автоматически получают trace_id и parent_id. Решение
+о сэмплировании принимается один раз на корневом span'е.
+
+Сводка по файлу: python -m navigation.tracing traces.jsonl [--top N]
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("navigation_current_span", default=None)
+
+
+class Span:
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "sampled", "attrs", "start", "duration", "_t0", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: Optional[str], attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        parent = _current_span.get()
+        if parent is None:
+            self.trace_id = trace_id or os.urandom(8).hex()
+            self.parent_id = None
+            self.sampled = tracer.sample_rate >= 1.0 or random.random() < tracer.sample_rate
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.sampled = parent.sampled
+        self.span_id = os.urandom(4).hex()
+
+    def set(self, key: str, value: Any):
+        self.attrs[key] = value
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._t0
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.attrs["error"] = repr(exc)
+        if self.sampled:
+            self.tracer.exporter.export(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 4),
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    """Заглушка для выключенной трассировки: почти ничего не стоит."""
+    __slots__ = ()
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class JsonLinesExporter:
+    """Дописывает завершённые span'ы в JSON-lines файл (буферизованно, потокобезопасно)."""
+
+    def __init__(self, path: str, buffer_size: int = 256):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.buffer_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _after_fork(self):
+        # Буфер допишет родитель; в дочернем процессе он дал бы дубли span'ов
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+
+
+class Tracer:
+    def __init__(self, exporter: Optional[JsonLinesExporter] = None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None and self.sample_rate > 0
+
+    def span(self, name: str, trace_id: Optional[str] = None, **attrs):
+        """Контекстный менеджер span'а; `trace_id` учитывается только у корневого."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, trace_id, attrs)
+
+    def flush(self):
+        if self.exporter is not None:
+            self.exporter.flush()
+
+    def _after_fork(self):
+        after_fork = getattr(self.exporter, "_after_fork", None)
+        if after_fork is not None:
+            after_fork()
+
+
+# Трассировка по умолчанию выключена
+NULL_TRACER = Tracer()
+
+
+# --- Сводка по файлу трасс ---
+
+def load_traces(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces.setdefault(span["trace_id"], []).append(span)
+    return traces
+
+
+def critical_path(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Путь от корня вниз по самому долгому потомку. Для каждого узла считается
+    self_ms — время, не покрытое дочерними span'ами.
+    """
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for span in spans:
+        children.setdefault(span["parent_id"], []).append(span)
+    roots = children.get(None) or sorted(spans, key=lambda s: s["start"])[:1]
+    node = max(roots, key=lambda s: s["duration_ms"])
+    path = []
+    while node is not None:
+        kids = children.get(node["span_id"], [])
+        self_ms = max(0.0, node["duration_ms"] - sum(k["duration_ms"] for k in kids))
+        path.append({**node, "self_ms": round(self_ms, 4)})
+        node = max(kids, key=lambda s: s["duration_ms"]) if kids else None
+    return path
+
+
+def summarize(path: str, top: int = 10) -> List[Dict[str, Any]]:
+    """Самые медленные трассы с их критическим путём."""
+    summary = []
+    for trace_id, spans in load_traces(path).items():
+        chain = critical_path(spans)
+        summary.append({"trace_id": trace_id, "duration_ms": chain[0]["duration_ms"], "spans": len(spans), "critical_path": chain})
+    summary.sort(key=lambda item: item["duration_ms"], reverse=True)
+    return summary[:top]
+
+
+def main(argv: List[str]) -> int:
+    if not argv:
+        print("Использование: python -m navigation.tracing <traces.jsonl> [--top N]")
+        return 1
+    top = int(argv[argv.index("--top") + 1]) if "--top" in argv else 10
+    for item in summarize(argv[0], top):
+        print(f"trace {item['trace_id']}: {item['duration_ms']:.2f} мс, span'ов: {item['spans']}")
+        for depth, node in enumerate(item["critical_path"]):
+            share = node["self_ms"] / item["duration_ms"] * 100 if item["duration_ms"] else 0.0
+            print(f"  {'  ' * depth}{node['name']}: {node['duration_ms']:.2f} мс (своё {node['self_ms']:.2f} мс, {share:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
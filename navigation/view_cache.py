@@ -0,0 +1,90 @@
+# navigation/view_cache.py
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .manifest import template_keys
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} нельзя изменять: view общий для всех пользователей")
+
+
+class FrozenList(list):
+    """Неизменяемый список: сравнивается и итерируется как обычный list."""
+    __slots__ = ()
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+class FrozenView(dict):
+    """Неизменяемый dict для закэшированных view и их действий."""
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    update = setdefault = pop = popitem = clear = _readonly
+
+    def __reduce__(self):
+        return (FrozenView, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return FrozenView({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+    return value
+
+
+class ViewCache:
+    """
+    LRU-кэш готовых view. Ключ — (screen_id, версия манифеста, страница,
+    значения только тех ключей контекста, на которые ссылаются шаблоны экрана).
+    Кэш общий для потоков, в которых работают движки (см. BotInstance.run).
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._views: "OrderedDict[Hashable, FrozenView]" = OrderedDict()
+        self._keys: Dict[str, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def context_keys(self, screen_id: str, screen_def: Dict[str, Any]) -> Tuple[str, ...]:
+        keys = self._keys.get(screen_id)
+        if keys is None:
+            keys = self._keys[screen_id] = tuple(template_keys(screen_def["title"]))
+        return keys
+
+    def get(self, key: Hashable) -> Optional[FrozenView]:
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._views.move_to_end(key)
+            return view
+
+    def put(self, key: Hashable, view: Dict[str, Any]) -> FrozenView:
+        frozen = freeze(view)
+        with self._lock:
+            self._views[key] = frozen
+            if len(self._views) > self.max_size:
+                self._views.popitem(last=False)
+        return frozen
+
+    def items(self) -> List[Tuple[Hashable, FrozenView]]:
+        with self._lock:
+            return list(self._views.items())
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+            self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._views)
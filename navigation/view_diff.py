@@ -0,0 +1,111 @@
+# navigation/view_diff.py
+"""
+Разница между двумя view для инкрементального обновления интерфейса.
+
+Идентичность действия не зависит от его позиции (id вида `dynamic_3`
+меняются при листании и поиске): ключ строится из типа действия и того,
+куда оно ведёт, — цели, контекста, направления листания и т.п.
+"""
+from typing import Any, Dict, List, Optional
+
+# Поля view, которые влияют на раскладку кнопок
+LAYOUT_FIELDS = ("screen_type", "layout", "columns", "accepts_input")
+
+
+def action_key(action: Dict[str, Any]) -> str:
+    """Стабильный ключ действия."""
+    action_type = action.get("type")
+    if action_type == "back":
+        return "back"
+    if action_type == "paginate":
+        return f"page:{action.get('screen_id')}:{action.get('direction')}"
+    if action_type == "navigate":
+        context = action.get("context") or {}
+        suffix = ",".join(f"{k}={context[k]}" for k in sorted(context))
+        return f"nav:{action.get('target')}:{suffix}"
+    if action_type == "action":
+        return f"act:{action.get('action')}:{action.get('payload', '')}"
+    return f"{action_type}:{action.get('id')}"
+
+
+def action_keys(actions: List[Dict[str, Any]]) -> List[str]:
+    """Ключи всех действий; повторяющиеся различаются суффиксом `#n`."""
+    keys = []
+    seen: Dict[str, int] = {}
+    for action in actions:
+        key = action_key(action)
+        count = seen.get(key, 0)
+        seen[key] = count + 1
+        keys.append(f"{key}#{count}" if count else key)
+    return keys
+
+
+def diff_views(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Сравнивает последний доставленный view с новым:
+
+        {
+          "changed": bool,          # False — интерфейс трогать не нужно
+          "full": bool,             # прошлого view нет или сменился тип экрана
+          "title": str | None,      # новый текст, если изменился
+          "layout_changed": bool,
+          "keyboard_changed": bool, # изменились кнопки или раскладка
+          "added": [(index, key, action)],
+          "removed": [key],
+          "relabelled": [(key, label)],
+          "updated": [(key, action)],  # тот же ключ, но изменились поля (label, id, ...)
+          "moved": [(key, old_index, new_index)],
+          "keys": [key],            # ключи действий нового view по порядку
+          "view": new,
+        }
+    """
+    new_keys = action_keys(new["actions"])
+    delta: Dict[str, Any] = {
+        "changed": True,
+        "full": old is None or old.get("screen_type") != new.get("screen_type"),
+        "title": new["text"],
+        "layout_changed": True,
+        "keyboard_changed": True,
+        "added": [(i, key, action) for i, (key, action) in enumerate(zip(new_keys, new["actions"]))],
+        "removed": [],
+        "relabelled": [],
+        "updated": [],
+        "moved": [],
+        "keys": new_keys,
+        "view": new,
+    }
+    if delta["full"]:
+        return delta
+    if old is new:
+        # Закэшированный view тот же самый объект — изменений нет
+        delta.update(changed=False, title=None, layout_changed=False, keyboard_changed=False, added=[])
+        return delta
+
+    old_keys = action_keys(old["actions"])
+    old_actions = dict(zip(old_keys, old["actions"]))
+    new_set = set(new_keys)
+    delta["title"] = new["text"] if new["text"] != old["text"] else None
+    delta["layout_changed"] = any(old.get(field) != new.get(field) for field in LAYOUT_FIELDS)
+    delta["added"] = [(i, key, action) for i, (key, action) in enumerate(zip(new_keys, new["actions"])) if key not in old_actions]
+    delta["removed"] = [key for key in old_keys if key not in new_set]
+    delta["updated"] = [
+        (key, action) for key, action in zip(new_keys, new["actions"])
+        if key in old_actions and old_actions[key] != action
+    ]
+    delta["relabelled"] = [
+        (key, action["label"]) for key, action in delta["updated"] if old_actions[key].get("label") != action.get("label")
+    ]
+    # Перемещения считаем среди действий, которые есть в обоих view
+    old_common = [key for key in old_keys if key in new_set]
+    new_common = [key for key in new_keys if key in old_actions]
+    old_positions = {key: i for i, key in enumerate(old_keys)}
+    new_positions = {key: i for i, key in enumerate(new_keys)}
+    delta["moved"] = [
+        (key, old_positions[key], new_positions[key])
+        for old_key, key in zip(old_common, new_common) if old_key != key
+    ]
+    delta["keyboard_changed"] = bool(
+        delta["layout_changed"] or delta["added"] or delta["removed"] or delta["updated"] or delta["moved"]
+    )
+    delta["changed"] = delta["keyboard_changed"] or delta["title"] is not None
+    return delta
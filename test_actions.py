@@ -0,0 +1,100 @@
+"""
+Тест лёгких кнопок view (navigation.actions).
+
+Проверяет:
+- Action читается и сравнивается как прежний dict, отсутствующие поля не видны.
+- Статические кнопки, элементы items, листание и «Назад» общие для рендеров
+  и пользователей; динамические кнопки получают id из общей таблицы.
+- Action переживает pickle (выгрузка сессий, prefork) и to_dict().
+- Action неизменяем после создания; быстрый конструктор Action.navigation.
+"""
+import pickle
+
+from navigation.actions import Action, back, navigate
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+
+
+def _engine():
+    return NavigationEngine("menu-manifest.json", logger=NavigationLogger("ActionsTest"), api_client=APISimulator())
+
+
+def test_action_reads_like_dict():
+    action = navigate("static_0", "Мои треки", "tracks")
+    assert action == {"id": "static_0", "label": "Мои треки", "type": "navigate", "target": "tracks"}
+    assert {"id": "back", "label": "< Назад", "type": "back"} == back("< Назад")
+    assert action["target"] == "tracks" and action.get("context") is None
+    assert "context" not in action and "target" in action and "missing" not in action
+    assert list(action) == ["id", "label", "type", "target"] and len(action) == 4
+    assert {**action, "label": "Треки"}["label"] == "Треки"
+    try:
+        action["context"]
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("отсутствующее поле должно давать KeyError")
+
+    restored = pickle.loads(pickle.dumps(Action("a1", "Да", "action", action="submit_mark")))
+    assert restored == {"id": "a1", "label": "Да", "type": "action", "action": "submit_mark"}
+    assert type(restored.to_dict()) is dict
+
+
+def test_user_independent_actions_are_shared():
+    engine = _engine()
+    first = engine.get_current_view("u1")["actions"]
+    engine.view_cache.clear()
+    second = engine.get_current_view("u2")["actions"]
+    assert all(a is b for a, b in zip(first, second))
+
+    for user in ("u1", "u2"):
+        engine.handle_action(user, {"type": "navigate", "target": "alphabet", "label": "Тест: Алфавит"})
+    letters_1 = engine._build_paginated_actions("u1", engine.manifest.screens["alphabet"], {})
+    letters_2 = engine._build_paginated_actions("u2", engine.manifest.screens["alphabet"], {})
+    assert all(a is b for a, b in zip(letters_1, letters_2))
+    assert letters_1[-1]["type"] == "paginate"
+
+
+def test_dynamic_actions_and_navigation():
+    engine = _engine()
+    engine.handle_action("u1", {"type": "navigate", "target": "select_metric", "label": "Метрика",
+                                "context": {"student_name": "Иванов"}})
+    view = engine.get_current_view("u1")
+    metrics = [a for a in view["actions"] if a["type"] == "navigate"]
+    assert len(metrics) == 12
+    assert metrics[0] == {
+        "id": "dynamic_0", "label": "Креативность", "type": "navigate", "target": "confirm_mark",
+        "context": {"metric_id": "creative", "metric_name": "Креативность"},
+    }
+    assert metrics[3]["id"] is engine.get_current_view("u1")["actions"][3]["id"]  # id из общей таблицы
+    engine.handle_action("u1", metrics[0])
+    assert engine.get_user_state("u1")["current_screen"] == "confirm_mark"
+    assert engine.get_user_state("u1")["context"]["metric_name"] == "Креативность"
+
+
+def test_action_is_immutable():
+    action = Action.navigation("dynamic_0", "Иванов", "student_profile", {"student_id": "ivanov"})
+    assert action == navigate("dynamic_0", "Иванов", "student_profile", {"student_id": "ivanov"})
+    for change in (lambda: setattr(action, "label", "Петров"), lambda: delattr(action, "target"),
+                   lambda: setattr(action, "payload", "x")):
+        try:
+            change()
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError("общую кнопку нельзя менять")
+    try:
+        Action("a1", "Да", "action", colour="red")
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("неизвестное поле должно давать TypeError")
+    assert pickle.loads(pickle.dumps(action)) == action
+
+    shared = _engine().get_current_view("u1")["actions"][0]
+    try:
+        shared.label = "Чужая кнопка"
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("общую кнопку нельзя менять")
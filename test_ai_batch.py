@@ -0,0 +1,175 @@
+"""
+Тест микро-батчинга AI-запросов (navigation.ai_batch) против локального
+фейкового сервера модели.
+
+Проверяет:
+- Запросы, пришедшие в одно окно, уходят одним батчем, и каждый ответ
+  возвращается своему отправителю; метрики размера батча и ожидания.
+- Без батч-эндпоинта запросы уходят по одному, батчинг на время выключается.
+- Батч, который мог дойти до модели (5xx, потерянный в нём ответ), не
+  повторяется по одному; недошедший (нет соединения) — повторяется.
+- Таймаут на запрос и тело запроса из ai_api экрана (engine.ai_request).
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from navigation.ai_batch import AIBatchDispatcher
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.http_client import ApiError, HttpApiClient
+from navigation.logger import NavigationLogger
+
+
+def _answer(body):
+    return {"answer": f"ответ на «{body.get('query') or body.get('request')}»"}
+
+
+class _FakeModel(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(server.delay)
+        if self.path == "/api/ai/batch":
+            if not server.batch_enabled:
+                self._send(404, {"error": "not found"})
+                return
+            if server.batch_status != 200:
+                server.batches.append(len(body["requests"]))
+                self._send(server.batch_status, {"error": "model crashed"})
+                return
+            requests = body["requests"]
+            server.batches.append(len(requests))
+            responses = [{"id": r["id"], "response": _answer(r["body"])} for r in requests
+                         if r["body"].get("query") not in server.lost]
+            self._send(200, {"responses": responses})
+        else:
+            server.singles.append(self.path)
+            self._send(200, _answer(body))
+
+    def _send(self, status, payload):
+        raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass
+
+
+@pytest.fixture
+def model():
+    server = _QuietServer(("127.0.0.1", 0), _FakeModel)
+    server.batch_enabled, server.batch_status, server.delay, server.lost = True, 200, 0.0, set()
+    server.batches, server.singles = [], []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def _dispatcher(server, **kwargs):
+    host, port = server.server_address
+    client = HttpApiClient(f"http://{host}:{port}", retries=0, pool_size=8)
+    return AIBatchDispatcher(client, **kwargs)
+
+
+def test_requests_in_one_window_share_a_batch(model):
+    dispatcher = _dispatcher(model, window_ms=50, max_batch=8)
+    try:
+        futures = [dispatcher.submit("/api/ai/teacher-assist", {"query": f"вопрос {i}"}) for i in range(20)]
+        answers = [future.result(5) for future in futures]
+    finally:
+        dispatcher.close()
+    assert answers == [{"answer": f"ответ на «вопрос {i}»"} for i in range(20)]
+    assert sorted(model.batches) == [4, 8, 8] and model.singles == []
+    metrics = dispatcher.metrics()
+    assert metrics["requests"] == 20 and metrics["batch_requests"] == 3
+    assert metrics["batch_sizes"] == {4: 1, 8: 2} and metrics["avg_batch"] == pytest.approx(20 / 3, abs=0.01)
+    assert 0 < metrics["avg_wait_ms"] <= 200
+
+
+def test_fallback_to_single_requests(model):
+    model.batch_enabled = False
+    dispatcher = _dispatcher(model, window_ms=30, batch_retry_after=60)
+    try:
+        futures = [dispatcher.submit("/api/ai/help", {"request": f"помощь {i}"}) for i in range(5)]
+        assert [f.result(5)["answer"] for f in futures] == [f"ответ на «помощь {i}»" for i in range(5)]
+        with ThreadPoolExecutor(4) as pool:
+            answers = list(pool.map(lambda i: dispatcher.request("/api/ai/help", {"request": f"ещё {i}"}), range(4)))
+        assert [a["answer"] for a in answers] == [f"ответ на «ещё {i}»" for i in range(4)]
+    finally:
+        dispatcher.close()
+    metrics = dispatcher.metrics()
+    assert metrics["fallback_batches"] == 1 and metrics["batch_requests"] == 1  # дальше батчинг выключен
+    assert metrics["single_requests"] == 9 and len(model.singles) == 9
+
+
+
+def test_batch_that_may_have_reached_model_is_not_resent(model):
+    # Ответ потерялся в батче — модель вопрос уже видела, отдельно не спрашиваем
+    model.lost = {"потеряется"}
+    dispatcher = _dispatcher(model, window_ms=30)
+    try:
+        futures = [dispatcher.submit("/api/ai/teacher-assist", {"query": q}) for q in ("первый", "потеряется")]
+        assert futures[0].result(5)["answer"] == "ответ на «первый»"
+        with pytest.raises(RuntimeError):
+            futures[1].result(5)
+        # 5xx батч-эндпоинта: все запросы батча завершаются ошибкой, без повторов
+        model.batch_status = 500
+        futures = [dispatcher.submit("/api/ai/teacher-assist", {"query": f"вопрос {i}"}) for i in range(3)]
+        for future in futures:
+            with pytest.raises(ApiError):
+                future.result(5)
+    finally:
+        dispatcher.close()
+    assert model.singles == [] and model.batches == [2, 3]
+    assert dispatcher.metrics()["errors"] == 4 and dispatcher.metrics()["fallback_batches"] == 0
+
+    # Бэкенд недоступен: батч не ушёл, запросы пробуют отправиться по одному
+    host, port = model.server_address
+    model.shutdown()
+    model.server_close()
+    dispatcher = AIBatchDispatcher(HttpApiClient(f"http://{host}:{port}", retries=2), window_ms=30)
+    try:
+        futures = [dispatcher.submit("/api/ai/help", {"request": f"помощь {i}"}) for i in range(2)]
+        for future in futures:
+            with pytest.raises(ApiError) as error:
+                future.result(5)
+            assert error.value.sent is False
+    finally:
+        dispatcher.close()
+    metrics = dispatcher.metrics()
+    assert metrics["fallback_batches"] == 1 and metrics["single_requests"] == 2
+
+
+def test_timeouts_and_engine_request(model):
+    model.delay = 0.5
+    dispatcher = _dispatcher(model, window_ms=1)
+    try:
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            dispatcher.request("/api/ai/help", {"request": "долго"}, timeout=0.1)
+        assert time.monotonic() - started < 0.4
+    finally:
+        dispatcher.close()
+    assert dispatcher.metrics()["timeouts"] == 1
+
+    engine = NavigationEngine("menu-manifest.json", logger=NavigationLogger("AIBatchTest"), api_client=APISimulator())
+    assert engine.ai_request("u1", "привет") is None  # на main нет ai_api
+    engine.handle_action("u1", {"type": "navigate", "target": "chat_mode", "label": "Чат"})
+    url, body = engine.ai_request("u1", "Как мотивировать отстающего?")
+    assert url == "/api/ai/teacher-assist"
+    assert body == {"user_id": "u1", "context": "", "query": "Как мотивировать отстающего?"}
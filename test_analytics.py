@@ -0,0 +1,121 @@
+"""
+Тест колоночного хранилища событий выбора.
+
+Проверяет:
+- Последних студентов преподавателя (без повторов, новые первыми).
+- Частоту метрик и переходов.
+- Сброс в сегмент и повторное открытие через mmap; таблица строк пишется
+  один раз на каталог, оборванная дозапись в неё отбрасывается.
+- recent_context отвечает из индекса последних значений без прохода по
+  колонкам, индекс перестраивается при открытии и совпадает с полным
+  проходом.
+- Автоматический сброс по числу событий и по времени.
+- Обслуживание quick_grade из локальных данных.
+"""
+import glob
+import os
+
+from navigation.analytics import RECENT_LIMIT, STRINGS_FILE, SelectionStore
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+
+
+def _fill(store):
+    store.append("t1", "quick_grade", "select_metric", {"student_id": "ivanov", "student_name": "Иванов Иван"}, 1.0)
+    store.append("t1", "select_metric", "confirm_mark", {"metric_id": "creative", "metric_name": "Креативность"}, 2.0)
+    store.append("t1", "quick_grade", "select_metric", {"student_id": "petrov", "student_name": "Петров Пётр"}, 3.0)
+    store.append("t2", "quick_grade", "select_metric", {"student_id": "sidorov", "student_name": "Сидоров Сидор"}, 4.0)
+    store.append("t1", "quick_grade", "select_metric", {"student_id": "ivanov", "student_name": "Иванов Иван"}, 5.0)
+
+
+def test_aggregations():
+    store = SelectionStore()
+    _fill(store)
+    assert store.recent_context("t1", "student_id") == [("ivanov", "Иванов Иван"), ("petrov", "Петров Пётр")]
+    assert store.recent_context("t1", "student_id", limit=1) == [("ivanov", "Иванов Иван")]
+    assert store.context_counts("student_id")["ivanov"] == 2
+    assert store.context_counts("metric_id", user_id="t2") == {}
+    assert store.transition_counts()[("quick_grade", "select_metric")] == 4
+
+
+def test_segments_roundtrip(tmp_path):
+    store = SelectionStore(str(tmp_path))
+    _fill(store)
+    assert store.flush() is not None
+    store.append("t1", "quick_grade", "select_metric", {"student_id": "sidorov", "student_name": "Сидоров Сидор"}, 6.0)
+    store.flush()
+
+    reopened = SelectionStore(str(tmp_path))
+    assert len(reopened) == 6
+    assert reopened.recent_context("t1", "student_id")[0] == ("sidorov", "Сидоров Сидор")
+    assert reopened.transition_counts() == store.transition_counts()
+
+    # Каждая строка записана один раз, сколько бы сегментов на неё ни ссылалось
+    strings = (tmp_path / STRINGS_FILE).read_text(encoding="utf-8").splitlines()
+    assert len(strings) == len(set(strings)) == len(store._strings) - 1
+    reopened.append("t1", "quick_grade", "select_metric", {"student_id": "ivanov", "student_name": "Иванов Иван"}, 7.0)
+    reopened.flush()
+    assert (tmp_path / STRINGS_FILE).read_text(encoding="utf-8").splitlines() == strings
+
+    # Упали посреди дозаписи строк: хвост без перевода строки отбрасывается
+    with open(tmp_path / STRINGS_FILE, "a", encoding="utf-8") as f:
+        f.write('"оборван')
+    recovered = SelectionStore(str(tmp_path))
+    assert len(recovered) == 7 and recovered.recent_context("t1", "student_id")[0] == ("ivanov", "Иванов Иван")
+    assert (tmp_path / STRINGS_FILE).read_text(encoding="utf-8").splitlines() == strings
+
+
+def test_recent_index(tmp_path, monkeypatch):
+    store = SelectionStore(str(tmp_path))
+    for i in range(RECENT_LIMIT + 10):
+        store.append("t1", "quick_grade", "select_metric", {"student_id": f"s{i % 20}", "student_name": f"С{i}"}, float(i))
+        store.append("t2", "quick_grade", "select_metric", {"student_id": f"x{i}"}, float(i))
+        if i % 7 == 0:
+            store.flush()
+    full = store.recent_context("t1", "student_id", limit=RECENT_LIMIT + 10)  # полный проход
+    assert full[:3] == [("s5", "С25"), ("s4", "С24"), ("s3", "С23")] and len(full) == 20
+
+    store.flush()
+    reopened = SelectionStore(str(tmp_path))
+    for candidate in (store, reopened):
+        with monkeypatch.context() as m:
+            m.setattr(candidate, "_tables", lambda kind: 1 / 0)  # колонки не трогаем
+            assert candidate.recent_context("t1", "student_id", limit=RECENT_LIMIT) == full[:RECENT_LIMIT]
+            assert candidate.recent_context("t2", "student_id", limit=2) == [("x25", None), ("x24", None)]
+            assert candidate.recent_context("t1", "metric_id") == []
+
+
+def test_auto_flush(tmp_path, monkeypatch):
+    store = SelectionStore(str(tmp_path / "rows"), flush_every=2, flush_interval=None)
+    _fill(store)
+    assert len(glob.glob(os.path.join(str(tmp_path / "rows"), "*.seg"))) == 2 and len(store._events) == 1
+
+    clock = [1000.0]
+    monkeypatch.setattr("navigation.analytics.time.monotonic", lambda: clock[0])
+    store = SelectionStore(str(tmp_path / "time"), flush_interval=60.0)
+    _fill(store)
+    assert not glob.glob(os.path.join(str(tmp_path / "time"), "*.seg"))
+    clock[0] += 61
+    store.append("t1", "quick_grade", "select_metric", None, 6.0)
+    assert len(SelectionStore(str(tmp_path / "time"))) == 6
+
+
+def test_quick_grade_served_locally():
+    class CountingAPI(APISimulator):
+        calls = []
+
+        def call(self, url, method="GET", **kwargs):
+            self.calls.append(url)
+            return super().call(url, method, **kwargs)
+
+    store = SelectionStore()
+    store.append("u1", "student_profile", "select_metric", {"student_id": "petrov", "student_name": "Петров Пётр"}, 1.0)
+    engine = NavigationEngine(manifest_path="menu-manifest.json", api_client=CountingAPI(), analytics=store)
+    engine.handle_action("u1", {"type": "navigate", "target": "quick_grade", "label": "Поставить отметки"})
+    view = engine.get_current_view("u1")
+    assert [a["label"] for a in view["actions"] if a["type"] == "navigate"] == ["Петров Пётр"]
+    assert "/api/teacher/recent_students" not in CountingAPI.calls
+
+    # Выбор студента сам попадает в хранилище
+    engine.handle_action("u1", view["actions"][0])
+    assert store.recent_context("u1", "student_id") == [("petrov", "Петров Пётр")]
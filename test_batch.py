@@ -0,0 +1,41 @@
+"""
+Тест batch-API движка.
+
+Проверяет:
+- Действия применяются в порядке для каждого пользователя.
+- Одинаковые запросы к источнику данных выполняются один раз.
+- Результат совпадает с последовательной обработкой.
+"""
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+
+
+class CountingAPI(APISimulator):
+    def __init__(self):
+        self.calls = []
+
+    def call(self, url, method="GET", **kwargs):
+        self.calls.append(url)
+        return super().call(url, method, **kwargs)
+
+
+TRACKS = {"type": "navigate", "target": "tracks", "label": "Мои треки"}
+QUICK = {"type": "navigate", "target": "quick_grade", "label": "Поставить отметки"}
+BACK = {"type": "back", "label": "< Назад"}
+
+
+def test_batch_matches_sequential_and_dedups_fetches():
+    batch_api, seq_api = CountingAPI(), CountingAPI()
+    batch = NavigationEngine(manifest_path="menu-manifest.json", api_client=batch_api)
+    sequential = NavigationEngine(manifest_path="menu-manifest.json", api_client=seq_api)
+    pairs = [("a", TRACKS), ("b", TRACKS), ("c", QUICK), ("a", BACK), ("a", QUICK)]
+
+    views = batch.handle_actions_batch(pairs)
+    for user_id, action in pairs:
+        sequential.handle_action(user_id, action)
+
+    assert list(views) == ["a", "b", "c"]
+    for user_id in views:
+        assert views[user_id] == sequential.get_current_view(user_id)
+    # a и c на quick_grade, b на tracks: два уникальных запроса
+    assert sorted(batch_api.calls) == ["/api/teacher/recent_students", "/api/teacher/tracks"]
@@ -0,0 +1,110 @@
+"""
+Тест схлопывания очереди апдейтов после простоя (navigation.catchup).
+
+Проверяет:
+- Из серии нажатий в чате остаётся только последнее на самом свежем сообщении.
+- Нажатие, после которого пришёл текст, сохраняется: текст обрабатывается
+  на экране, куда оно привело.
+- Текст (чат-режим, поиск) сохраняется в исходном порядке; /start
+  отбрасывает нажатия и /start до себя.
+- Чаты не влияют друг на друга, апдейты не из чата не трогаются.
+- replay_backlog: чаты обрабатываются одновременно (движок — через
+  BotInstance.run, вне event loop), апдейты чата — по порядку.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from navigation.catchup import collapse_backlog, replay_backlog, update_chat
+from navigation.hosting import BotHost
+
+
+def _click(update_id, chat, message_id, data="navigate|static_0"):
+    message = SimpleNamespace(chat=SimpleNamespace(id=chat), message_id=message_id)
+    query = SimpleNamespace(data=data, message=message, from_user=SimpleNamespace(id=chat))
+    return SimpleNamespace(update_id=update_id, callback_query=query, message=None)
+
+
+def _text(update_id, chat, text):
+    message = SimpleNamespace(chat=SimpleNamespace(id=chat), text=text, from_user=SimpleNamespace(id=chat))
+    return SimpleNamespace(update_id=update_id, callback_query=None, message=message)
+
+
+def _ids(updates):
+    return [u.update_id for u in updates]
+
+
+def test_only_latest_click_survives():
+    backlog = [_click(1, 10, 100), _click(2, 10, 100, "back|back"), _click(3, 10, 90), _click(4, 10, 100)]
+    kept, dropped = collapse_backlog(backlog)
+    assert _ids(kept[10]) == [4]
+    assert sorted(_ids(dropped)) == [1, 2, 3]
+
+
+def test_click_before_text_is_kept():
+    # «Чат с ИИ» -> вопрос -> «Завершить»: вопрос должен попасть в чат-режим
+    backlog = [_click(1, 10, 100, "navigate|chat"), _text(2, 10, "Как оценивать проекты?"),
+               _click(3, 10, 100, "navigate|finish")]
+    kept, dropped = collapse_backlog(backlog)
+    assert _ids(kept[10]) == [1, 2, 3] and dropped == []
+
+    backlog = [_click(1, 10, 100), _click(2, 10, 100), _text(3, 10, "вопрос"), _click(4, 10, 100),
+               _click(5, 10, 90), _text(6, 10, "ещё"), _text(7, 10, "и ещё"), _click(8, 10, 100), _click(9, 10, 100)]
+    kept, dropped = collapse_backlog(backlog)
+    assert _ids(kept[10]) == [2, 3, 4, 6, 7, 9]
+    assert sorted(_ids(dropped)) == [1, 5, 8]
+
+
+def test_text_kept_in_order_and_start_resets():
+    backlog = [
+        _click(1, 10, 100), _text(2, 10, "Как оценивать проекты?"), _click(3, 10, 100),
+        _text(4, 10, "/start"), _text(5, 10, "А защиту?"), _click(6, 10, 100), _text(7, 10, "/start"),
+        _text(8, 10, "Иван"), _click(9, 10, 120), _click(10, 10, 121),
+    ]
+    kept, dropped = collapse_backlog(list(reversed(backlog)))
+    assert _ids(kept[10]) == [2, 5, 7, 8, 10]
+    assert sorted(_ids(dropped)) == [1, 3, 4, 6, 9]
+
+
+def test_chats_are_independent():
+    other = SimpleNamespace(update_id=5, callback_query=None, message=None, my_chat_member=object())
+    backlog = [_click(1, 10, 100), _click(2, 20, 200), _click(3, 10, 100), _text(4, 20, "поиск"), other]
+    kept, dropped = collapse_backlog(backlog)
+    assert _ids(kept[10]) == [3] and _ids(kept[20]) == [2, 4] and _ids(kept[None]) == [5]
+    assert _ids(dropped) == [1]
+    assert collapse_backlog([]) == ({}, [])
+
+
+def test_replay_overlaps_chats(tmp_path):
+    host = BotHost(log_file=str(tmp_path / "nav.log"))
+    instance = host.add("school1")
+    engine = instance.engine
+    running, overlap, handled = set(), [], []
+
+    def press(chat, update_id):
+        # Как обработчик нажатия: блокирующий движок и медленный API
+        running.add(chat)
+        overlap.append(len(running))
+        engine.handle_action(str(chat), {"type": "navigate", "target": "tracks", "label": "Мои треки"})
+        time.sleep(0.1)
+        running.discard(chat)
+        handled.append(update_id)
+
+    async def feed(update):
+        chat = update_chat(update)
+        if update.update_id == 13:
+            raise RuntimeError("апдейт не разобрался")
+        await instance.run(str(chat), press, chat, update.update_id)
+
+    kept, _ = collapse_backlog([_click(1, 10, 100), _click(2, 10, 100), _text(3, 10, "Иван"), _click(4, 10, 100),
+                                _click(11, 20, 200), _click(12, 30, 300), _click(13, 40, 400)])
+    errors = []
+    started = time.monotonic()
+    asyncio.run(replay_backlog(kept, feed, lambda update, error: errors.append(update.update_id)))
+    elapsed = time.monotonic() - started
+
+    assert max(overlap) == 3 and elapsed < 0.4  # чаты одновременно, а не 0.5 с подряд
+    assert handled.index(2) < handled.index(3) < handled.index(4) and sorted(handled) == [2, 3, 4, 11, 12]
+    assert errors == [13]
+    assert engine.get_user_state("10")["current_screen"] == "tracks"
+    host.close()
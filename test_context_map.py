@@ -0,0 +1,53 @@
+"""
+Тест ContextMap и восстановления контекста по «Назад».
+
+Проверяет:
+- Неизменяемость версий и общие узлы между ними.
+- Удаление ключей, длину и уплотнение длинных цепочек.
+- Сохранение через pickle (выгрузка сессий на диск).
+- Возврат восстанавливает ровно тот контекст, с которым уходили с экрана.
+"""
+import pickle
+
+from navigation.api_stub import APISimulator
+from navigation.context_map import MAX_CHAIN, ContextMap
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+
+
+def test_versions_share_structure():
+    base = ContextMap({"user_id": "u1", "track_id": "gd"})
+    updated = base.set_many({"track_id": "arch", "track_name": "Архитектура"})
+    assert base == {"user_id": "u1", "track_id": "gd"}
+    assert updated == {"user_id": "u1", "track_id": "arch", "track_name": "Архитектура"}
+    assert updated._parent is base and updated._changes == {"track_id": "arch", "track_name": "Архитектура"}
+    assert base.set("track_id", "gd") is base  # без изменений — та же версия
+
+    trimmed = updated.without(["track_id", "missing"])
+    assert "track_id" not in trimmed and len(trimmed) == 2
+    assert trimmed.get("track_name") == "Архитектура"
+
+
+def test_compaction_and_pickle():
+    context = ContextMap({"user_id": "u1"})
+    for i in range(MAX_CHAIN * 3):
+        context = context.set(f"k{i % 5}", i)
+    assert context.depth <= MAX_CHAIN
+    restored = pickle.loads(pickle.dumps(context.without(["k0"])))
+    assert restored == context.without(["k0"])
+    assert "k0" not in restored and len(restored) == 5
+
+
+def test_back_restores_snapshot():
+    engine = NavigationEngine("menu-manifest.json", logger=NavigationLogger("ContextMapTest"), api_client=APISimulator())
+    engine.handle_action("u1", {"type": "navigate", "target": "quick_grade", "label": "Поставить отметки"})
+    before = engine.get_user_state("u1")["context"]
+
+    engine.handle_action("u1", engine.get_current_view("u1")["actions"][0])  # -> select_metric
+    assert "student_id" in engine.get_user_state("u1")["context"]
+    engine.handle_action("u1", {"type": "back", "label": "< Назад"})
+
+    state = engine.get_user_state("u1")
+    assert state["current_screen"] == "quick_grade"
+    assert state["context"] is before  # тот же снимок, без копирования
+    assert state["context_snapshots"][-1][0] == engine.manifest.screen_index.number("main")
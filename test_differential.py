@@ -0,0 +1,51 @@
+"""
+Тест дифференциальной проверки (navigation.differential, navigation.reference).
+
+Проверяет:
+- На случайных сессиях NavigationEngine и эталонный движок не расходятся;
+  отчёт содержит время обоих движков.
+- Внесённая ошибка (ключ кэша view без номера страницы) находится и ужимается
+  до короткого воспроизведения, которое само по себе повторяет расхождение.
+"""
+import logging
+import os
+
+from navigation.api_stub import APISimulator
+from navigation.differential import Divergence, default_engine, default_reference, replay, run
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+
+
+class PageBlindCacheEngine(NavigationEngine):
+    """Ошибка для проверки харнесса: кэш view не различает страницы."""
+
+    def _view_cache_key(self, state, screen_id, screen_def):
+        key = super()._view_cache_key(state, screen_id, screen_def)
+        return key and (key[0], key[1], key[3])
+
+
+def _buggy_engine(manifest_path):
+    logger = NavigationLogger("DifferentialTest", level=logging.WARNING, log_file=os.devnull)
+    return PageBlindCacheEngine(manifest_path, logger=logger, api_client=APISimulator())
+
+
+def test_engine_matches_reference():
+    report = run("menu-manifest.json", sessions=60, steps=30, seed=7)
+    assert report["divergence"] is None, report["reproducer"]
+    assert report["sessions"] == 60 and report["steps"] == 60 * 30
+    assert report["reference_s"] > 0 and report["optimized_s"] > 0 and report["speedup"] > 0
+
+
+def test_injected_bug_is_found_and_shrunk():
+    report = run("menu-manifest.json", sessions=200, steps=40, seed=3, make_engine=_buggy_engine)
+    divergence = report["divergence"]
+    assert isinstance(divergence, Divergence) and divergence.kind == "view"
+    # Достаточно дойти до листаемого экрана и перелистнуть
+    assert len(divergence.steps) <= 3
+    assert divergence.steps[-1][0] == "click" and all(step[1] == 0 for step in divergence.steps)
+    assert repr(divergence.steps) in report["reproducer"]
+    compile(report["reproducer"], "<reproducer>", "exec")
+
+    again = replay(default_reference("menu-manifest.json"), _buggy_engine("menu-manifest.json"), divergence.steps)
+    assert again is not None and again.index == len(divergence.steps) - 1
+    assert replay(default_reference("menu-manifest.json"), default_engine("menu-manifest.json"), divergence.steps) is None
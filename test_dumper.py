@@ -0,0 +1,209 @@
+"""
+Тест dumper.py (дамп дерева проекта в один текстовый файл).
+
+Проверяет:
+- Шаблоны include/exclude (PatternMatcher) и отсечение папок exclude_dirs:
+  в исключённые папки обход даже не заходит.
+- Инкрементальный дамп (--incremental) побайтно совпадает со свежим, в том
+  числе без copy_file_range (копирование порциями).
+- Без исключений вывод побайтно совпадает с прежним dumper.py, включая
+  CRLF, бинарные файлы и большие файлы, которые пишутся потоково.
+- Дельта (--delta): в <output>.delta только изменённые и новые файлы и
+  список DELETED; файлы с прежним содержимым (даже с новым mtime)
+  пропускаются, сам дамп и его индекс не меняются.
+"""
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+import dumper
+
+
+def _reference_dump(config, output_path):
+    """Прежний dumper.py (до ускорения) — эталон вывода; без exclude_dirs."""
+    import fnmatch
+
+    def should_include(name, include_patterns, exclude_patterns):
+        if any(fnmatch.fnmatch(name, exclude) for exclude in exclude_patterns):
+            return False
+        return not include_patterns or any(fnmatch.fnmatch(name, include) for include in include_patterns)
+
+    def tree(root_dir, file_include, file_exclude, folder_exclude, prefix=""):
+        result = []
+        items = sorted(os.listdir(root_dir))
+        dirs = [i for i in items if os.path.isdir(os.path.join(root_dir, i))
+                and should_include(i, ["*"], folder_exclude)]
+        files = [i for i in items if not os.path.isdir(os.path.join(root_dir, i))
+                 and should_include(i, file_include, file_exclude)]
+        items = dirs + files
+        pointers = ["├── "] * (len(items) - 1) + ["└── "]
+        for pointer, item in zip(pointers, items):
+            path = os.path.join(root_dir, item)
+            result.append(f"{prefix}{pointer}{item}")
+            if os.path.isdir(path):
+                extension = "│   " if pointer == "├── " else "    "
+                result.extend(tree(path, file_include, file_exclude, folder_exclude, prefix + extension))
+        return result
+
+    with open(output_path, 'w', encoding='utf-8') as out:
+        print(">>> FOLDERS >>>", file=out)
+        for source in config['folders']['sources']:
+            exclude = source.get('exclude', [])
+            for line in tree(source['root'], source.get('include', []), exclude, exclude):
+                print(line, file=out)
+        print(">>> FILES >>>", file=out)
+        for source in config['files']['sources']:
+            for dirpath, dirnames, filenames in os.walk(source['root']):
+                for filename in filenames:
+                    if should_include(filename, source['include'], source['exclude']):
+                        file_path = os.path.join(dirpath, filename)
+                        try:
+                            with open(file_path, 'r', encoding='utf-8') as f:
+                                content = f.read()
+                        except UnicodeDecodeError:
+                            with open(file_path, 'rb') as f:
+                                content = base64.b64encode(f.read()).decode('ascii')
+                        output = config['files']['output'].replace('@.name', os.path.relpath(file_path, source['root']))
+                        print(output.replace('@.data', content), file=out)
+
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    path.write_bytes(data)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    # Маленькие пороги: большие файлы пишутся потоково, порциями по 24 байта
+    monkeypatch.setattr(dumper, "PREFETCH_LIMIT", 64)
+    monkeypatch.setattr(dumper, "CHUNK_SIZE", 24)
+    root = tmp_path / "project"
+    _write(root / "main.py", "print('привет')\n")
+    _write(root / "crlf.txt", "строка 1\r\nстрока 2\r\n")
+    _write(root / "pkg" / "mod.py", "x = 1\n" * 40)  # больше PREFETCH_LIMIT
+    _write(root / "pkg" / "data.bin", bytes(range(256)) * 2)  # бинарный и большой
+    _write(root / "pkg" / "icon.bin", b"\xff\xfe\x00")
+    _write(root / "pkg" / "deep" / "notes.txt", "заметки\n")
+    _write(root / "build.log", "лог сборки\n")
+    _write(root / "node_modules" / "lib.py", "skip = True\n")
+    _write(root / ".cache" / "tmp.py", "skip = True\n")
+    return root
+
+
+def _config(tmp_path, root, exclude=(), exclude_dirs=()):
+    config = {
+        "folders": {"sources": [{"root": str(root), "include": ["*.py", "*.txt", "*.bin"],
+                                 "exclude": list(exclude_dirs)}],
+                    "output": "├── @.path"},
+        "files": {"sources": [{"root": str(root), "include": ["*.py", "*.txt", "*.bin", "*.log"],
+                               "exclude": list(exclude), "exclude_dirs": list(exclude_dirs)}],
+                  "output": "@.name\n---\n@.data"},
+    }
+    path = tmp_path / "makedump.json"
+    path.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    return config, str(path)
+
+
+def _dump(monkeypatch, config_path, output_path, *flags):
+    monkeypatch.setattr(sys, "argv", ["dumper.py", config_path, str(output_path), *flags])
+    dumper.main()
+    return output_path.read_bytes()
+
+
+def test_exclude_patterns_and_pruned_dirs(tmp_path, project, monkeypatch):
+    matcher = dumper.PatternMatcher(["*.py", "*.txt"], ["test_*"])
+    assert matcher("main.py") and matcher("notes.txt")
+    assert not matcher("test_main.py") and not matcher("data.bin")
+    assert dumper.PatternMatcher([], ["*.log"])("anything") and not dumper.PatternMatcher([], ["*.log"])("a.log")
+    assert dumper.should_include("a.py", ["*.py"], []) and not dumper.should_include("a.py", ["*.py"], ["a.*"])
+
+    visited = []
+    walk = os.walk
+
+    def recording_walk(top, *args, **kwargs):
+        for dirpath, dirnames, filenames in walk(top, *args, **kwargs):
+            visited.append(os.path.relpath(dirpath, project))
+            yield dirpath, dirnames, filenames
+
+    monkeypatch.setattr(dumper.os, "walk", recording_walk)
+    files = sorted(rel for _, rel in dumper.iter_source_files(str(project), ["*.py", "*.txt", "*.log"], ["*.log"],
+                                                               ["node_modules", ".*"]))
+    assert files == ["crlf.txt", "main.py", os.path.join("pkg", "deep", "notes.txt"), os.path.join("pkg", "mod.py")]
+    assert sorted(visited) == [".", "pkg", os.path.join("pkg", "deep")]  # в отсечённые папки не заходили
+
+    _, config_path = _config(tmp_path, project, exclude=["*.log"], exclude_dirs=["node_modules", ".*"])
+    text = _dump(monkeypatch, config_path, tmp_path / "out" / "dump.txt").decode("utf-8")
+    assert "main.py\n---\nprint('привет')\n" in text
+    assert "build.log" not in text and "lib.py" not in text and "tmp.py" not in text and ".cache" not in text
+
+
+def test_incremental_matches_fresh_dump(tmp_path, project, monkeypatch):
+    _, config_path = _config(tmp_path, project, exclude_dirs=["node_modules", ".*"])
+    output = tmp_path / "out" / "dump.txt"
+    _dump(monkeypatch, config_path, output)
+    assert os.path.exists(str(output) + dumper.INDEX_SUFFIX)
+
+    _write(project / "main.py", "print('пока')\nprint('ещё')\n")  # изменён
+    _write(project / "pkg" / "new.py", "new = 1\n")  # добавлен
+    os.remove(project / "pkg" / "icon.bin")  # удалён
+    os.utime(project / "crlf.txt", ns=(1, 1))  # тот же текст, другой mtime
+    fresh = _dump(monkeypatch, config_path, tmp_path / "fresh" / "dump.txt")
+    assert _dump(monkeypatch, config_path, output, "--incremental") == fresh
+
+    # Повтор без изменений — почти всё из прошлого дампа; и без copy_file_range
+    def no_copy_file_range(*args):
+        raise OSError("copy_file_range недоступен")
+
+    monkeypatch.setattr(dumper.os, "copy_file_range", no_copy_file_range, raising=False)
+    assert _dump(monkeypatch, config_path, output, "--incremental") == fresh
+
+
+def test_matches_old_dumper_without_excludes(tmp_path, project, monkeypatch):
+    for name in ("node_modules", ".cache"):
+        for path in (project / name).iterdir():
+            os.remove(path)
+        os.rmdir(project / name)
+    config, config_path = _config(tmp_path, project)
+    reference = tmp_path / "reference.txt"
+    _reference_dump(config, str(reference))
+    assert _dump(monkeypatch, config_path, tmp_path / "out" / "dump.txt") == reference.read_bytes()
+
+
+def test_delta_lists_changes_and_deleted(tmp_path, project, monkeypatch):
+    _, config_path = _config(tmp_path, project, exclude_dirs=["node_modules", ".*"])
+    output = tmp_path / "out" / "dump.txt"
+    dump = _dump(monkeypatch, config_path, output)
+    index = (tmp_path / "out" / ("dump.txt" + dumper.INDEX_SUFFIX)).read_bytes()
+    delta_path = tmp_path / "out" / "dump.txt.delta"
+
+    # Без изменений — пустые секции
+    _dump(monkeypatch, config_path, output, "--delta")
+    assert delta_path.read_bytes() == b">>> FILES >>>\n>>> DELETED >>>\n"
+
+    _write(project / "main.py", "print('пока')\n")  # изменён
+    _write(project / "pkg" / "new.py", "new = 1\n")  # добавлен
+    os.remove(project / "pkg" / "icon.bin")  # удалены
+    os.remove(project / "pkg" / "deep" / "notes.txt")
+    os.utime(project / "crlf.txt", ns=(1, 1))  # то же содержимое — пропускается
+    os.utime(project / "pkg" / "data.bin", ns=(1, 1))
+    expected = (
+        ">>> FILES >>>\n"
+        "main.py\n---\nprint('пока')\n\n"
+        f"{os.path.join('pkg', 'new.py')}\n---\nnew = 1\n\n"
+        ">>> DELETED >>>\n"
+        f"{os.path.join('pkg', 'deep', 'notes.txt')}\n"
+        f"{os.path.join('pkg', 'icon.bin')}\n"
+    ).encode("utf-8")
+    _dump(monkeypatch, config_path, output, "--delta")
+    assert delta_path.read_bytes() == expected
+
+    # Дельта не трогает базовый дамп и индекс: повтор даёт то же самое
+    assert output.read_bytes() == dump
+    assert (tmp_path / "out" / ("dump.txt" + dumper.INDEX_SUFFIX)).read_bytes() == index
+    _dump(monkeypatch, config_path, output, "--delta")
+    assert delta_path.read_bytes() == expected
@@ -0,0 +1,146 @@
+"""
+Тест многоботового хоста (navigation.hosting).
+
+Проверяет:
+- Одинаковые манифесты по разным путям дают один скомпилированный манифест,
+  кэш view и анализ контекста; разные — разные.
+- Сессии и метрики у каждого бота свои, клиент API и пул соединений общие.
+- BotInstance.run: движок работает вне event loop, пользователи —
+  параллельно, вызовы одного пользователя — по очереди.
+- Перезагрузку манифеста одного бота без влияния на остальных; «Назад»
+  после перезагрузки посреди сессии возвращает на тот же экран.
+"""
+import asyncio
+import json
+import shutil
+import time
+
+from navigation.hosting import ApiClientPool, BotHost
+
+
+def _copy_manifest(tmp_path, name, patch=None):
+    path = tmp_path / f"{name}.json"
+    if patch is None:
+        shutil.copy("menu-manifest.json", path)
+    else:
+        with open("menu-manifest.json", "r", encoding="utf-8") as f:
+            data = json.load(f)
+        patch(data)
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def _retitle(data):
+    data["screens"]["main"]["title"] = "Школа №2"
+
+
+def test_identical_manifests_are_shared(tmp_path):
+    host = BotHost(log_file=str(tmp_path / "nav.log"))
+    first = host.add("school1", _copy_manifest(tmp_path, "a"))
+    second = host.add("school2", _copy_manifest(tmp_path, "b"))
+    third = host.add("school3", _copy_manifest(tmp_path, "c", _retitle))
+
+    assert first.engine.manifest is second.engine.manifest
+    assert first.engine.view_cache is second.engine.view_cache
+    assert first.engine._context_keys is second.engine._context_keys
+    assert third.engine.manifest is not first.engine.manifest
+    # Подписи кнопок интернированы: одинаковые строки — один объект
+    label = first.engine.manifest.defaults["back_button_label"]
+    assert label is third.engine.manifest.defaults["back_button_label"]
+    assert host.stats() == {"bots": 3, "manifests": 2, "api_clients": 1, "connection_pools": 0}
+
+    assert first.engine.get_current_view("42")["text"] != third.engine.get_current_view("42")["text"]
+    host.close()
+    assert len(host.registry) == 0
+
+
+def test_sessions_and_metrics_are_per_bot(tmp_path):
+    clients = ApiClientPool()
+    host = BotHost(clients=clients, log_file=str(tmp_path / "nav.log"))
+    one = host.add("one", "menu-manifest.json", api_base_url="http://api.example:8080/v1", api_token="t1")
+    two = host.add("two", "menu-manifest.json", api_base_url="http://api.example:8080/v2", api_token="t2")
+    assert one.engine.api_client.client is not two.engine.api_client.client
+    assert one.engine.api_client.client.pool is two.engine.api_client.client.pool  # общий хост — общий пул
+    assert clients.stats() == {"api_clients": 2, "connection_pools": 1}
+
+    stub = host.add("stub", "menu-manifest.json")
+    stub.engine.init_user("42")
+    stub.engine.handle_action("42", {"type": "navigate", "target": "quick_grade", "label": "Поставить отметки"})
+    stub.engine.get_current_view("42")
+    assert "42" not in one.engine.sessions
+    assert one.engine.get_current_view("42")["text"] != stub.engine.get_current_view("42")["text"]
+
+    metrics = host.metrics()
+    assert metrics["stub"]["events"]["api.call"]["count"] >= 1
+    assert metrics["one"]["events"] == {} and metrics["one"]["sessions"] == 1
+    host.close()
+
+
+def test_reload_switches_only_one_bot(tmp_path):
+    host = BotHost(log_file=str(tmp_path / "nav.log"))
+    path_a = _copy_manifest(tmp_path, "a")
+    first = host.add("school1", path_a)
+    second = host.add("school2", _copy_manifest(tmp_path, "b"))
+    assert not host.reload("school1")
+
+    _copy_manifest(tmp_path, "a", _retitle)
+    assert host.reload("school1")
+    assert first.engine.manifest is not second.engine.manifest
+    assert first.engine.get_current_view("1")["text"].startswith("Школа №2")
+    assert not second.engine.get_current_view("1")["text"].startswith("Школа №2")
+    assert host.stats()["manifests"] == 2
+    host.close()
+
+
+def test_back_after_reload_mid_session(tmp_path):
+    host = BotHost(log_file=str(tmp_path / "nav.log"))
+    path = _copy_manifest(tmp_path, "a")
+    engine = host.add("school1", path).engine
+    host.add("school2", _copy_manifest(tmp_path, "b", _retitle)).engine.get_current_view("7")
+    engine.handle_action("1", {"type": "navigate", "target": "quick_grade", "label": "Поставить отметки"})
+    engine.handle_action("1", {"type": "navigate", "target": "select_metric", "label": "Петров",
+                               "context": {"student_id": "petrov", "student_name": "Петров Пётр"}})
+
+    # Новое содержимое совпадает с манифестом другого бота, уже числившего экраны
+    _copy_manifest(tmp_path, "a", _retitle)
+    assert host.reload("school1")
+    engine.handle_action("1", {"type": "back", "label": "Назад"})
+    assert engine.get_user_state("1")["current_screen"] == "quick_grade"
+    engine.handle_action("1", {"type": "back", "label": "Назад"})
+    assert engine.get_current_view("1")["text"].startswith("Школа №2")
+    host.close()
+
+
+def test_run_keeps_event_loop_free(tmp_path):
+    host = BotHost(log_file=str(tmp_path / "nav.log"))
+    instance = host.add("school1", _copy_manifest(tmp_path, "a"))
+    order = []
+
+    def slow_view(user_id):
+        time.sleep(0.2)  # как запрос к API с таймаутом
+        order.append(user_id)
+        return instance.engine.get_current_view(user_id)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        started = time.monotonic()
+        views = await asyncio.gather(instance.run("1", slow_view, "1"), instance.run("2", slow_view, "2"),
+                                     instance.run("1", slow_view, "1"))
+        elapsed = time.monotonic() - started
+        task.cancel()
+        return views, elapsed, ticks
+
+    views, elapsed, ticks = asyncio.run(scenario())
+    assert all(view["text"] for view in views)
+    assert 0.4 <= elapsed < 0.55  # «2» параллельно с «1», вызовы «1» — друг за другом
+    assert ticks >= 20  # event loop всё это время был свободен
+    assert order.count("1") == 2 and not instance.engine.sessions._held
+    host.close()
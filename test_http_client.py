@@ -0,0 +1,173 @@
+"""
+Тест HttpApiClient против локального HTTP-сервера.
+
+Проверяет:
+- Переиспользование keep-alive соединений.
+- Передачу base_url и заголовков авторизации.
+- Повторы при 5xx; POST без idempotent=True не повторяется.
+- POST по keep-alive соединению, закрытому бэкендом за время простоя,
+  уходит по новому соединению ровно один раз.
+- Circuit breaker: быстрый ответ из кэша, когда бэкенд лежит; кэш
+  различает query-параметры.
+- Таймауты по источникам данных; таймаут попытки не выходит за deadline.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from navigation.http_client import CircuitBreaker, HttpApiClient
+
+
+class _FakeBackend(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.ports.add(self.client_address[1])
+        server.paths.append(self.path)
+        server.auth.append(self.headers.get("Authorization"))
+        if self.path.endswith("/slow"):
+            time.sleep(0.5)
+        if server.fail_next > 0:
+            server.fail_next -= 1
+            self._send(500, {"error": "boom"})
+            return
+        self._send(200, [{"id": "creative", "name": "Креативность"}])
+        # Закрыть соединение после ответа, не предупредив клиента (Connection: close)
+        self.close_connection = server.drop_idle
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.do_GET()
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # клиент ушёл по таймауту — это ожидаемо
+
+
+def _start_backend():
+    server = _QuietServer(("127.0.0.1", 0), _FakeBackend)
+    server.ports, server.paths, server.auth, server.fail_next, server.drop_idle = set(), [], [], 0, False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _client(server, **kwargs):
+    host, port = server.server_address
+    return HttpApiClient(f"http://{host}:{port}/v1", headers={"Authorization": "Bearer t"}, backoff=0.01, **kwargs)
+
+
+def test_keep_alive_and_headers():
+    server = _start_backend()
+    client = _client(server)
+    try:
+        for _ in range(5):
+            assert client.call("/api/metrics", "GET")[0]["id"] == "creative"
+        assert len(server.ports) == 1  # одно TCP-соединение на все вызовы
+        assert server.paths[0] == "/v1/api/metrics"
+        assert server.auth == ["Bearer t"] * 5
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_retry_on_server_error():
+    server = _start_backend()
+    client = _client(server, retries=2)
+    try:
+        server.fail_next = 2
+        assert client.call("/api/metrics", "GET") == [{"id": "creative", "name": "Креативность"}]
+        assert len(server.paths) == 3
+        assert client.breaker.state == CircuitBreaker.CLOSED
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_post_not_retried_unless_idempotent():
+    server = _start_backend()
+    client = _client(server, retries=2)
+    try:
+        server.fail_next = 1
+        assert client.call("/api/marks", "POST", json={"mark": 5}) == []
+        assert len(server.paths) == 1  # повтор мог бы записать оценку второй раз
+        server.fail_next = 1
+        assert client.call("/api/marks", "POST", json={"mark": 5}, idempotent=True)[0]["id"] == "creative"
+        assert len(server.paths) == 3
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_post_on_stale_connection_is_sent_once():
+    server = _start_backend()
+    client = _client(server, retries=2)
+    try:
+        server.drop_idle = True
+        for mark in range(3):
+            time.sleep(0.05)  # бэкенд успевает закрыть соединение, лежащее в пуле
+            assert client.call("/api/marks", "POST", json={"mark": mark})[0]["id"] == "creative"
+        assert len(server.paths) == 3 and len(server.ports) == 3
+        assert client.breaker.state == CircuitBreaker.CLOSED
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_circuit_breaker_serves_cache():
+    server = _start_backend()
+    client = _client(server, retries=0, failure_threshold=2, reset_timeout=60)
+    try:
+        cached = client.call("/api/metrics", "GET")
+        server.fail_next = 100
+        assert client.call("/api/metrics", "GET") == cached
+        assert client.call("/api/metrics", "GET") == cached
+        assert client.breaker.state == CircuitBreaker.OPEN
+        calls_before = len(server.paths)
+        # Бэкенд больше не дёргаем: кэш для известного URL, [] для нового
+        assert client.call("/api/metrics", "GET") == cached
+        assert client.call("/api/teacher/tracks", "GET") == []
+        assert client.call("/api/metrics", "GET", params={"track": "7"}) == []
+        assert len(server.paths) == calls_before
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_per_source_timeout():
+    server = _start_backend()
+    client = _client(server, retries=0, source_timeouts={"/api/slow": 0.1})
+    try:
+        started = time.monotonic()
+        assert client.call("/api/slow", "GET") == []
+        assert time.monotonic() - started < 0.4
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_deadline_clamps_attempt_timeout():
+    server = _start_backend()
+    client = _client(server, retries=2, timeout=5)
+    try:
+        started = time.monotonic()
+        assert client.call("/api/slow", "GET", deadline=started + 0.1) == []
+        assert time.monotonic() - started < 0.4
+        assert client.call("/api/metrics", "GET", deadline=time.monotonic() - 1) == []  # уже поздно
+        assert server.paths == ["/v1/api/slow"]
+    finally:
+        client.close()
+        server.shutdown()
@@ -0,0 +1,98 @@
+"""
+Тест бюджетов задержки экранов (latency_budget_ms).
+
+Проверяет:
+- Медленный источник без кэша: сразу отдаётся view «загрузка», а когда
+  запрос завершается, слушатель готовности получает пользователя.
+- Медленный источник с прошлым ответом: отдаются устаревшие данные с пометкой stale.
+- Подсчёт нарушений бюджета по источнику данных и передачу deadline в api_client.
+- Упавший фоновый запрос не оставляет ожидающих и готовых пользователей.
+"""
+import threading
+import time
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+
+
+class _SlowAPI(APISimulator):
+    def __init__(self):
+        self.delay = 0.0
+        self.fail = False
+        self.deadlines = []
+
+    def call(self, url, method="GET", **kwargs):
+        self.deadlines.append(kwargs.get("deadline"))
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("источник недоступен")
+        return super().call(url, method, **kwargs)
+
+
+def _engine():
+    api = _SlowAPI()
+    engine = NavigationEngine("menu-manifest.json", logger=NavigationLogger("BudgetTest"), api_client=api)
+    engine.manifest.screens["select_metric"]["latency_budget_ms"] = 50
+    engine.handle_action("u1", {"type": "navigate", "target": "select_metric", "label": "Метрики", "context": {"student_name": "Иванов"}})
+    return engine, api
+
+
+def test_loading_view_then_ready():
+    engine, api = _engine()
+    ready = threading.Event()
+    engine.add_ready_listener(lambda user_id, request: user_id == "u1" and ready.set())
+    api.delay = 0.3
+
+    started = time.monotonic()
+    view = engine.get_current_view("u1")
+    assert time.monotonic() - started < 0.2
+    assert view.get("loading") and view["actions"][-1]["type"] == "back"
+    assert engine.budget_violations["/api/metrics"] == 1
+    assert api.deadlines[0] is not None
+
+    assert ready.wait(2)
+    view = engine.get_current_view("u1")  # результат фонового запроса, без нового ожидания
+    assert not view.get("loading") and not view.get("stale")
+    assert len(view["actions"]) > 1
+    assert len(api.deadlines) == 1
+
+
+def test_stale_items_on_violation():
+    engine, api = _engine()
+    fresh = engine.get_current_view("u1")
+    assert not fresh.get("stale") and engine.budget_violations["/api/metrics"] == 0
+
+    api.delay = 0.3
+    view = engine.get_current_view("u1")
+    assert view["stale"] is True
+    assert view["actions"] == fresh["actions"]
+    assert engine.budget_violations["/api/metrics"] == 1
+
+
+def test_failed_fetch_leaves_no_waiters():
+    engine, api = _engine()
+    api.delay, api.fail = 0.2, True
+    notified = []
+    engine.add_ready_listener(lambda user_id, request: notified.append(user_id))
+
+    assert engine.get_current_view("u1").get("loading")
+    engine.handle_action("u2", {"type": "navigate", "target": "select_metric", "label": "Метрики",
+                                "context": {"student_name": "Иванов"}})
+    assert engine.get_current_view("u2").get("loading")  # ждёт тот же запрос
+    assert engine._waiting_users
+    deadline = time.monotonic() + 2
+    while engine._pending_fetches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not engine._pending_fetches and not engine._waiting_users and not engine._ready_users
+    assert notified == []
+
+    # Успешный повтор: готовность снимается, когда пользователь увидел результат
+    api.fail = False
+    assert engine.get_current_view("u1").get("loading")
+    deadline = time.monotonic() + 2
+    while "u1" not in notified and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert engine._ready_users
+    assert not engine.get_current_view("u1").get("loading")
+    assert not engine._ready_users
@@ -0,0 +1,85 @@
+"""
+Тест загрузчика манифеста.
+
+Проверяет:
+- Создание и переиспользование скомпилированного кэша.
+- Инвалидацию кэша при изменении манифеста.
+- Валидацию экранов.
+- Разбитый манифест: ленивое чтение экранов; живые ключи контекста
+  берутся из индекса и кэша, первый переход не читает все экраны.
+"""
+import json
+import os
+import shutil
+
+import pytest
+
+from navigation.manifest import ManifestLoader
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _copy_manifest(tmp_path):
+    path = tmp_path / "menu-manifest.json"
+    shutil.copy(os.path.join(HERE, "menu-manifest.json"), path)
+    return str(path)
+
+
+def test_compiled_cache_roundtrip(tmp_path):
+    path = _copy_manifest(tmp_path)
+    first = ManifestLoader(path)
+    assert os.path.exists(first.cache_path)
+    assert first.screens["alphabet"]["id"] == "alphabet"
+
+    second = ManifestLoader(path)
+    assert second.version == first.version
+    assert second.data == first.data
+
+
+def test_cache_invalidated_on_change(tmp_path):
+    path = _copy_manifest(tmp_path)
+    old = ManifestLoader(path)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    data["screens"]["main"]["title"] = "Новый заголовок"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+    new = ManifestLoader(path)
+    assert new.version != old.version
+    assert new.screens["main"]["title"] == "Новый заголовок"
+
+
+def test_invalid_screen_rejected(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text(json.dumps({"screens": {"main": {"title": "x", "type": "dynamic"}}}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        ManifestLoader(str(path))
+
+
+def test_split_manifest_loads_lazily(tmp_path):
+    from navigation.engine import NavigationEngine
+    from navigation.manifest import LazyScreens, split_manifest
+
+    out_dir = str(tmp_path / "manifest.d")
+    split_manifest(os.path.join(HERE, "menu-manifest.json"), out_dir, screens_per_file=4)
+    loader = ManifestLoader(out_dir, screen_cache_size=2)
+    assert isinstance(loader.screens, LazyScreens)
+    assert "confirm_mark" in loader.screens
+    assert len(loader.screens._cache) == 0  # проверка наличия не читает файлы
+    for screen_id in loader.screens:
+        assert loader.screens[screen_id]["id"] == screen_id
+    assert len(loader.screens._cache) == 2
+
+    from navigation.context_analysis import analyze_context
+    with open(os.path.join(HERE, "menu-manifest.json"), encoding="utf-8") as f:
+        expected = analyze_context(json.load(f)["screens"])
+    assert ManifestLoader(out_dir).context_keys() == expected
+    assert ManifestLoader(_copy_manifest(tmp_path)).context_keys() == expected
+    assert ManifestLoader(_copy_manifest(tmp_path))._context_keys == expected  # из кэша
+
+    engine = NavigationEngine(manifest_path=out_dir)
+    view = engine.get_current_view("u1")
+    engine.handle_action("u1", next(a for a in view["actions"] if a["label"] == "Мои треки"))
+    assert engine.get_current_view("u1")["text"] == "Ваши курсы (треки)"
+    assert len(engine.manifest.screens._cache) <= 3  # только показанные экраны
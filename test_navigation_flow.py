@@ -308,6 +308,53 @@ def test_selection_history():
     print("  OK: История выборов с multi_select: false работает корректно.")
 
 
+def test_context_pruning():
+    """Тест: Ключи контекста, на которые уже нельзя сослаться, удаляются."""
+    print("--- Тест: Очистка контекста ---")
+    engine = NavigationEngine(manifest_path="menu-manifest.json", api_client=APISimulator())
+    user_id = "test_user_6"
+    engine.init_user(user_id)
+
+    # main -> tracks -> track_detail: контекст трека нужен
+    engine.handle_action(user_id, {"type": "navigate", "target": "tracks", "label": "Мои треки"})
+    view = engine.get_current_view(user_id)
+    engine.handle_action(user_id, view["actions"][0])
+    context = engine.get_user_state(user_id)["context"]
+    assert "track_id" in context and "track_name" in context
+
+    # Назад до main: track_* больше нигде не используются
+    engine.handle_action(user_id, {"type": "back", "label": "< Назад"})
+    engine.handle_action(user_id, {"type": "back", "label": "< Назад"})
+    assert engine.get_user_state(user_id)["current_screen"] == "main"
+    assert engine.get_user_state(user_id)["context"] == {"user_id": user_id}
+    print("  OK: Устаревший контекст удаляется.")
+
+
+def test_return_stack_collapses_cycles():
+    """Тест: Цикл select_metric <-> confirm_mark не растит стек возврата."""
+    print("--- Тест: Схлопывание циклов в return_stack ---")
+    engine = NavigationEngine(manifest_path="menu-manifest.json", api_client=APISimulator())
+    user_id = "test_user_7"
+    engine.init_user(user_id)
+
+    engine.handle_action(user_id, {"type": "navigate", "target": "quick_grade", "label": "Поставить отметки"})
+    engine.handle_action(user_id, engine.get_current_view(user_id)["actions"][0])  # -> select_metric
+    for _ in range(50):
+        engine.handle_action(user_id, engine.get_current_view(user_id)["actions"][0])  # -> confirm_mark
+        action_no = next(a for a in engine.get_current_view(user_id)["actions"] if a.get("label") == "Нет")
+        engine.handle_action(user_id, action_no)  # -> select_metric
+    assert len(engine.get_user_state(user_id)["return_stack"]) == 2  # quick_grade, confirm_mark
+
+    # Назад: confirm_mark -> select_metric (back_path) -> quick_grade
+    back = {"type": "back", "label": "< Назад"}
+    engine.handle_action(user_id, back)
+    assert engine.get_user_state(user_id)["current_screen"] == "confirm_mark"
+    engine.handle_action(user_id, back)
+    engine.handle_action(user_id, back)
+    assert engine.get_user_state(user_id)["current_screen"] == "quick_grade"
+    print("  OK: Стек возврата ограничен и не растёт в циклах.")
+
+
 def run_all_tests():
     """Запуск всех тестов."""
     print("Запуск изощрённого теста навигации...\n")
@@ -341,6 +388,18 @@ def run_all_tests():
         print(f"  FAIL: test_error_screen: {e}")
         import traceback
         traceback.print_exc()
+    try:
+        test_context_pruning()
+    except Exception as e:
+        print(f"  FAIL: test_context_pruning: {e}")
+        import traceback
+        traceback.print_exc()
+    try:
+        test_return_stack_collapses_cycles()
+    except Exception as e:
+        print(f"  FAIL: test_return_stack_collapses_cycles: {e}")
+        import traceback
+        traceback.print_exc()
 
     print("\n--- Все тесты завершены. ---")
 
@@ -0,0 +1,141 @@
+"""
+Тест prefork-воркеров NavigationEngine.
+
+Проверяет:
+- Стабильное разбиение пользователей по воркерам.
+- Что состояние пользователя живёт в своём воркере (родитель его не видит).
+- Прогрев общих кэшей до fork и отчёт о памяти воркеров (USS из smaps_rollup).
+- Прогрев со снимком не запускает потоки пула запросов.
+- Воркер не наследует keep-alive соединения клиента API и буфер трасс.
+- Запуск через serve_lines: вызовы движка JSON-строками.
+"""
+import io
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from navigation.engine import NavigationEngine
+from navigation.http_client import HttpApiClient
+from navigation.logger import NavigationLogger
+from navigation.prefork import PreforkPool, serve_lines, user_partition, warm_engine
+from navigation.tracing import JsonLinesExporter, Tracer
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="нужен os.fork")
+
+
+def _engine():
+    return NavigationEngine("menu-manifest.json", logger=NavigationLogger("PreforkTest"))
+
+
+def test_partition_is_stable():
+    assert [user_partition(f"u{i}", 4) for i in range(20)] == [user_partition(f"u{i}", 4) for i in range(20)]
+    assert len({user_partition(f"u{i}", 4) for i in range(100)}) == 4
+
+
+def test_warm_engine_caches_shared_sources():
+    engine = _engine()
+    stats = warm_engine(engine)
+    assert ("/api/students", "GET") in engine.data_cache
+    assert ("/api/students", "GET", "full_name") in engine.search_indexes
+    assert stats["screens"] == len(engine.manifest.screens)
+    assert engine._fetch_executor is None
+
+
+def test_warm_from_snapshot_starts_no_threads(tmp_path):
+    path = str(tmp_path / "engine.snapshot")
+    engine = _engine()
+    warm_engine(engine)
+    engine.save_snapshot(path)
+
+    engine = _engine()
+    assert engine.load_snapshot(path)
+    warm_engine(engine)
+    assert engine.data_cache.warm(("/api/students", "GET")) is not None  # из снимка, не перепроверен
+    assert engine._fetch_executor is None and not engine._pending_fetches
+
+
+class _Backend(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # Клиентский порт — какое соединение пришло с запросом
+        raw = json.dumps([{"id": "1", "name": "x", "full_name": "x", "port": self.client_address[1]}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_worker_does_not_inherit_connections(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Backend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    client = HttpApiClient(f"http://{host}:{port}", retries=0)
+    tracer = Tracer(JsonLinesExporter(str(tmp_path / "traces.jsonl")))
+    engine = NavigationEngine("menu-manifest.json", logger=NavigationLogger("PreforkTest"),
+                              api_client=client, tracer=tracer)
+    try:
+        warm_engine(engine)
+        parent_port = client.call("/api/ping")[0]["port"]
+        assert not client.pool._idle.empty()  # прогрев оставил keep-alive соединение
+        with tracer.span("до fork"):
+            pass
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                engine._after_fork()
+                ok = (client.pool._idle.empty() and not tracer.exporter._buffer
+                      and client.call("/api/ping")[0]["port"] != parent_port)
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+        # Соединение родителя воркер не закрыл и не использовал
+        assert client.call("/api/ping")[0]["port"] == parent_port
+        assert tracer.exporter._buffer  # буфер остался родителю
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_serve_lines():
+    requests = io.StringIO("\n".join(json.dumps(r, ensure_ascii=False) for r in [
+        {"user_id": "u1", "method": "handle_action", "args": [{"type": "navigate", "target": "tracks", "label": "Мои треки"}]},
+        {"user_id": "u1", "method": "get_current_view"},
+        {"user_id": "u1", "method": "reload_manifest"},
+    ]) + "\n")
+    responses = io.StringIO()
+    with PreforkPool(_engine(), workers=2) as pool:
+        serve_lines(pool, requests, responses)
+    handled, view, refused = [json.loads(line) for line in responses.getvalue().splitlines()]
+    assert handled["ok"] and view["ok"] and not refused["ok"]
+    assert view["result"]["text"] == "Ваши курсы (треки)"
+    assert all(isinstance(action["label"], str) for action in view["result"]["actions"])
+
+
+def test_workers_own_user_partitions():
+    engine = _engine()
+    with PreforkPool(engine, workers=2) as pool:
+        users = [f"u{i}" for i in range(6)]
+        for user_id in users:
+            pool.call(user_id, "handle_action", {"type": "navigate", "target": "tracks", "label": "Мои треки"})
+        for user_id in users:
+            assert pool.call(user_id, "get_current_view")["text"] == "Ваши курсы (треки)"
+        assert len({pool.worker_pid(user_id) for user_id in users}) == 2
+        assert "u0" not in engine.sessions  # состояние осталось в воркере
+
+        with pytest.raises(RuntimeError):
+            pool.call("u0", "reload_manifest")
+
+        if os.path.exists(f"/proc/{os.getpid()}/smaps_rollup"):
+            memory = pool.memory()
+            assert len(memory) == 2
+            assert all(m["uss_kb"] > 0 and m["rss_kb"] >= m["uss_kb"] for m in memory.values())
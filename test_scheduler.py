@@ -0,0 +1,132 @@
+"""
+Тест планировщика напоминаний.
+
+Проверяет:
+- Иерархическое колесо: срабатывание не раньше срока и не позже тика, на всех уровнях.
+- Отмену за O(1) и журнал с восстановлением после перезапуска.
+- Уплотнение журнала на ходу, когда записей вдвое больше ожидающих.
+- Token bucket исходящей очереди.
+- Доставку: напоминание открывает экран встречи с контекстом через движок.
+- Индекс (пользователь, встреча): повторное планирование пропускается,
+  после отмены или срабатывания встреча планируется снова.
+"""
+import asyncio
+import random
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+from navigation.scheduler import (
+    RateLimitedSender, Reminder, ReminderScheduler, TimerWheel, TokenBucket, schedule_meeting_reminders
+)
+
+
+def test_wheel_fires_on_time_across_levels():
+    rng = random.Random(7)
+    wheel = TimerWheel(tick=1.0, start=1000.0)
+    dues = {i: 1000.0 + rng.uniform(0.5, 300_000) for i in range(2000)}
+    for reminder_id, due in dues.items():
+        wheel.add(Reminder(reminder_id, due, "u", "main"))
+    cancelled = set(range(0, 2000, 10))
+    for reminder_id in cancelled:
+        assert wheel.cancel(reminder_id) is not None
+    assert wheel.cancel(0) is None
+
+    now, fired = 1000.0, {}
+    while now < 1000.0 + 300_002:
+        previous, now = now, now + rng.uniform(1, 5000)
+        for reminder in wheel.advance(now):
+            assert previous < reminder.due + 1 and reminder.due <= now  # не раньше срока и в своём тике
+            fired[reminder.id] = reminder
+    assert set(fired) == set(dues) - cancelled
+    assert len(wheel) == 0
+
+
+def test_journal_survives_restart(tmp_path):
+    path = str(tmp_path / "reminders.jsonl")
+    engine = NavigationEngine("menu-manifest.json", logger=NavigationLogger("SchedulerTest"), api_client=APISimulator())
+    scheduler = ReminderScheduler(engine, path, start=0.0)
+    first, second, third = scheduler.schedule_many([("u1", 10.0, "main"), ("u2", 20.0, "main"), ("u3", 30.0, "main")])
+    assert scheduler.cancel(second)
+    assert [r.id for r in scheduler.due(15.0)] == [first]
+
+    restored = ReminderScheduler(engine, path, start=15.0)
+    assert [r.id for r in restored.wheel.pending()] == [third]
+    assert restored.schedule("u4", 40.0, "main") == third + 1
+    # Просроченное за время простоя срабатывает сразу
+    late = ReminderScheduler(engine, path, start=100.0)
+    assert {r.id for r in late.due(100.0)} == {third, third + 1}
+
+
+def test_journal_compacts_while_running(tmp_path):
+    path = tmp_path / "reminders.jsonl"
+    engine = NavigationEngine("menu-manifest.json", logger=NavigationLogger("SchedulerTest"), api_client=APISimulator())
+    scheduler = ReminderScheduler(engine, str(path), start=0.0, compact_min=20)
+    kept = scheduler.schedule("u0", 1_000_000.0, "main")
+    for i in range(1, 500):
+        scheduler.schedule(f"u{i}", 10.0 + i, "main")
+        if i % 2:
+            scheduler.cancel(i + 1)
+        scheduler.due(10.0 + i)
+        # Журнал не растёт без предела: не больше max(compact_min, 2 * ожидающих)
+        assert scheduler.journal.records <= max(20, 2 * len(scheduler.wheel))
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == scheduler.journal.records < 20
+    assert [r.id for r in ReminderScheduler(engine, str(path), start=600.0).wheel.pending()] == [kept]
+
+
+def test_token_bucket():
+    now = [0.0]
+    bucket = TokenBucket(rate=10, burst=2, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.1, 0.2]
+    now[0] = 1.0
+    assert bucket.reserve() == 0.0
+
+
+def test_reminder_deep_links_into_meeting():
+    engine = NavigationEngine("menu-manifest.json", logger=NavigationLogger("SchedulerTest"), api_client=APISimulator())
+    scheduler = ReminderScheduler(engine, start=0.0)
+    meetings = APISimulator().call("/api/teacher/meetings")
+    ids = schedule_meeting_reminders(scheduler, "u1", meetings[:1], lead=900)
+    assert len(ids) == 1
+
+    sent = []
+
+    async def send(user_id, view):
+        sent.append((user_id, view))
+
+    async def deliver():
+        sender = RateLimitedSender(send, rate=1000, burst=10)
+        worker = asyncio.create_task(sender.run())
+        reminders = scheduler.due(4_000_000_000.0)
+        assert scheduler.deliver(reminders, sender) == 1
+        await sender.queue.join()
+        worker.cancel()
+
+    asyncio.run(deliver())
+    user_id, view = sent[0]
+    assert user_id == "u1"
+    assert view["text"].startswith("Скоро встреча: Защита проектов")
+    assert "Встреча «Защита проектов» в 10:00" in view["text"]
+    assert engine.get_user_state("u1")["current_screen"] == "meeting_detail"
+    engine.handle_action("u1", {"type": "back", "label": "< Назад"})
+    assert engine.get_user_state("u1")["current_screen"] == "main"
+
+
+def test_meeting_index_skips_already_scheduled(tmp_path):
+    engine = NavigationEngine("menu-manifest.json", logger=NavigationLogger("SchedulerTest"), api_client=APISimulator())
+    path = str(tmp_path / "reminders.jsonl")
+    scheduler = ReminderScheduler(engine, path, start=0.0)
+    meetings = APISimulator().call("/api/teacher/meetings")
+    first = schedule_meeting_reminders(scheduler, "u1", meetings)
+    assert len(first) == len(meetings)
+    assert schedule_meeting_reminders(scheduler, "u1", meetings) == []
+    assert len(schedule_meeting_reminders(scheduler, "u2", meetings)) == len(meetings)
+    # Индекс восстанавливается из журнала
+    restored = ReminderScheduler(engine, path, start=0.0)
+    assert schedule_meeting_reminders(restored, "u1", meetings) == []
+    assert restored.cancel(first[0])
+    assert restored.meeting_reminder("u1", meetings[0]["id"]) is None
+    assert len(schedule_meeting_reminders(restored, "u1", meetings)) == 1
+    restored.due(4_000_000_000.0)
+    assert all(restored.meeting_reminder("u1", m["id"]) is None for m in meetings)
@@ -0,0 +1,144 @@
+"""
+Тест поискового индекса и экранов поиска студентов.
+
+Проверяет:
+- Поиск по префиксу, первой букве и подстроке.
+- Инкрементальное обновление индекса.
+- Элементы без id и поля пропускаются, id разных типов (int/str) не ломают
+  список префиксов.
+- Обновление из другого потока: запросы видят либо старое, либо новое
+  состояние целиком.
+- Экран букв: выбор буквы фильтрует студентов.
+- Экран поиска: текстовый запрос фильтрует студентов.
+- Лимит кэша источников: вытесненный ответ уносит свой поисковый индекс.
+"""
+import threading
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.search import SearchIndex
+
+STUDENTS = [
+    {"id": "ivanov", "full_name": "Иванов Иван"},
+    {"id": "petrov", "full_name": "Петров Пётр"},
+    {"id": "sidorov", "full_name": "Сидоров Сидор"},
+]
+
+
+def _names(items):
+    return [item["full_name"] for item in items]
+
+
+def test_index_queries():
+    index = SearchIndex("full_name")
+    index.update(STUDENTS)
+    assert _names(index.prefix("и", first_word_only=True)) == ["Иванов Иван"]
+    assert _names(index.prefix("п")) == ["Петров Пётр"]
+    assert _names(index.prefix("пет")) == ["Петров Пётр"]
+    assert _names(index.search("дор")) == ["Сидоров Сидор"]
+    assert _names(index.search("ов")) == []  # короткий запрос — только префиксы слов
+    assert _names(index.search("ров")) == ["Петров Пётр", "Сидоров Сидор"]
+    assert _names(index.search("петр")) == ["Петров Пётр"]  # ё == е
+
+
+def test_index_incremental_update():
+    index = SearchIndex("full_name")
+    index.update(STUDENTS)
+    index.update(STUDENTS[1:] + [{"id": "abramov", "full_name": "Абрамов Антон"}])
+    assert len(index) == 3
+    assert index.search("иван") == []
+    assert _names(index.prefix("а", first_word_only=True)) == ["Абрамов Антон"]
+
+
+def test_index_mixed_and_missing_ids():
+    index = SearchIndex("full_name")
+    # Одно слово у элементов с id int, str и из поля: раньше insort сравнивал int со str
+    index.update([
+        {"id": 7, "full_name": "Иванов Иван"},
+        {"id": "ivanova", "full_name": "Иванова Анна"},
+        {"full_name": "Иванов Пётр"},
+        {"title": "без id и имени"},
+    ])
+    assert len(index) == 3
+    assert _names(index.prefix("иван")) == ["Иванов Иван", "Иванов Пётр", "Иванова Анна"]
+    index.update([{"id": 7, "full_name": "Иванов Иван"}, {"id": 8}])
+    assert _names(index.search("иван")) == ["Иванов Иван"] and len(index) == 2
+    restored = SearchIndex.restore(index.export_state(), [{"id": 7, "full_name": "Иванов Иван"}, {"id": 8}])
+    assert _names(restored.prefix("и")) == ["Иванов Иван"]
+
+
+def test_concurrent_update_and_queries():
+    old = [{"id": i, "full_name": f"Петров {i}"} for i in range(300)]
+    new = [{"id": i, "full_name": f"Сидоров {i}"} for i in range(150, 450)]
+    index = SearchIndex("full_name")
+    index.update(old)
+    expected = [{item["id"] for item in old}, {item["id"] for item in new}]
+    errors = []
+    stop = threading.Event()
+
+    def query():
+        try:
+            while not stop.is_set():
+                assert {item["id"] for item in index.search("ров")} in expected
+                assert {item["id"] for item in index.all()} in expected
+        except (AssertionError, KeyError, RuntimeError) as e:
+            errors.append(e)
+            stop.set()
+
+    readers = [threading.Thread(target=query) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for _ in range(50):
+        index.update(new)
+        index.update(old)
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert errors == []
+
+
+def test_letter_screen_filters_students():
+    engine = NavigationEngine(manifest_path="menu-manifest.json", api_client=APISimulator())
+    engine.handle_action("u1", {"type": "navigate", "target": "alphabet", "label": "Тест: Алфавит"})
+    view = engine.get_current_view("u1")
+    # «И» — девятая буква, на второй странице
+    engine.handle_action("u1", next(a for a in view["actions"] if a["type"] == "paginate"))
+    view = engine.get_current_view("u1")
+    letter = next(a for a in view["actions"] if a["label"] == "И")
+    engine.handle_action("u1", letter)
+
+    view = engine.get_current_view("u1")
+    assert view["text"] == "Студенты на букву «И»"
+    assert [a["label"] for a in view["actions"] if a["type"] == "navigate"] == ["Иванов Иван"]
+
+
+def test_search_screen_uses_text_input():
+    engine = NavigationEngine(manifest_path="menu-manifest.json", api_client=APISimulator())
+    engine.handle_action("u1", {"type": "navigate", "target": "student_search", "label": "Поиск студента"})
+    view = engine.get_current_view("u1")
+    assert view["accepts_input"]
+    assert len([a for a in view["actions"] if a["type"] == "navigate"]) == 3
+
+    engine.handle_user_input("u1", "сидор")
+    view = engine.get_current_view("u1")
+    found = [a for a in view["actions"] if a["type"] == "navigate"]
+    assert [a["label"] for a in found] == ["Сидоров Сидор"]
+    assert found[0]["context"] == {"student_id": "sidorov", "student_name": "Сидоров Сидор"}
+
+
+def test_evicted_source_drops_search_index():
+    engine = NavigationEngine(manifest_path="menu-manifest.json", api_client=APISimulator(), data_cache_size=2)
+    engine.handle_action("u1", {"type": "navigate", "target": "student_search", "label": "Поиск студента"})
+    engine.get_current_view("u1")
+    assert ("/api/students", "GET", "full_name") in engine.search_indexes
+
+    engine.data_cache.put(("/api/tracks/1", "GET"), [])
+    assert engine.data_cache.get(("/api/students", "GET")) is not None  # свежеиспользованный остаётся
+    engine.data_cache.put(("/api/tracks/2", "GET"), [])
+    assert len(engine.data_cache) == 2 and ("/api/tracks/1", "GET") not in engine.data_cache
+    engine.data_cache.put(("/api/tracks/3", "GET"), [])
+    assert ("/api/students", "GET") not in engine.data_cache
+    assert engine.search_indexes == {}
+
+    engine.handle_user_input("u1", "сидор")  # индекс строится заново
+    assert [a["label"] for a in engine.get_current_view("u1")["actions"] if a["type"] == "navigate"] == ["Сидоров Сидор"]
@@ -0,0 +1,83 @@
+"""
+Тест SessionStore и бюджета памяти NavigationEngine.
+
+Проверяет:
+- Учёт размера сессий по полям и отчёт о самых больших.
+- Выгрузку холодных сессий на диск при превышении бюджета.
+- Прозрачную подгрузку выгруженной сессии при следующем действии.
+- Сессия, удерживаемая потоком движка (hold), не выгружается.
+"""
+import os
+
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+from navigation.sessions import SessionStore
+
+
+def _state(user_id, selections=0):
+    return {
+        "current_screen": "main",
+        "context": {"user_id": user_id},
+        "return_stack": [],
+        "pagination": {},
+        "selections": [{"screen": "main", "item": {"target": f"t{i}"}} for i in range(selections)],
+    }
+
+
+def test_report_largest_sessions():
+    store = SessionStore()
+    store["small"] = _state("small")
+    store["big"] = _state("big", selections=50)
+    top = store.report(top=1)[0]
+    assert top["user_id"] == "big"
+    assert next(iter(top["fields"])) == "selections"  # поле, которое раздувает сессию
+    assert top["bytes"] == sum(top["fields"].values())
+
+
+def test_spill_and_fault_in(tmp_path):
+    store = SessionStore(memory_budget=4000, spill_dir=str(tmp_path))
+    for i in range(10):
+        store[f"u{i}"] = _state(f"u{i}", selections=5)
+    store["u9"]  # перемерить последнюю сессию
+    assert store.spills > 0
+    assert store.hot_bytes <= 4000
+    assert len(store) == 10
+    assert len(os.listdir(tmp_path)) == store.spills
+    assert "u0" in store and store.faults == 0  # in не подгружает с диска
+
+    state = store["u0"]
+    assert state == _state("u0", selections=5)
+    assert store.faults == 1
+    assert any(row["spilled"] and row["disk_bytes"] > 0 for row in store.report(top=10))
+
+
+def test_engine_restores_spilled_user(tmp_path):
+    engine = NavigationEngine(
+        "menu-manifest.json",
+        logger=NavigationLogger("SessionsTest"),
+        memory_budget=2000,
+        session_spill_dir=str(tmp_path)
+    )
+    engine.handle_action("u0", {"type": "navigate", "target": "select_metric", "label": "Оценить"})
+    for i in range(1, 20):
+        engine.get_current_view(f"u{i}")
+    assert engine.sessions.spills > 0
+
+    view = engine.get_current_view("u0")
+    assert engine.sessions.faults >= 1
+    assert engine.get_user_state("u0")["current_screen"] == "select_metric"
+    back = next(action for action in view["actions"] if action["type"] == "back")
+    engine.handle_action("u0", back)
+    assert engine.get_user_state("u0")["current_screen"] == "main"
+
+
+def test_held_session_is_not_spilled(tmp_path):
+    store = SessionStore(memory_budget=4000, spill_dir=str(tmp_path))
+    store["u0"] = _state("u0", selections=5)
+    with store.hold("u0"):
+        for i in range(1, 10):
+            store[f"u{i}"] = _state(f"u{i}", selections=5)
+        store["u9"]
+        assert "u0" in store._hot and store.spills > 0
+    store["u9"]
+    assert "u0" in store._spilled  # после hold — обычная холодная сессия
@@ -0,0 +1,96 @@
+"""
+Тест снимка кэшей для быстрого старта (navigation.snapshot).
+
+Проверяет:
+- Новый движок со снимком отдаёт динамические экраны без ожидания API,
+  а перепроверка идёт в фоне одним запросом на источник, сколько бы
+  пользователей ни пришло.
+- Поисковый индекс и view статических экранов восстанавливаются из снимка.
+- Отсутствующий или испорченный снимок не мешает старту.
+"""
+import threading
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+
+
+class GatedAPI(APISimulator):
+    """Заглушка, которая держит каждый запрос до `gate.set()`."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.calls = []
+
+    def call(self, url, method="GET", **kwargs):
+        self.calls.append(url)
+        self.gate.wait(5)
+        return super().call(url, method, **kwargs)
+
+
+def _engine(api_client):
+    return NavigationEngine("menu-manifest.json", logger=NavigationLogger("SnapshotTest"), api_client=api_client)
+
+
+def _warm_snapshot(path):
+    engine = _engine(APISimulator())
+    engine.get_current_view("u1")
+    engine.handle_action("u1", {"type": "navigate", "target": "tracks", "label": "Мои треки"})
+    tracks = engine.get_current_view("u1")
+    engine.handle_action("u2", {"type": "navigate", "target": "student_search", "label": "Поиск студента"})
+    engine.handle_user_input("u2", "сидор")
+    engine.get_current_view("u2")
+    counts = engine.save_snapshot(path)
+    return tracks, counts
+
+
+def test_warm_start_serves_without_backend(tmp_path):
+    path = str(tmp_path / "nav.snapshot")
+    tracks, counts = _warm_snapshot(path)
+    assert counts["source"] == 2 and counts["search"] == 1 and counts["views"] == 1
+
+    api = GatedAPI()
+    engine = _engine(api)
+    assert engine.load_snapshot(path)
+    assert api.calls == []  # при старте ничего не разбирается и не запрашивается
+    for user in range(20):
+        engine.handle_action(str(user), {"type": "navigate", "target": "tracks", "label": "Мои треки"})
+        assert engine.get_current_view(str(user))["actions"] == tracks["actions"]
+    # Источник ещё «висит», а на двадцать пользователей ушёл один фоновый запрос
+    assert api.calls == ["/api/teacher/tracks"]
+    assert engine.data_cache.warm(("/api/teacher/tracks", "GET")) is not None
+
+    revalidation = engine._pending_fetches[("/api/teacher/tracks", "GET")]
+    api.gate.set()
+    revalidation.result(5)
+    assert engine.data_cache.warm(("/api/teacher/tracks", "GET")) is None
+
+
+def test_search_index_and_views_restored(tmp_path):
+    path = str(tmp_path / "nav.snapshot")
+    _warm_snapshot(path)
+    api = GatedAPI()
+    api.gate.set()
+    engine = _engine(api)
+    engine.load_snapshot(path)
+
+    assert len(engine.view_cache) == 1
+    engine.get_current_view("u1")
+    assert engine.view_cache.hits == 1
+
+    engine.handle_action("u3", {"type": "navigate", "target": "student_search", "label": "Поиск студента"})
+    engine.handle_user_input("u3", "петр")
+    view = engine.get_current_view("u3")
+    assert [a["label"] for a in view["actions"] if a["type"] == "navigate"] == ["Петров Пётр"]
+    assert api.calls == []  # ответ в пределах ttl, индекс не перестраивался из API
+    assert ("/api/students", "GET", "full_name") in engine.search_indexes
+
+
+def test_missing_or_broken_snapshot(tmp_path):
+    engine = _engine(APISimulator())
+    assert not engine.load_snapshot(str(tmp_path / "absent.snapshot"))
+    broken = tmp_path / "broken.snapshot"
+    broken.write_bytes(b"NAVSNAP\0garbage")
+    assert not engine.load_snapshot(str(broken))
+    engine.handle_action("u1", {"type": "navigate", "target": "tracks", "label": "Мои треки"})
+    assert engine.get_current_view("u1")["actions"]
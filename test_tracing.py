@@ -0,0 +1,80 @@
+"""
+Тест трассировки NavigationEngine.
+
+Проверяет:
+- Span'ы handle_action / get_current_view / _build_* / api_client.call / logger.write.
+- Проброс trace_id от корневого span'а (как из update_id Telegram) во вложенные.
+- Отключение экспорта при sample_rate=0.
+- Сводку по самым медленным трассам и критический путь.
+"""
+import json
+import time
+
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+from navigation.tracing import JsonLinesExporter, Tracer, summarize
+
+
+class _SlowAPI:
+    def call(self, url, method, **kwargs):
+        time.sleep(0.02)
+        return [{"id": "creative", "name": "Креативность"}]
+
+
+def _engine(tmp_path, sample_rate=1.0):
+    tracer = Tracer(JsonLinesExporter(str(tmp_path / "traces.jsonl")), sample_rate=sample_rate)
+    engine = NavigationEngine(
+        "menu-manifest.json",
+        logger=NavigationLogger("TracingTest"),
+        api_client=_SlowAPI(),
+        tracer=tracer
+    )
+    return engine, tracer
+
+
+def _read_spans(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_spans_share_update_trace_id(tmp_path):
+    engine, tracer = _engine(tmp_path)
+    engine.init_user("u1")
+    with tracer.span("telegram.update", trace_id="tg-100"):
+        engine.handle_action("u1", {"type": "navigate", "target": "select_metric", "label": "Оценить"})
+        engine.get_current_view("u1")
+    tracer.flush()
+
+    spans = _read_spans(tmp_path)
+    names = {span["name"] for span in spans}
+    assert {"telegram.update", "handle_action", "get_current_view", "_build_dynamic_actions", "api_client.call", "logger.write"} <= names
+    update_spans = [span for span in spans if span["trace_id"] == "tg-100"]
+    assert len(update_spans) == len(spans) - 1  # кроме logger.write из init_user вне апдейта
+    by_id = {span["span_id"]: span for span in spans}
+    call = next(span for span in spans if span["name"] == "api_client.call")
+    assert by_id[call["parent_id"]]["name"] == "_build_dynamic_actions"
+    assert call["attrs"]["url"] == "/api/metrics"
+
+
+def test_sampling_disabled(tmp_path):
+    engine, tracer = _engine(tmp_path, sample_rate=0.0)
+    engine.get_current_view("u1")
+    tracer.flush()
+    assert _read_spans(tmp_path) == []
+
+
+def test_summary_critical_path(tmp_path):
+    engine, tracer = _engine(tmp_path)
+    engine.get_current_view("u1")  # main — без API
+    with tracer.span("telegram.update", trace_id="tg-slow"):
+        engine.handle_action("u1", {"type": "navigate", "target": "select_metric", "label": "Оценить"})
+        engine.get_current_view("u1")
+    tracer.flush()
+
+    slowest = summarize(str(tmp_path / "traces.jsonl"), top=1)[0]
+    assert slowest["trace_id"] == "tg-slow"
+    path = [node["name"] for node in slowest["critical_path"]]
+    assert path == ["telegram.update", "get_current_view", "_build_dynamic_actions", "api_client.call"]
+    assert slowest["critical_path"][-1]["self_ms"] >= 15
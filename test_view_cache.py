@@ -0,0 +1,57 @@
+"""
+Тест кэша готовых view.
+
+Проверяет:
+- Повторный рендер статического экрана отдаёт тот же объект.
+- Ключ кэша учитывает только используемые шаблоном значения контекста.
+- View неизменяемы.
+- Сброс кэша при перезагрузке манифеста.
+"""
+import pytest
+
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+
+
+def _engine():
+    return NavigationEngine(manifest_path="menu-manifest.json", api_client=APISimulator())
+
+
+def test_static_view_is_shared():
+    engine = _engine()
+    first = engine.get_current_view("u1")
+    assert engine.get_current_view("u1") is first
+    # Другой пользователь на том же экране получает тот же объект
+    assert engine.get_current_view("u2") is first
+    assert engine.view_cache.hits == 2
+
+
+def test_key_uses_referenced_context_only():
+    engine = _engine()
+    state = engine.get_user_state("u1")
+    state["current_screen"] = "track_detail"
+    state["context"] = state["context"].set_many({"track_id": "game-design", "track_name": "Геймдизайн"})
+    first = engine.get_current_view("u1")
+    assert first["text"] == "Трек: Геймдизайн"
+
+    state["context"] = state["context"].set("student_id", "ivanov")  # шаблоном не используется
+    assert engine.get_current_view("u1") is first
+
+    state["context"] = state["context"].set("track_name", "Архитектура")
+    assert engine.get_current_view("u1")["text"] == "Трек: Архитектура"
+
+
+def test_cached_view_is_immutable():
+    view = _engine().get_current_view("u1")
+    with pytest.raises(TypeError):
+        view["text"] = "x"
+    with pytest.raises(TypeError):
+        view["actions"].pop()
+
+
+def test_reload_invalidates_cache():
+    engine = _engine()
+    engine.get_current_view("u1")
+    assert len(engine.view_cache) == 1
+    engine.reload_manifest()
+    assert len(engine.view_cache) == 0
@@ -0,0 +1,76 @@
+"""
+Тест diff между view и NavigationEngine.get_view_delta.
+
+Проверяет:
+- Первый view — полная отрисовка, повторный без изменений — changed=False.
+- full=True (нажатие в старом сообщении) — полная отрисовка даже без
+  изменений, следующий diff снова от последнего view.
+- Стабильные ключи действий (не зависят от позиции и id `dynamic_N`).
+- Добавленные/удалённые/переименованные/перемещённые кнопки.
+- Смену только заголовка и смену раскладки.
+"""
+from navigation.api_stub import APISimulator
+from navigation.engine import NavigationEngine
+from navigation.logger import NavigationLogger
+from navigation.view_diff import action_key, diff_views
+
+
+def _student(i, name, student_id):
+    return {
+        "id": f"dynamic_{i}", "label": name, "type": "navigate", "target": "select_metric",
+        "context": {"student_id": student_id, "student_name": name},
+    }
+
+
+def _view(text, actions, **extra):
+    return {"text": text, "actions": actions, "screen_type": "dynamic", **extra}
+
+
+def test_engine_delta_skips_unchanged():
+    engine = NavigationEngine("menu-manifest.json", logger=NavigationLogger("ViewDiffTest"), api_client=APISimulator())
+    first = engine.get_view_delta("u1")
+    assert first["full"] and first["changed"]
+    again = engine.get_view_delta("u1")
+    assert not again["changed"] and not again["keyboard_changed"]
+
+    engine.handle_action("u1", {"type": "navigate", "target": "quick_grade", "label": "Поставить отметки"})
+    delta = engine.get_view_delta("u1")
+    assert delta["full"]  # static -> dynamic
+    assert delta["keys"][-1] == "back"
+    assert not engine.get_view_delta("u1")["changed"]  # перерендер с теми же данными
+
+    # Нажатие в старом сообщении: оно показывает другой view, diff от последнего неверен
+    stale = engine.get_view_delta("u1", full=True)
+    assert stale["full"] and stale["changed"] and stale["view"] == delta["view"]
+    assert not engine.get_view_delta("u1")["changed"]
+
+
+def test_stable_keys_and_changes():
+    ivanov, petrov = _student(0, "Иванов", "ivanov"), _student(1, "Петров", "petrov")
+    old = _view("Студенты", [ivanov, petrov, {"id": "back", "label": "< Назад", "type": "back"}])
+    # Петров переехал наверх с другим id, Иванов пропал, появился Сидоров
+    new = _view("Студенты", [
+        _student(0, "Петров", "petrov"),
+        _student(1, "Сидоров", "sidorov"),
+        {"id": "back", "label": "Назад", "type": "back"},
+    ])
+    delta = diff_views(old, new)
+    assert action_key(petrov) == action_key(new["actions"][0])
+    assert delta["changed"] and delta["keyboard_changed"] and delta["title"] is None
+    assert delta["removed"] == [action_key(ivanov)]
+    assert [key for _, key, _ in delta["added"]] == [action_key(new["actions"][1])]
+    assert delta["relabelled"] == [("back", "Назад")]
+    assert {key for key, _ in delta["updated"]} == {action_key(petrov), "back"}  # у Петрова сменился id
+    assert delta["moved"] == []  # порядок общих кнопок (Петров, back) не изменился
+
+
+def test_moves_title_and_layout():
+    a, b = _student(0, "А", "a"), _student(1, "Б", "b")
+    delta = diff_views(_view("Было", [a, b]), _view("Было", [b, a]))
+    assert {key for key, _, _ in delta["moved"]} == {action_key(a), action_key(b)}
+
+    delta = diff_views(_view("Было", [a]), _view("Стало", [a]))
+    assert delta["title"] == "Стало" and not delta["keyboard_changed"]
+
+    delta = diff_views(_view("Было", [a]), _view("Было", [a], layout="grid", columns=3))
+    assert delta["layout_changed"] and delta["keyboard_changed"] and delta["title"] is None